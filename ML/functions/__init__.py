@@ -2,12 +2,13 @@
 
 from .display_metrics import display_metrics
 from .hyperopt_tuning import optimize_boosting_model, plot_optimization_history
-from .model_selection import select_best_model, save_best_model
+from .model_selection import export_native_model, select_best_model, save_best_model
 
 __all__ = [
     "display_metrics",
     "optimize_boosting_model",
     "plot_optimization_history",
+    "export_native_model",
     "select_best_model",
     "save_best_model",
 ]
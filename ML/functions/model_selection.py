@@ -1,5 +1,8 @@
 """Fonctions pour la selection et sauvegarde des modeles."""
 
+import hashlib
+import json
+from pathlib import Path
 from typing import Dict, List, Callable, Any, Optional
 import joblib
 from sklearn.metrics import f1_score
@@ -33,6 +36,97 @@ def select_best_model(models_eval: List[Dict], metric: str = "f1", average: str
     return best
 
 
+def _preprocessing_params(imputer, scaler) -> Optional[Dict[str, Any]]:
+    """
+    Extrait les parametres de preprocessing (SimpleImputer, StandardScaler) en listes JSON.
+
+    Returns:
+        Dict {'imputer': {...} | None, 'scaler': {...} | None}, ou None si un transformateur
+        n'est pas reproductible sans sklearn (strategie constante, autre classe...)
+    """
+    params: Dict[str, Any] = {"imputer": None, "scaler": None}
+    if imputer is not None:
+        if type(imputer) is not SimpleImputer or imputer.strategy not in ("mean", "median", "most_frequent"):
+            return None
+        params["imputer"] = {"statistics": [float(v) for v in imputer.statistics_]}
+    if scaler is not None:
+        if type(scaler) is not StandardScaler:
+            return None
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if scaler.mean_ is not None else [0.0] * n_features
+        scale = scaler.scale_ if scaler.scale_ is not None else [1.0] * n_features
+        params["scaler"] = {"mean": [float(v) for v in mean], "scale": [float(v) for v in scale]}
+    return params
+
+
+def export_native_model(
+    model, save_path: str, feature_names: List[str], model_name: str, imputer=None, scaler=None
+) -> Optional[str]:
+    """
+    Exporte le modele au format natif du booster, avec un fichier JSON de metadonnees.
+
+    Formats: XGBoost -> UBJSON (.ubj), CatBoost -> .cbm. Un Pipeline sklearn
+    (imputer, scaler, modele) est decompose: ses parametres de preprocessing sont
+    ecrits dans le JSON. Le backend charge cet export plutot que le .joblib
+    (deserialisation plus rapide, sans pickle), tant que l'empreinte SHA-256 du .joblib
+    enregistree dans le JSON (source_sha256) correspond au .joblib present.
+
+    Args:
+        model: Modele entraine (Pipeline sklearn, XGBClassifier ou CatBoostClassifier)
+        save_path: Chemin du .joblib de reference, deja ecrit (l'export est ecrit a cote)
+        feature_names: Features dans l'ordre d'entrainement
+        model_name: Nom du modele
+        imputer: SimpleImputer ajuste (modeles CatBoost sans pipeline)
+        scaler: StandardScaler ajuste (modeles CatBoost sans pipeline)
+
+    Returns:
+        Chemin du fichier JSON de metadonnees, ou None si le modele n'a pas de format natif
+    """
+    estimator = model
+    if hasattr(model, "steps"):
+        transformers = dict(model.steps[:-1])
+        if set(transformers) - {"imputer", "scaler"}:
+            print(f"Export natif ignore: etapes de pipeline non supportees {list(transformers)}")
+            return None
+        imputer, scaler = transformers.get("imputer"), transformers.get("scaler")
+        estimator = model.steps[-1][1]
+
+    params = _preprocessing_params(imputer, scaler)
+    if params is None:
+        print("Export natif ignore: preprocessing non supporte")
+        return None
+
+    base = Path(save_path)
+    estimator_type = type(estimator).__name__
+    threshold = None
+    if estimator_type == "XGBClassifier":
+        native_path = base.with_suffix(".ubj")
+        estimator.get_booster().save_model(str(native_path))
+        native_format = "xgboost-ubj"
+    elif estimator_type == "CatBoostClassifier":
+        native_path = base.with_suffix(".cbm")
+        estimator.save_model(str(native_path), format="cbm")
+        native_format = "catboost-cbm"
+        threshold = estimator.get_probability_threshold()
+    else:
+        print(f"Export natif ignore: pas de format natif pour {estimator_type}")
+        return None
+
+    metadata = {
+        "format": native_format,
+        "model_file": native_path.name,
+        "model_name": model_name,
+        "feature_names": list(feature_names),
+        "threshold": float(threshold) if threshold is not None else None,
+        "source_sha256": hashlib.sha256(base.read_bytes()).hexdigest(),
+        **params,
+    }
+    metadata_path = base.with_suffix(".json")
+    metadata_path.write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+    print(f"Export natif: {native_path} (+ {metadata_path.name})")
+    return str(metadata_path)
+
+
 def save_best_model(
     best_model_name: str,
     model_configs: Dict[str, Callable],
@@ -43,6 +137,7 @@ def save_best_model(
     save_path: str,
     catboost_models: Optional[List[str]] = None,
     average: str = "weighted",
+    export_native: bool = True,
 ) -> Dict[str, Any]:
     """
     Entraine et sauvegarde le meilleur modele sur les donnees completes.
@@ -58,9 +153,10 @@ def save_best_model(
         save_path: Chemin de sauvegarde (.joblib)
         catboost_models: Liste des noms de modeles CatBoost (sans pipeline)
         average: Methode de calcul du F1 ('weighted', 'binary', 'macro')
+        export_native: Exporter aussi le format natif du booster (voir export_native_model)
 
     Returns:
-        Dict avec 'model', 'f1_test', 'path'
+        Dict avec 'model', 'f1_test', 'path', 'native_path' (None sans export natif)
 
     Example:
         >>> model_configs = {
@@ -104,6 +200,11 @@ def save_best_model(
             "feature_names": feature_names,
         }
         joblib.dump(save_object, save_path)
+        native_path = (
+            export_native_model(model, save_path, feature_names, best_model_name, imputer, scaler)
+            if export_native
+            else None
+        )
 
         # Verification
         X_test_processed = scaler.transform(imputer.transform(X_test))
@@ -113,6 +214,7 @@ def save_best_model(
         model.fit(X_full, y_full)
         save_object = {"model": model, "model_name": best_model_name, "feature_names": feature_names}
         joblib.dump(save_object, save_path)
+        native_path = export_native_model(model, save_path, feature_names, best_model_name) if export_native else None
         y_pred = model.predict(X_test)
 
     f1_test = f1_score(y_test, y_pred, average=average)
@@ -126,6 +228,7 @@ def save_best_model(
         "model": model,
         "f1_test": f1_test,
         "path": save_path,
+        "native_path": native_path,
         "model_name": best_model_name,
         "feature_names": feature_names,
     }
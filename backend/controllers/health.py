@@ -1,4 +1,18 @@
-from fastapi import APIRouter
+import logging
+
+from fastapi import APIRouter, Response
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import get_pool_stats, ping_db
+from services.batcher import get_batcher_stats
+from services.feature_service import get_sun_cache_stats
+from services.inference_executor import get_inference_stats
+from services.ml_service import get_prediction_cache_stats
+from services.model_registry import get_registry_stats
+from services.prediction_writer import get_persistence_stats
+from services.score_table import get_score_table_stats
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["health"])
 
@@ -11,3 +25,43 @@ async def root() -> dict:
 @router.get("/health")
 async def health_check() -> dict:
     return {"status": "healthy"}
+
+
+@router.get("/health/cache")
+async def cache_stats() -> dict:
+    """Taille et compteurs (hits, misses, évictions, expirations) des caches applicatifs."""
+    return {
+        "sun_times": get_sun_cache_stats(),
+        "predictions": get_prediction_cache_stats(),
+        "score_table": get_score_table_stats(),
+    }
+
+
+@router.get("/health/inference")
+async def inference_stats() -> dict:
+    """Charge du pool d'inférence (en cours/en attente, limite, rejets) et activité du micro-batcher."""
+    return {**get_inference_stats(), "batcher": get_batcher_stats()}
+
+
+@router.get("/health/models")
+async def models_stats() -> dict:
+    """Modèles du registre (/predict/{model_name}) et modèles chargés en mémoire."""
+    return get_registry_stats()
+
+
+@router.get("/health/persistence")
+async def persistence_stats() -> dict:
+    """Mode de persistance des prédictions et profondeur de la file d'écriture différée."""
+    return get_persistence_stats()
+
+
+@router.get("/health/db")
+async def db_health(response: Response) -> dict:
+    """Disponibilité de la BDD (SELECT 1) et état du pool de connexions (503 si la BDD ne répond pas)."""
+    try:
+        latency_ms = await ping_db()
+    except (SQLAlchemyError, OSError) as e:
+        logger.warning("BDD indisponible: %s", e)
+        response.status_code = 503
+        return {"status": "unavailable", "error": str(e), "pool": get_pool_stats()}
+    return {"status": "ok", "latency_ms": round(latency_ms, 3), "pool": get_pool_stats()}
@@ -0,0 +1,31 @@
+import logging
+
+from fastapi import APIRouter, HTTPException
+
+from services.model_reload import ModelReloadError, get_model_stats, reload_model
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["model"])
+
+
+@router.get("/model")
+async def model_info() -> dict:
+    """Version du modèle en service et compteurs de rechargement."""
+    return get_model_stats()
+
+
+@router.post("/model/reload")
+async def reload() -> dict:
+    """
+    Recharge le fichier du modèle sans interrompre les prédictions.
+
+    Le nouveau modèle est chargé et préchauffé en arrière-plan, puis remplace le précédent
+    d'un bloc. Sans changement du fichier, le modèle en service est conservé (reloaded=false).
+    Avec plusieurs workers uvicorn, seul celui qui reçoit la requête est rechargé
+    (voir MODEL_WATCH_INTERVAL pour recharger tous les workers).
+    """
+    try:
+        return await reload_model()
+    except ModelReloadError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
@@ -1,14 +1,33 @@
 import logging
-from collections.abc import Sequence
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
-from models import Prediction
-from schemas import AccidentInput, PredictionHistory, PredictionResponse
-from services.prediction_service import create_prediction, get_prediction_history
+from schemas import (
+    AccidentBatchInput,
+    AccidentInput,
+    ModelInput,
+    ModelPredictionResponse,
+    PredictionFilters,
+    PredictionHistory,
+    PredictionResponse,
+)
+from services.inference_executor import InferenceOverloadedError, run_inference
+from services.model_registry import ModelLoadError, predict_with_model
+from services.prediction_export import MEDIA_TYPES, ExportFormat, stream_predictions
+from services.prediction_service import (
+    HISTORY_KEY_FIELDS,
+    create_prediction,
+    create_predictions_batch,
+    encode_cursor,
+    get_prediction_history,
+    parse_history_fields,
+)
+from services.prediction_writer import PersistenceOverloadedError
 
 logger = logging.getLogger(__name__)
 
@@ -16,31 +35,170 @@ router = APIRouter(tags=["predictions"])
 
 
 @router.post("/predict", response_model=PredictionResponse)
-async def predict_accident(data: AccidentInput, db: Annotated[AsyncSession, Depends(get_db)]) -> PredictionResponse:
+async def predict_accident(
+    data: AccidentInput,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    return_id: Annotated[bool, Query(description="Retourner l'id et la date d'enregistrement")] = True,
+) -> PredictionResponse:
     """
     Prédit la gravité d'un accident de la route.
 
     Retourne:
-    - id: identifiant de la prédiction en base
+    - id: identifiant de la prédiction en base (absent si return_id=false)
+    - created_at: date d'enregistrement en base (absente si return_id=false ou en écriture différée)
     - gravite: 0 (non grave) ou 1 (grave)
     - probabilite_grave: probabilité entre 0 et 1
     - label: "Non grave" ou "Grave"
     """
     try:
-        return await create_prediction(data, db)
+        return await create_prediction(data, db, return_id)
+    except ValueError as e:
+        logger.error("Erreur de validation: %s", e)
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except FileNotFoundError as e:
+        logger.error("Modèle non trouvé: %s", e)
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except InferenceOverloadedError as e:
+        logger.warning("Inférence rejetée: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"}) from e
+    except PersistenceOverloadedError as e:
+        logger.warning("Écriture différée saturée: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"}) from e
+
+
+@router.post("/predict/batch", response_model=list[PredictionResponse])
+async def predict_accidents_batch(
+    data: AccidentBatchInput,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    return_id: Annotated[bool, Query(description="Retourner l'id et la date d'enregistrement")] = True,
+) -> list[PredictionResponse]:
+    """
+    Prédit la gravité d'un lot d'accidents en un seul appel.
+
+    Les features sont dérivées pour tout le lot, le modèle est appelé une seule fois
+    et les résultats sont insérés en base en une seule requête.
+    Les prédictions sont retournées dans l'ordre des entrées.
+    """
+    try:
+        return await create_predictions_batch(data.inputs, db, return_id)
     except ValueError as e:
-        logger.error(f"Erreur de validation: {e}")
+        logger.error("Erreur de validation: %s", e)
         raise HTTPException(status_code=400, detail=str(e)) from e
     except FileNotFoundError as e:
-        logger.error(f"Modèle non trouvé: {e}")
+        logger.error("Modèle non trouvé: %s", e)
         raise HTTPException(status_code=503, detail=str(e)) from e
+    except InferenceOverloadedError as e:
+        logger.warning("Inférence rejetée: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"}) from e
+
+
+# Déclarée après /predict/batch: "batch" n'est pas un nom de modèle
+@router.post("/predict/{model_name}", response_model=ModelPredictionResponse)
+async def predict_with_registered_model(model_name: str, data: ModelInput) -> ModelPredictionResponse:
+    """
+    Prédit la gravité avec un modèle du registre (ex: passager_pieton), à partir de ses features.
+
+    Les features attendues sont celles de l'entraînement du modèle. La prédiction
+    n'est pas enregistrée en base.
+    """
+    try:
+        result = await run_inference(predict_with_model, model_name, data.features)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Modèle inconnu: {model_name}") from e
+    except ValueError as e:
+        logger.error("Erreur de validation: %s", e)
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except ModelLoadError as e:
+        logger.error("Modèle indisponible: %s", e)
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except InferenceOverloadedError as e:
+        logger.warning("Inférence rejetée: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"}) from e
+    return ModelPredictionResponse(model=model_name, **result)
+
+
+def _history_projection_schema() -> dict:
+    """
+    Schéma OpenAPI des lignes de GET /predictions: celui de PredictionHistory, seuls id et
+    created_at étant requis (les autres colonnes dépendent de fields).
+    """
+    schema = PredictionHistory.model_json_schema()
+    schema["title"] = "PredictionHistoryProjection"
+    schema["required"] = [name for name in schema["required"] if name in HISTORY_KEY_FIELDS]
+    return {"type": "array", "items": schema}
 
 
-@router.get("/predictions", response_model=list[PredictionHistory])
+@router.get(
+    "/predictions",
+    response_class=Response,
+    responses={
+        200: {
+            "description": "Historique des prédictions (colonnes limitées à fields si fourni)",
+            "content": {"application/json": {"schema": _history_projection_schema()}},
+        }
+    },
+)
 async def get_predictions(
     db: Annotated[AsyncSession, Depends(get_db)],
+    filters: Annotated[PredictionFilters, Depends()],
     limit: Annotated[int, Query(ge=1, le=1000)] = 100,
     offset: Annotated[int, Query(ge=0)] = 0,
-) -> Sequence[Prediction]:
-    """Récupère l'historique des prédictions."""
-    return await get_prediction_history(db, limit, offset)
+    after: Annotated[str | None, Query(description="Curseur de pagination (en-tête X-Next-Cursor)")] = None,
+    fields: Annotated[
+        str | None, Query(description="Colonnes à retourner, séparées par des virgules (id et created_at inclus)")
+    ] = None,
+) -> Response:
+    """
+    Récupère l'historique des prédictions, de la plus récente à la plus ancienne.
+
+    Filtres optionnels: input_departement, created_after/created_before, label, gravite,
+    min_probabilite_grave. Le curseur X-Next-Cursor reste valable avec les mêmes filtres.
+
+    Quand la page est complète, l'en-tête X-Next-Cursor contient le curseur à passer
+    dans `after` pour obtenir la page suivante (préférable à offset pour les pages profondes).
+
+    Avec fields (ex: `id,created_at,input_departement,probabilite_grave`), seules ces
+    colonnes sont lues en base et retournées.
+    """
+    if after is not None and offset:
+        raise HTTPException(status_code=400, detail="after et offset ne peuvent pas être combinés")
+    try:
+        columns = parse_history_fields(fields)
+        rows = await get_prediction_history(db, limit, offset, after, filters, columns)
+    except ValueError as e:
+        logger.error("Erreur de validation: %s", e)
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    # Les lignes lues en base sont sérialisées directement, sans validation Pydantic par ligne
+    return Response(content=to_json([dict(row) for row in rows]), media_type="application/json", headers=headers)
+
+
+@router.get("/predictions/export")
+async def export_predictions(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    filters: Annotated[PredictionFilters, Depends()],
+    format: Annotated[ExportFormat, Query(description="ndjson, csv ou parquet")] = "ndjson",
+    fields: Annotated[
+        str | None, Query(description="Colonnes à exporter, séparées par des virgules (id et created_at inclus)")
+    ] = None,
+) -> StreamingResponse:
+    """
+    Exporte tout l'historique des prédictions en flux, de la plus ancienne à la plus récente.
+
+    Accepte les mêmes filtres et la même projection (fields) que GET /predictions.
+    Les lignes sont lues par curseur côté serveur: la mémoire utilisée est constante.
+    """
+    try:
+        columns = parse_history_fields(fields)
+    except ValueError as e:
+        logger.error("Erreur de validation: %s", e)
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    return StreamingResponse(
+        stream_predictions(db, format, columns, filters),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="predictions.{format}"'},
+    )
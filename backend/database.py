@@ -1,8 +1,15 @@
+import logging
 import os
+import time
 from collections.abc import AsyncGenerator
+from typing import Any
 
+from sqlalchemy import Connection, exc, inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+logger = logging.getLogger(__name__)
 
 POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
@@ -12,10 +19,70 @@ POSTGRES_DB = os.getenv("POSTGRES_DB", "accidents")
 
 if not POSTGRES_USER or not POSTGRES_PASSWORD:
     raise ValueError("POSTGRES_USER and POSTGRES_PASSWORD must be set")
-DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+# Pool de connexions (par worker uvicorn: prévoir workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connexions Postgres)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Cache des requêtes préparées d'asyncpg par connexion (0 = désactivé, requis derrière pgbouncer en mode transaction)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+DATABASE_URL = (
+    f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    f"?prepared_statement_cache_size={DB_STATEMENT_CACHE_SIZE}"
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool de connexions mesurant le temps d'obtention des connexions et les dépassements de DB_POOL_TIMEOUT."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.acquisitions = 0
+        self.acquire_total = 0.0
+        self.acquire_max = 0.0
+        self.timeouts = 0
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.acquisitions += 1
+            self.acquire_total += elapsed
+            self.acquire_max = max(self.acquire_max, elapsed)
+
+    def stats(self) -> dict[str, Any]:
+        """Connexions disponibles/utilisées et temps d'obtention d'une connexion."""
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "acquisitions": self.acquisitions,
+            "acquire_avg_ms": round(self.acquire_total / self.acquisitions * 1000, 3) if self.acquisitions else 0.0,
+            "acquire_max_ms": round(self.acquire_max * 1000, 3),
+            "timeouts": self.timeouts,
+        }
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    poolclass=TimedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -30,7 +97,51 @@ async def get_db() -> AsyncGenerator:
         yield session
 
 
+# Verrou consultatif sérialisant init_db entre workers uvicorn démarrés simultanément
+_INIT_DB_LOCK_KEY = 7_420_251
+
+
+def _warn_pending_migrations(connection: Connection) -> None:
+    """Signale une table predictions existante non migrée (ancienne colonne JSON, index manquants)."""
+    inspector = inspect(connection)
+    if not inspector.has_table("predictions"):
+        return
+    if "features" in {column["name"] for column in inspector.get_columns("predictions")}:
+        logger.warning(
+            "Table predictions avec l'ancienne colonne JSON features: lancer `python -m services.migrations`"
+        )
+    existing = {index["name"] for index in inspector.get_indexes("predictions")}
+    missing = sorted(
+        str(index.name) for index in Base.metadata.tables["predictions"].indexes if index.name not in existing
+    )
+    if missing:
+        logger.warning("Index absents de predictions (%s): lancer `python -m services.migrations`", ", ".join(missing))
+
+
 async def init_db() -> None:
-    """Crée les tables si elles n'existent pas."""
+    """
+    Crée les tables (avec leurs index) si elles n'existent pas.
+
+    Les migrations des tables existantes ne sont jamais lancées au démarrage: elles passent par
+    `python -m services.migrations`, dont l'absence est seulement signalée ici.
+    """
     async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _INIT_DB_LOCK_KEY})
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_warn_pending_migrations)
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Statistiques du pool de connexions de l'engine."""
+    pool = engine.pool
+    if not isinstance(pool, TimedQueuePool):
+        return {}
+    return pool.stats()
+
+
+async def ping_db() -> float:
+    """Exécute SELECT 1 et retourne la latence en millisecondes (connexion prise dans le pool)."""
+    start = time.perf_counter()
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return (time.perf_counter() - start) * 1000
@@ -0,0 +1,26 @@
+import logging
+import os
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Niveau global et niveaux par module, ex: LOG_LEVELS="services.ml_service=DEBUG,prediction.trace=INFO"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+
+def parse_log_levels(spec: str) -> dict[str, str]:
+    """Parse une liste 'module=NIVEAU' séparée par des virgules."""
+    levels: dict[str, str] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        module, sep, level = item.partition("=")
+        if not sep or not module.strip() or not level.strip():
+            raise ValueError(f"LOG_LEVELS invalide: '{item}' (attendu: module=NIVEAU)")
+        levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """Configure le logging racine et applique les niveaux par module."""
+    logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+    for module, level in parse_log_levels(LOG_LEVELS).items():
+        logging.getLogger(module).setLevel(level)
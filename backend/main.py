@@ -7,21 +7,49 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
 from controllers.health import router as health_router
+from controllers.model import router as model_router
 from controllers.prediction import router as prediction_router
 from database import init_db
+from logging_config import configure_logging
+from services.batcher import start_batcher, stop_batcher
+from services.http_client import close_http_client, init_http_client
+from services.inference_executor import shutdown_executor, start_executor
 from services.ml_service import load_model
+from services.model_reload import start_model_watcher, stop_model_watcher
+from services.partitions import run_partition_maintenance, start_partition_maintenance, stop_partition_maintenance
+from services.prediction_writer import start_prediction_writer, stop_prediction_writer
+from services.sun_table import load_sun_table
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+# Configuration du logging (LOG_LEVEL, LOG_LEVELS)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
-    """Charge le modèle et initialise la BDD au démarrage."""
+    """
+    Charge le modèle et la table des horaires du soleil au démarrage,
+    puis initialise la BDD (et ses partitions), le client HTTP, le pool d'inférence,
+    la surveillance du fichier du modèle, le micro-batcher et l'écriture différée.
+    L'arrêt vide la file d'écriture différée en base.
+    """
     load_model()
+    load_sun_table()
     await init_db()
+    await run_partition_maintenance()
+    start_partition_maintenance()
+    init_http_client()
+    start_executor()
+    start_model_watcher()
+    start_batcher()
+    start_prediction_writer()
     yield
+    await stop_model_watcher()
+    await stop_batcher()
+    await stop_prediction_writer()
+    await stop_partition_maintenance()
+    shutdown_executor()
+    await close_http_client()
 
 
 app = FastAPI(
@@ -33,6 +61,7 @@ app = FastAPI(
 
 app.include_router(health_router)
 app.include_router(prediction_router)
+app.include_router(model_router)
 
 
 @app.exception_handler(RequestValidationError)
@@ -40,23 +69,23 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     """Log les erreurs de validation Pydantic (422)."""
     logger.error("=" * 50)
     logger.error("ERREUR DE VALIDATION (422 Unprocessable Entity)")
-    logger.error(f"URL: {request.url}")
-    logger.error(f"Méthode: {request.method}")
+    logger.error("URL: %s", request.url)
+    logger.error("Méthode: %s", request.method)
 
     # Log du body brut si disponible
     try:
         body = await request.body()
-        logger.error(f"Body reçu: {body.decode('utf-8')}")
+        logger.error("Body reçu: %s", body.decode("utf-8"))
     except Exception:
         logger.error("Impossible de lire le body")
 
     # Log des erreurs détaillées
     for error in exc.errors():
-        logger.error(f"  - Champ: {error.get('loc')}")
-        logger.error(f"    Type: {error.get('type')}")
-        logger.error(f"    Message: {error.get('msg')}")
+        logger.error("  - Champ: %s", error.get("loc"))
+        logger.error("    Type: %s", error.get("type"))
+        logger.error("    Message: %s", error.get("msg"))
         if error.get("input") is not None:
-            logger.error(f"    Valeur reçue: {error.get('input')}")
+            logger.error("    Valeur reçue: %s", error.get("input"))
 
     logger.error("=" * 50)
 
@@ -1,7 +1,19 @@
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, Float, Integer, String
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    cast,
+    literal_column,
+    type_coerce,
+)
+from sqlalchemy.orm import Mapped, column_property, mapped_column
 from sqlalchemy.sql import func
 
 from database import Base
@@ -11,9 +23,21 @@ class Prediction(Base):
     """Table des prédictions effectuées."""
 
     __tablename__ = "predictions"
+    __table_args__ = (
+        # Historique paginé par clé (created_at, id), du plus récent au plus ancien (et filtre sur created_at)
+        Index("ix_predictions_created_at_id", "created_at", "id"),
+        # Filtres de l'historique, suivis de la clé de tri pour paginer sans tri supplémentaire
+        Index("ix_predictions_departement_created_at_id", "input_departement", "created_at", "id"),
+        Index("ix_predictions_gravite_created_at_id", "gravite", "created_at", "id"),
+        Index("ix_predictions_probabilite_grave", "probabilite_grave"),
+        # Partitions mensuelles (services.partitions): la clé de partition fait partie de la clé primaire
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
+    )
 
     # Données d'entrée brutes
     input_date: Mapped[str] = mapped_column(String(10), nullable=False)
@@ -25,8 +49,38 @@ class Prediction(Base):
     input_impl_poids_lourd: Mapped[bool] = mapped_column(nullable=False)
     input_impl_pieton: Mapped[bool] = mapped_column(nullable=False)
 
-    # Features dérivées (stockées en JSON)
-    features: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # Features dérivées des entrées (agg, vma et impl_* sont les entrées brutes, non dupliquées)
+    est_nuit: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    est_heure_pointe: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    jour_semaine: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    est_weekend: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+    # Les 9 features du modèle, dans l'ordre de FEATURE_ORDER, reconstituées en SQL (lecture seule)
+    features: Mapped[dict] = column_property(
+        type_coerce(
+            func.json_build_object(
+                literal_column("'est_nuit'"),
+                cast(est_nuit, Integer),
+                literal_column("'est_heure_pointe'"),
+                cast(est_heure_pointe, Integer),
+                literal_column("'jour_semaine'"),
+                jour_semaine,
+                literal_column("'est_weekend'"),
+                cast(est_weekend, Integer),
+                literal_column("'agg'"),
+                cast(input_agg, Integer),
+                literal_column("'vma'"),
+                input_vma,
+                literal_column("'impl_vehicule_leger'"),
+                cast(input_impl_vehicule_leger, Integer),
+                literal_column("'impl_poids_lourd'"),
+                cast(input_impl_poids_lourd, Integer),
+                literal_column("'impl_pieton'"),
+                cast(input_impl_pieton, Integer),
+            ),
+            JSON,
+        )
+    )
 
     # Résultat de la prédiction
     gravite: Mapped[int] = mapped_column(Integer, nullable=False)
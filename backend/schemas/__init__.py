@@ -1,3 +1,19 @@
-from schemas.prediction import AccidentInput, PredictionHistory, PredictionResponse
+from schemas.prediction import (
+    AccidentBatchInput,
+    AccidentInput,
+    ModelInput,
+    ModelPredictionResponse,
+    PredictionFilters,
+    PredictionHistory,
+    PredictionResponse,
+)
 
-__all__ = ["AccidentInput", "PredictionHistory", "PredictionResponse"]
+__all__ = [
+    "AccidentBatchInput",
+    "AccidentInput",
+    "ModelInput",
+    "ModelPredictionResponse",
+    "PredictionFilters",
+    "PredictionHistory",
+    "PredictionResponse",
+]
@@ -1,7 +1,11 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
+# Nombre maximal d'entrées acceptées par /predict/batch
+MAX_BATCH_SIZE = 10_000
+
 
 class AccidentInput(BaseModel):
     date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$", examples=["2024-01-15"])
@@ -14,11 +18,32 @@ class AccidentInput(BaseModel):
     impl_pieton: bool = Field(..., description="Piéton impliqué")
 
 
+class AccidentBatchInput(BaseModel):
+    """Lot d'entrées pour une prédiction groupée."""
+
+    inputs: list[AccidentInput] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class ModelInput(BaseModel):
+    """Features nommées d'un modèle du registre (null = valeur manquante)."""
+
+    features: dict[str, float | None] = Field(..., examples=[{"agg": 1, "vma": 50, "est_nuit": 0}])
+
+
+class ModelPredictionResponse(BaseModel):
+    model: str = Field(..., description="Nom du modèle utilisé")
+    gravite: int = Field(..., ge=0, le=1)
+    probabilite_grave: float = Field(..., ge=0, le=1)
+    label: str
+
+
 class PredictionResponse(BaseModel):
-    id: int | None = Field(None, description="ID de la prédiction en base")
+    id: int | None = Field(default=None, description="ID de la prédiction en base")
+    created_at: datetime | None = Field(default=None, description="Date d'enregistrement en base")
     gravite: int = Field(..., ge=0, le=1)
     probabilite_grave: float = Field(..., ge=0.0, le=1.0)
     label: str
+    model_version: str | None = Field(default=None, description="Version du modèle qui a servi la prédiction")
 
 
 class PredictionHistory(BaseModel):
@@ -40,3 +65,14 @@ class PredictionHistory(BaseModel):
     label: str
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class PredictionFilters(BaseModel):
+    """Filtres de l'historique des prédictions (paramètres de requête de GET /predictions)."""
+
+    input_departement: str | None = Field(default=None, examples=["75"])
+    created_after: datetime | None = Field(default=None, description="Prédictions enregistrées à partir de cette date")
+    created_before: datetime | None = Field(default=None, description="Prédictions enregistrées avant cette date")
+    label: Literal["Grave", "Non grave"] | None = None
+    gravite: int | None = Field(default=None, ge=0, le=1)
+    min_probabilite_grave: float | None = Field(default=None, ge=0.0, le=1.0)
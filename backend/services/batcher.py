@@ -0,0 +1,165 @@
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Any
+
+from services.inference_executor import InferenceOverloadedError, run_inference
+from services.ml_service import predict, predict_batch
+
+logger = logging.getLogger(__name__)
+
+# Micro-batching des prédictions unitaires concurrentes:
+# les appels arrivant dans une fenêtre de BATCHER_MAX_WAIT_MS (ou jusqu'à BATCHER_MAX_BATCH_SIZE
+# entrées) sont regroupés en un seul predict_proba vectorisé.
+BATCHER_ENABLED = os.getenv("BATCHER_ENABLED", "false").lower() in ("1", "true", "yes")
+BATCHER_MAX_BATCH_SIZE = int(os.getenv("BATCHER_MAX_BATCH_SIZE", "64"))
+BATCHER_MAX_WAIT_MS = float(os.getenv("BATCHER_MAX_WAIT_MS", "2"))
+BATCHER_MAX_QUEUE = int(os.getenv("BATCHER_MAX_QUEUE", "1024"))
+
+# Entrée de la file: features d'une prédiction et futur de l'appelant
+type _Entry = tuple[dict[str, Any], asyncio.Future[dict[str, Any]]]
+
+
+class MicroBatcher:
+    """
+    Regroupe les prédictions unitaires concurrentes en lots.
+
+    Chaque appelant dépose ses features dans une file et attend un futur. Une tâche de fond
+    collecte les entrées jusqu'à max_batch_size ou max_wait_ms après la première, lance un
+    predict_batch dans le pool d'inférence et résout le futur de chaque appelant.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float, max_queue: int) -> None:
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size doit être >= 1 (reçu: {max_batch_size})")
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue[_Entry] = asyncio.Queue(maxsize=max_queue)
+        self._collector: asyncio.Task[None] | None = None
+        self._inflight: set[asyncio.Task[None]] = set()
+        self.batches = 0
+        self.items = 0
+
+    def start(self) -> None:
+        """Démarre la tâche de collecte (dans la boucle d'événements courante)."""
+        if self._collector is None:
+            self._collector = asyncio.create_task(self._collect(), name="micro-batcher")
+
+    async def stop(self) -> None:
+        """Arrête la collecte, traite les entrées encore en file et attend les lots en cours."""
+        if self._collector is not None:
+            self._collector.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._collector
+            self._collector = None
+        while not self._queue.empty():
+            await self._dispatch(self._drain(self.max_batch_size))
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def submit(self, features: dict[str, Any]) -> dict[str, Any]:
+        """Ajoute une prédiction au prochain lot et attend son résultat."""
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((features, future))
+        except asyncio.QueueFull as e:
+            raise InferenceOverloadedError(f"File du micro-batcher pleine ({self._queue.maxsize} entrées)") from e
+        return await future
+
+    def _drain(self, limit: int) -> list[_Entry]:
+        """Retire sans attendre jusqu'à limit entrées de la file."""
+        items: list[_Entry] = []
+        while len(items) < limit and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _collect(self) -> None:
+        """Boucle de collecte: un lot par fenêtre de temps ou dès que la taille maximale est atteinte."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    batch.extend(self._drain(self.max_batch_size - len(batch)))
+                    timeout = deadline - loop.time()
+                    if len(batch) >= self.max_batch_size or timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except TimeoutError:
+                        break
+            finally:
+                # Le lot est traité en tâche de fond: la collecte du suivant commence immédiatement.
+                # Un lot en cours de collecte à l'arrêt est lui aussi traité.
+                task = asyncio.create_task(self._dispatch(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list[_Entry]) -> None:
+        """Prédit un lot et résout le futur de chaque appelant (erreur propagée à tous)."""
+        batch = [(features, future) for features, future in batch if not future.done()]
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await run_inference(predict_batch, [features for features, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results, strict=True):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict[str, Any]:
+        """Taille de file, nombre de lots et taille moyenne des lots."""
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+_batcher: MicroBatcher | None = None
+
+
+def start_batcher() -> None:
+    """Démarre le micro-batcher si BATCHER_ENABLED (appelé dans le lifespan)."""
+    global _batcher
+
+    if BATCHER_ENABLED and _batcher is None:
+        _batcher = MicroBatcher(BATCHER_MAX_BATCH_SIZE, BATCHER_MAX_WAIT_MS, BATCHER_MAX_QUEUE)
+        _batcher.start()
+        logger.info(
+            "Micro-batcher démarré (max_batch_size=%d, max_wait=%sms)", BATCHER_MAX_BATCH_SIZE, BATCHER_MAX_WAIT_MS
+        )
+
+
+async def stop_batcher() -> None:
+    """Arrête le micro-batcher après avoir traité les prédictions en attente."""
+    global _batcher
+
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
+
+
+async def predict_single(features: dict[str, Any]) -> dict[str, Any]:
+    """Prédit une entrée via le micro-batcher s'il est actif, sinon directement dans le pool d'inférence."""
+    if _batcher is not None:
+        return await _batcher.submit(features)
+    return await run_inference(predict, features)
+
+
+def get_batcher_stats() -> dict[str, Any]:
+    """Statistiques du micro-batcher (enabled=False s'il n'est pas actif)."""
+    if _batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **_batcher.stats()}
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+# Valeur sentinelle: "utiliser le TTL par défaut du cache"
+_DEFAULT_TTL: Any = object()
+
+
+class TTLCache[K: Hashable, V]:
+    """
+    Cache en mémoire borné, à éviction LRU et expiration optionnelle par entrée.
+
+    - maxsize: nombre maximal d'entrées (l'entrée la moins récemment utilisée est évincée)
+    - ttl: durée de vie par défaut en secondes (None = pas d'expiration),
+      surchargeable entrée par entrée dans set()
+
+    Les compteurs hits/misses/evictions/expirations sont exposés par stats().
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None, clock: Callable[[], float] = time.monotonic) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize doit être >= 1 (reçu: {maxsize})")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict[K, tuple[V, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: K) -> V | None:
+        """Retourne la valeur associée à key, ou None si absente ou expirée."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: K) -> V | None:
+        """Comme get(), sans compter de hit/miss ni modifier l'ordre LRU (double vérification sous verrou)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                return None
+            return value
+
+    def set(self, key: K, value: V, ttl: float | None = _DEFAULT_TTL) -> None:
+        """Ajoute ou remplace une entrée (ttl en secondes, None = pas d'expiration)."""
+        if ttl is _DEFAULT_TTL:
+            ttl = self.ttl
+        expires_at = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Vide le cache (les compteurs sont conservés)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        """Taille et compteurs du cache."""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SingleFlight[K: Hashable, V]:
+    """
+    Déduplication des appels asynchrones concurrents portant sur la même clé.
+
+    Le premier appelant lance la coroutine dans une tâche partagée; les appelants
+    suivants pour la même clé attendent cette tâche au lieu d'en lancer une autre.
+    La tâche est protégée (asyncio.shield): l'annulation d'un appelant n'interrompt
+    pas le calcul attendu par les autres.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[K, asyncio.Future[V]] = {}
+        self.coalesced = 0
+
+    async def run(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        """Exécute fn() pour key, ou attend l'exécution déjà en cours pour cette clé."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -1,11 +1,32 @@
+import asyncio
 import logging
+import os
+from collections.abc import Sequence
 from datetime import date, datetime, time
 from typing import Any
 
-import httpx
+import numpy as np
+
+from schemas import AccidentInput
+from services import sun_table
+from services.cache import SingleFlight, TTLCache
+from services.http_client import get_http_client
+from services.solar_service import sun_times_minutes, to_whole_minutes
 
 logger = logging.getLogger(__name__)
 
+# Source des horaires de lever/coucher du soleil:
+# - "local": calcul astronomique embarqué (défaut, sans réseau)
+# - "api": appel à api.sunrise-sunset.org (opt-in)
+SUN_TIMES_MODE = os.getenv("SUN_TIMES_MODE", "local")
+
+if SUN_TIMES_MODE not in ("local", "api"):
+    raise ValueError(f"SUN_TIMES_MODE invalide: {SUN_TIMES_MODE} (attendu: 'local' ou 'api')")
+
+# Cache des horaires du soleil (mode "api"): taille maximale et durée de vie des valeurs de repli
+SUN_CACHE_MAX_SIZE = int(os.getenv("SUN_CACHE_MAX_SIZE", "10000"))
+SUN_CACHE_FALLBACK_TTL = float(os.getenv("SUN_CACHE_FALLBACK_TTL", "60"))
+
 # Table des centroïdes des départements français
 DEPARTEMENTS: dict[str, dict[str, float]] = {
     # Métropole
@@ -114,8 +135,10 @@ DEPARTEMENTS: dict[str, dict[str, float]] = {
     "976": {"lat": -12.8, "lon": 45.2},  # Mayotte
 }
 
-# Cache pour les horaires de lever/coucher du soleil
-_sun_times_cache: dict[str, dict[str, time]] = {}
+# Cache LRU pour les horaires de lever/coucher du soleil (mode "api")
+_sun_times_cache: TTLCache[tuple[str, float, float], dict[str, time]] = TTLCache(maxsize=SUN_CACHE_MAX_SIZE)
+# Appels API en cours: les requêtes concurrentes pour la même clé partagent un seul appel
+_sun_times_inflight: SingleFlight[tuple[str, float, float], dict[str, time]] = SingleFlight()
 
 
 def _get_departement_coords(departement: str) -> tuple[float, float]:
@@ -128,48 +151,88 @@ def _get_departement_coords(departement: str) -> tuple[float, float]:
 
 async def _get_sun_times(date_str: str, latitude: float, longitude: float) -> dict[str, time]:
     """
-    Récupère les heures de lever/coucher du soleil via API externe.
-    Utilise un cache en mémoire pour éviter les appels répétés.
+    Récupère les heures de lever/coucher du soleil via API externe (mode "api").
+    Utilise un cache LRU borné pour éviter les appels répétés.
 
-    Fallback: 6h-22h si l'API échoue.
+    Fallback: 6h-22h si l'API échoue, mis en cache pour SUN_CACHE_FALLBACK_TTL secondes seulement.
     """
-    cache_key = f"{date_str}_{latitude:.1f}_{longitude:.1f}"
+    cache_key = (date_str, round(latitude, 1), round(longitude, 1))
 
-    if cache_key in _sun_times_cache:
-        return _sun_times_cache[cache_key]
+    cached = _sun_times_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    return await _sun_times_inflight.run(cache_key, lambda: _fetch_sun_times(cache_key, date_str, latitude, longitude))
+
+
+async def _fetch_sun_times(
+    cache_key: tuple[str, float, float], date_str: str, latitude: float, longitude: float
+) -> dict[str, time]:
+    """Appelle l'API sunrise-sunset.org et met le résultat (ou le repli) en cache."""
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(
-                "https://api.sunrise-sunset.org/json",
-                params={
-                    "lat": latitude,
-                    "lng": longitude,
-                    "date": date_str,
-                    "formatted": 0,
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("status") == "OK":
-                results = data["results"]
-                # Parse ISO format: "2024-01-15T07:30:00+00:00"
-                sunrise = datetime.fromisoformat(results["sunrise"].replace("Z", "+00:00")).time()
-                sunset = datetime.fromisoformat(results["sunset"].replace("Z", "+00:00")).time()
-
-                sun_times = {"sunrise": sunrise, "sunset": sunset}
-                _sun_times_cache[cache_key] = sun_times
-                return sun_times
+        response = await get_http_client().get(
+            "https://api.sunrise-sunset.org/json",
+            params={
+                "lat": latitude,
+                "lng": longitude,
+                "date": date_str,
+                "formatted": 0,
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("status") == "OK":
+            results = data["results"]
+            # Parse ISO format: "2024-01-15T07:30:00+00:00"
+            sunrise = datetime.fromisoformat(results["sunrise"].replace("Z", "+00:00")).time()
+            sunset = datetime.fromisoformat(results["sunset"].replace("Z", "+00:00")).time()
+
+            sun_times = {"sunrise": sunrise, "sunset": sunset}
+            _sun_times_cache.set(cache_key, sun_times)
+            return sun_times
     except Exception:
         logger.warning("Failed to fetch sun times from API, using fallback", exc_info=True)
 
     # Fallback: 6h-22h
     fallback = {"sunrise": time(6, 0), "sunset": time(22, 0)}
-    _sun_times_cache[cache_key] = fallback
+    _sun_times_cache.set(cache_key, fallback, ttl=SUN_CACHE_FALLBACK_TTL)
     return fallback
 
 
+def get_sun_cache_stats() -> dict[str, int]:
+    """Statistiques du cache des horaires du soleil et des appels API dédupliqués."""
+    return {
+        **_sun_times_cache.stats(),
+        "inflight": len(_sun_times_inflight),
+        "coalesced": _sun_times_inflight.coalesced,
+    }
+
+
+def _get_local_sun_minutes(sun_keys: Sequence[tuple[date, str]]) -> list[tuple[int, int]]:
+    """
+    Retourne (lever, coucher) en minutes UTC pour chaque couple (date, département).
+
+    Lecture dans la table précalculée mappée en mémoire; les couples hors table
+    sont calculés en un seul appel vectorisé.
+    """
+    looked_up = [sun_table.lookup(departement, date_obj) for date_obj, departement in sun_keys]
+    missing = [i for i, result in enumerate(looked_up) if result is None]
+
+    computed: dict[int, tuple[int, int]] = {}
+    if missing:
+        coords = [_get_departement_coords(sun_keys[i][1]) for i in missing]
+        sunrises, sunsets = sun_times_minutes(
+            np.array([sun_keys[i][0] for i in missing], dtype="datetime64[D]"),
+            np.array([latitude for latitude, _ in coords]),
+            np.array([longitude for _, longitude in coords]),
+        )
+        sun_minutes = zip(to_whole_minutes(sunrises).tolist(), to_whole_minutes(sunsets).tolist(), strict=True)
+        computed = dict(zip(missing, sun_minutes, strict=True))
+
+    return [result if result is not None else computed[i] for i, result in enumerate(looked_up)]
+
+
 def _is_night(hour: int, minute: int, sunrise: time, sunset: time) -> int:
     """Détermine si c'est la nuit (avant lever ou après coucher du soleil)."""
     current = time(hour, minute)
@@ -178,6 +241,14 @@ def _is_night(hour: int, minute: int, sunrise: time, sunset: time) -> int:
     return 0
 
 
+def _is_night_minutes(hour: int, minute: int, sunrise: int, sunset: int) -> int:
+    """Détermine si c'est la nuit, horaires du soleil exprimés en minutes depuis minuit."""
+    current = hour * 60 + minute
+    if current < sunrise or current >= sunset:
+        return 1
+    return 0
+
+
 def _is_rush_hour(hour: int) -> int:
     """Détermine si c'est l'heure de pointe (7-9h ou 17-19h)."""
     if 7 <= hour < 9 or 17 <= hour < 19:
@@ -195,6 +266,30 @@ def _is_weekend(date_obj: date) -> int:
     return 1 if date_obj.weekday() >= 5 else 0
 
 
+def _build_features(
+    date_obj: date,
+    hour: int,
+    est_nuit: int,
+    agg: bool,
+    vma: int,
+    impl_vehicule_leger: bool,
+    impl_poids_lourd: bool,
+    impl_pieton: bool,
+) -> dict[str, Any]:
+    """Assemble le dictionnaire des 9 features à partir des entrées déjà parsées."""
+    return {
+        "est_nuit": est_nuit,
+        "est_heure_pointe": _is_rush_hour(hour),
+        "jour_semaine": _get_day_of_week(date_obj),
+        "est_weekend": _is_weekend(date_obj),
+        "agg": 1 if agg else 0,
+        "vma": vma,
+        "impl_vehicule_leger": 1 if impl_vehicule_leger else 0,
+        "impl_poids_lourd": 1 if impl_poids_lourd else 0,
+        "impl_pieton": 1 if impl_pieton else 0,
+    }
+
+
 async def derive_all_features(
     date_str: str,
     heure_str: str,
@@ -221,16 +316,56 @@ async def derive_all_features(
     latitude, longitude = _get_departement_coords(departement)
 
     # Horaires du soleil
-    sun_times = await _get_sun_times(date_str, latitude, longitude)
+    if SUN_TIMES_MODE == "api":
+        sun_times = await _get_sun_times(date_str, latitude, longitude)
+        est_nuit = _is_night(hour, minute, sun_times["sunrise"], sun_times["sunset"])
+    else:
+        sunrise, sunset = _get_local_sun_minutes([(date_obj, departement)])[0]
+        est_nuit = _is_night_minutes(hour, minute, sunrise, sunset)
 
-    return {
-        "est_nuit": _is_night(hour, minute, sun_times["sunrise"], sun_times["sunset"]),
-        "est_heure_pointe": _is_rush_hour(hour),
-        "jour_semaine": _get_day_of_week(date_obj),
-        "est_weekend": _is_weekend(date_obj),
-        "agg": 1 if agg else 0,
-        "vma": vma,
-        "impl_vehicule_leger": 1 if impl_vehicule_leger else 0,
-        "impl_poids_lourd": 1 if impl_poids_lourd else 0,
-        "impl_pieton": 1 if impl_pieton else 0,
-    }
+    return _build_features(date_obj, hour, est_nuit, agg, vma, impl_vehicule_leger, impl_poids_lourd, impl_pieton)
+
+
+async def derive_features_batch(inputs: Sequence[AccidentInput]) -> list[dict[str, Any]]:
+    """
+    Dérive les features d'un lot d'entrées.
+
+    Les horaires du soleil ne sont résolus qu'une fois par couple (date, département)
+    distinct: lecture de la table précalculée (ou calcul vectorisé) en mode "local",
+    appels parallèles en mode "api".
+    """
+    # Coordonnées validées en amont: un département inconnu fait échouer tout le lot
+    coords = {item.departement: _get_departement_coords(item.departement) for item in inputs}
+
+    sun_keys = list(dict.fromkeys((item.date, item.departement) for item in inputs))
+    if SUN_TIMES_MODE == "api":
+        sun_results = await asyncio.gather(
+            *(_get_sun_times(date_str, *coords[departement]) for date_str, departement in sun_keys)
+        )
+        sun_times_by_key = dict(zip(sun_keys, sun_results, strict=True))
+    else:
+        sun_minutes = _get_local_sun_minutes([(date.fromisoformat(d), departement) for d, departement in sun_keys])
+        sun_minutes_by_key = dict(zip(sun_keys, sun_minutes, strict=True))
+
+    features_list = []
+    for item in inputs:
+        hour, minute = map(int, item.heure.split(":"))
+        key = (item.date, item.departement)
+        if SUN_TIMES_MODE == "api":
+            sun_times = sun_times_by_key[key]
+            est_nuit = _is_night(hour, minute, sun_times["sunrise"], sun_times["sunset"])
+        else:
+            est_nuit = _is_night_minutes(hour, minute, *sun_minutes_by_key[key])
+        features_list.append(
+            _build_features(
+                date.fromisoformat(item.date),
+                hour,
+                est_nuit,
+                item.agg,
+                item.vma,
+                item.impl_vehicule_leger,
+                item.impl_poids_lourd,
+                item.impl_pieton,
+            )
+        )
+    return features_list
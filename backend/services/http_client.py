@@ -0,0 +1,53 @@
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Client HTTP partagé pour les appels sortants (pool de connexions + keep-alive)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "5.0"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2.0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+
+_client: httpx.AsyncClient | None = None
+
+
+def init_http_client() -> httpx.AsyncClient:
+    """Crée le client HTTP partagé de l'application (appelé dans le lifespan)."""
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        logger.info(
+            "Client HTTP initialisé (max_connections=%d, max_keepalive=%d, timeout=%ss)",
+            HTTP_MAX_CONNECTIONS,
+            HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            HTTP_TIMEOUT,
+        )
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Retourne le client HTTP partagé (créé à la demande hors lifespan)."""
+    if _client is None or _client.is_closed:
+        return init_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Ferme le client HTTP partagé et ses connexions (appelé à l'arrêt)."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import os
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+from services.ml_service import load_model
+
+logger = logging.getLogger(__name__)
+
+# Exécution de l'inférence hors de la boucle d'événements:
+# - INFERENCE_EXECUTOR: "thread" (défaut) ou "process" (un modèle chargé par processus)
+# - INFERENCE_WORKERS: nombre de workers du pool
+# - INFERENCE_MAX_PENDING: inférences en cours + en attente au-delà desquelles les requêtes sont rejetées
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "64"))
+
+if INFERENCE_EXECUTOR not in ("thread", "process"):
+    raise ValueError(f"INFERENCE_EXECUTOR invalide: {INFERENCE_EXECUTOR} (attendu: 'thread' ou 'process')")
+
+_executor: Executor | None = None
+_pending = 0
+_rejected = 0
+
+
+class InferenceOverloadedError(RuntimeError):
+    """File d'inférence pleine: la requête est rejetée plutôt que mise en attente sans limite."""
+
+
+def start_executor() -> Executor:
+    """Crée le pool d'inférence (appelé dans le lifespan)."""
+    global _executor
+
+    if _executor is None:
+        if INFERENCE_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=INFERENCE_WORKERS, initializer=load_model)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+        logger.info(
+            "Pool d'inférence démarré (%s, workers=%d, max_pending=%d)",
+            INFERENCE_EXECUTOR,
+            INFERENCE_WORKERS,
+            INFERENCE_MAX_PENDING,
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Arrête le pool d'inférence en attendant la fin des inférences en cours."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def restart_executor() -> None:
+    """
+    Remplace le pool d'inférence par un pool neuf (rechargement du modèle en mode "process").
+
+    Les inférences déjà soumises terminent dans l'ancien pool, arrêté sans attente.
+    """
+    global _executor
+
+    previous, _executor = _executor, None
+    start_executor()
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+async def run_inference[R](fn: Callable[..., R], *args: Any) -> R:
+    """
+    Exécute fn(*args) dans le pool d'inférence sans bloquer la boucle d'événements.
+
+    Raises:
+        InferenceOverloadedError: si INFERENCE_MAX_PENDING inférences sont déjà en cours ou en attente
+    """
+    global _pending, _rejected
+
+    if _pending >= INFERENCE_MAX_PENDING:
+        _rejected += 1
+        raise InferenceOverloadedError(f"File d'inférence pleine ({INFERENCE_MAX_PENDING} requêtes en attente)")
+
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(start_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+def get_inference_stats() -> dict[str, Any]:
+    """État du pool d'inférence (charge et rejets)."""
+    return {
+        "executor": INFERENCE_EXECUTOR,
+        "workers": INFERENCE_WORKERS,
+        "pending": _pending,
+        "max_pending": INFERENCE_MAX_PENDING,
+        "rejected": _rejected,
+    }
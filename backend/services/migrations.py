@@ -0,0 +1,256 @@
+"""
+Migrations ponctuelles de la table predictions, lancées explicitement (jamais au démarrage de l'API):
+    python -m services.migrations [--batch-size 10000]
+
+Conversion de l'ancienne colonne JSON predictions.features en colonnes typées:
+- les colonnes sont ajoutées sans valeur par défaut (pas de réécriture de la table);
+- elles sont remplies par lots de batch_size lignes (clé: id croissant), chaque lot dans sa
+  propre transaction: les écritures ne sont jamais bloquées longtemps et une migration
+  interrompue reprend où elle s'était arrêtée;
+- NOT NULL est posé grâce à une contrainte CHECK validée sans verrou exclusif, ce qui évite
+  le parcours de la table sous ACCESS EXCLUSIVE, puis la colonne JSON est supprimée.
+
+Les lignes écrites pendant la migration par une version précédente de l'API (JSON seul)
+doivent être remplies avant la dernière étape: arrêter ces instances avant, ou relancer la
+commande (idempotente) si la validation échoue.
+
+Index déclarés sur le modèle et absents de la table existante (create_all ne les crée qu'avec
+la table): construits par CREATE INDEX CONCURRENTLY, hors transaction, sans bloquer les
+écritures. Une table partitionnée reçoit l'index sur la table parente seule (ON ONLY), puis un
+index construit en parallèle sur chaque partition et rattaché à celui de la parente. Un index
+laissé invalide par une construction interrompue est supprimé puis reconstruit.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import Connection, Index, inspect, text
+
+from database import Base, engine
+from models import Prediction
+from services.partitions import is_partitioned, list_partitions
+
+logger = logging.getLogger(__name__)
+
+TABLE = Prediction.__tablename__
+DEFAULT_BATCH_SIZE = 10_000
+
+# Verrou consultatif sérialisant les migrations (une seule commande à la fois)
+_MIGRATION_LOCK_KEY = 7_420_253
+# Attente maximale d'un verrou par les DDL: une requête longue fait échouer l'étape au lieu
+# de bloquer derrière elle toutes les requêtes sur la table
+_LOCK_TIMEOUT = "5s"
+
+_FEATURES_CHECK = f"{TABLE}_features_not_null"
+
+_INVALID_INDEXES = text(
+    "SELECT index_class.relname FROM pg_index "
+    "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+    "WHERE pg_index.indrelid = to_regclass(:table) AND NOT pg_index.indisvalid"
+)
+
+_ADD_FEATURE_COLUMNS = text(
+    f"ALTER TABLE {TABLE} "
+    "ADD COLUMN IF NOT EXISTS est_nuit boolean, "
+    "ADD COLUMN IF NOT EXISTS est_heure_pointe boolean, "
+    "ADD COLUMN IF NOT EXISTS jour_semaine smallint, "
+    "ADD COLUMN IF NOT EXISTS est_weekend boolean"
+)
+# Identifiants construits à partir de constantes du module, jamais d'entrées utilisateur
+_NEXT_BATCH_END = text(
+    f"SELECT max(id) FROM (SELECT id FROM {TABLE} WHERE id > :after ORDER BY id LIMIT :n) AS batch"  # nosec B608
+)
+_BACKFILL_BATCH = text(
+    f"UPDATE {TABLE} SET "  # nosec B608
+    "est_nuit = (features->>'est_nuit')::int = 1, "
+    "est_heure_pointe = (features->>'est_heure_pointe')::int = 1, "
+    "jour_semaine = (features->>'jour_semaine')::smallint, "
+    "est_weekend = (features->>'est_weekend')::int = 1 "
+    "WHERE id > :after AND id <= :until AND est_nuit IS NULL"
+)
+_FINALIZE_FEATURES = (
+    text(f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS {_FEATURES_CHECK}"),
+    text(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {_FEATURES_CHECK} CHECK ("
+        "est_nuit IS NOT NULL AND est_heure_pointe IS NOT NULL "
+        "AND jour_semaine IS NOT NULL AND est_weekend IS NOT NULL) NOT VALID"
+    ),
+)
+_VALIDATE_FEATURES = text(f"ALTER TABLE {TABLE} VALIDATE CONSTRAINT {_FEATURES_CHECK}")
+# La contrainte validée dispense SET NOT NULL de parcourir la table
+_DROP_JSON_FEATURES = text(
+    f"ALTER TABLE {TABLE} "
+    "ALTER COLUMN est_nuit SET NOT NULL, "
+    "ALTER COLUMN est_heure_pointe SET NOT NULL, "
+    "ALTER COLUMN jour_semaine SET NOT NULL, "
+    "ALTER COLUMN est_weekend SET NOT NULL, "
+    f"DROP CONSTRAINT {_FEATURES_CHECK}, "
+    "DROP COLUMN features"
+)
+
+
+def has_json_features(connection: Connection) -> bool:
+    """La table predictions a-t-elle encore l'ancienne colonne JSON features ?"""
+    inspector = inspect(connection)
+    if not inspector.has_table(TABLE):
+        return False
+    return "features" in {column["name"] for column in inspector.get_columns(TABLE)}
+
+
+def _set_lock_timeout(connection: Connection) -> None:
+    """Limite l'attente des verrous de la transaction courante (voir _LOCK_TIMEOUT)."""
+    connection.execute(text(f"SET LOCAL lock_timeout = '{_LOCK_TIMEOUT}'"))
+
+
+def add_feature_columns(connection: Connection) -> None:
+    """Ajoute les colonnes typées, nullables et sans valeur par défaut (modification du catalogue seule)."""
+    _set_lock_timeout(connection)
+    connection.execute(_ADD_FEATURE_COLUMNS)
+
+
+def backfill_features_batch(connection: Connection, after: int, batch_size: int) -> tuple[int, int] | None:
+    """
+    Remplit les colonnes typées des batch_size lignes d'identifiant supérieur à after.
+
+    Returns:
+        Tuple (dernier identifiant du lot, lignes modifiées), None quand il n'y a plus de lignes
+    """
+    until = connection.execute(_NEXT_BATCH_END, {"after": after, "n": batch_size}).scalar()
+    if until is None:
+        return None
+    result = connection.execute(_BACKFILL_BATCH, {"after": after, "until": until})
+    return until, result.rowcount
+
+
+def finalize_features(connection: Connection) -> None:
+    """Déclare la contrainte CHECK (NOT VALID: sans parcours de la table)."""
+    _set_lock_timeout(connection)
+    for statement in _FINALIZE_FEATURES:
+        connection.execute(statement)
+
+
+def validate_features(connection: Connection) -> None:
+    """Valide la contrainte CHECK (verrou SHARE UPDATE EXCLUSIVE: lectures et écritures continuent)."""
+    connection.execute(_VALIDATE_FEATURES)
+
+
+def drop_json_features(connection: Connection) -> None:
+    """Pose NOT NULL sur les colonnes typées et supprime la colonne JSON (catalogue seul)."""
+    _set_lock_timeout(connection)
+    connection.execute(_DROP_JSON_FEATURES)
+
+
+def _invalid_indexes(connection: Connection, table: str) -> set[str]:
+    """Index d'une table laissés invalides (construction concurrente interrompue, parente partiellement rattachée)."""
+    return set(connection.execute(_INVALID_INDEXES, {"table": table}).scalars().all())
+
+
+def missing_indexes(connection: Connection) -> list[Index]:
+    """Index déclarés sur le modèle absents de la table, ou présents mais invalides."""
+    inspector = inspect(connection)
+    if not inspector.has_table(TABLE):
+        return []
+    existing = {index["name"] for index in inspector.get_indexes(TABLE)}
+    invalid = _invalid_indexes(connection, TABLE)
+    return sorted(
+        (index for index in Base.metadata.tables[TABLE].indexes if index.name not in existing or index.name in invalid),
+        key=lambda index: str(index.name),
+    )
+
+
+def _partition_index_name(partition: str, index: Index) -> str:
+    """Nom de l'index d'une partition (ex: predictions_y2024m06_created_at_id pour ix_predictions_created_at_id)."""
+    return f"{partition}_{str(index.name).removeprefix(f'ix_{TABLE}_')}"
+
+
+def _build_index(connection: Connection, table: str, name: str, columns: str) -> None:
+    """CREATE INDEX CONCURRENTLY, après suppression d'un index du même nom laissé invalide."""
+    if name in _invalid_indexes(connection, table):
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    connection.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def build_missing_indexes(connection: Connection) -> list[str]:
+    """
+    Construit les index manquants par CREATE INDEX CONCURRENTLY (connexion en AUTOCOMMIT).
+
+    Returns:
+        Noms des index construits
+    """
+    preparer = connection.dialect.identifier_preparer
+    partitioned = is_partitioned(connection)
+    built = []
+    for index in missing_indexes(connection):
+        name = str(index.name)
+        columns = ", ".join(preparer.quote(column.name) for column in index.columns)
+        if partitioned:
+            # Index de la parente seule (invalide tant que toutes les partitions ne sont pas rattachées)
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {TABLE} ({columns})"))
+            for partition in sorted(list_partitions(connection)):
+                child = _partition_index_name(partition, index)
+                _build_index(connection, partition, child, columns)
+                connection.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+        else:
+            _build_index(connection, TABLE, name, columns)
+        built.append(name)
+        logger.info("Index %s construit", name)
+    return built
+
+
+async def create_missing_indexes() -> None:
+    """Construit les index manquants hors transaction (CREATE INDEX CONCURRENTLY l'exige)."""
+    async with engine.connect() as conn:
+        autocommit = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        built = await autocommit.run_sync(build_missing_indexes)
+    if not built:
+        logger.info("Aucun index manquant sur %s", TABLE)
+
+
+async def migrate_json_features(batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+    """Convertit la colonne JSON predictions.features en colonnes typées, par lots de batch_size lignes."""
+    async with engine.connect() as conn:
+        if not await conn.run_sync(has_json_features):
+            logger.info("Table %s sans colonne JSON features: rien à migrer", TABLE)
+            return
+
+    async with engine.begin() as conn:
+        await conn.run_sync(add_feature_columns)
+
+    after, updated = 0, 0
+    while True:
+        async with engine.begin() as conn:
+            batch = await conn.run_sync(backfill_features_batch, after, batch_size)
+        if batch is None:
+            break
+        after, rows = batch
+        updated += rows
+        logger.info("Features typées remplies jusqu'à l'id %d (%d lignes)", after, updated)
+
+    for step in (finalize_features, validate_features, drop_json_features):
+        async with engine.begin() as conn:
+            await conn.run_sync(step)
+    logger.info("Colonne JSON %s.features migrée (%d lignes); lancer VACUUM FULL %s", TABLE, updated, TABLE)
+
+
+async def _migrate(batch_size: int) -> None:
+    """Lance les migrations en attente, une seule commande à la fois."""
+    async with engine.connect() as conn:
+        # Verrou de session pris hors transaction: la connexion ne reste pas « idle in transaction »
+        lock_conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+        try:
+            await migrate_json_features(batch_size)
+            await create_missing_indexes()
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Migrations ponctuelles de la table predictions")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Lignes par transaction")
+    args = parser.parse_args()
+
+    asyncio.run(_migrate(args.batch_size))
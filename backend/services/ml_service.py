@@ -1,14 +1,31 @@
+import hashlib
+import io
 import logging
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections.abc import Sequence
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 import joblib
-import pandas as pd
+import numpy as np
+
+from services import native_model, preprocessing, score_table
+from services.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 # Chemin vers le modèle
 MODEL_PATH = Path(__file__).parent.parent / "ml_models" / "model_accident_binary_optimized.joblib"
+# Format chargé: "auto" (export natif s'il existe à côté de MODEL_PATH et a été produit à partir
+# de ce .joblib, sinon .joblib), "native" ou "joblib"
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+
+if MODEL_FORMAT not in ("auto", "native", "joblib"):
+    raise ValueError(f"MODEL_FORMAT invalide: {MODEL_FORMAT} (attendu: 'auto', 'native' ou 'joblib')")
 
 # Features dans l'ordre attendu par le modèle
 FEATURE_ORDER = [
@@ -23,32 +40,311 @@ FEATURE_ORDER = [
     "impl_pieton",
 ]
 
-# Variables globales pour le pipeline
-_model = None
-_imputer = None
-_scaler = None
+# Seuil de décision appliqué à la probabilité de la classe "grave"
+# (identique au seuil par défaut de predict() pour XGBoost, CatBoost et sklearn)
+DECISION_THRESHOLD = 0.5
+
+# Cache des résultats par vecteur de features (0 = désactivé); l'espace des features ne compte
+# que quelques milliers de vecteurs distincts.
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+# Base SQLite optionnelle partagée entre workers et processus (vide = cache en mémoire seulement)
+PREDICTION_CACHE_PATH = os.getenv("PREDICTION_CACHE_PATH", "")
+
+# Longueur (caractères hexadécimaux de l'empreinte SHA-256 du fichier) de la version du modèle
+MODEL_VERSION_LENGTH = 12
+# Lignes du lot synthétique de préchauffage d'un modèle avant sa mise en service
+WARMUP_ROWS = 64
+
+
+class ModelBundle(NamedTuple):
+    """
+    Pipeline chargé et sa version, remplacé d'un bloc au rechargement du modèle.
+
+    Le cache des résultats appartient au bundle: un nouveau modèle démarre avec un
+    cache vide et ne reçoit jamais les résultats d'un autre.
+    """
+
+    model: Any
+    imputer: Any
+    scaler: Any
+    version: str
+    results: TTLCache[tuple[float, ...], tuple[int, float]]
+
+    def score(self, matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Applique le pipeline du bundle à une matrice de features (voir score_pipeline)."""
+        return score_pipeline(self.model, self.imputer, self.scaler, matrix)
+
+
+def create_bundle(model: Any, imputer: Any = None, scaler: Any = None, version: str = "") -> ModelBundle:
+    """
+    Construit un bundle avec un cache des résultats vide.
+
+    Le preprocessing reconnu (imputer et scaler, à part ou en étapes d'un Pipeline) est
+    remplacé par le noyau fusionné (voir preprocessing.fuse_pipeline).
+    """
+    model, imputer, scaler = preprocessing.fuse_pipeline(model, imputer, scaler)
+    return ModelBundle(model, imputer, scaler, version, TTLCache(maxsize=max(PREDICTION_CACHE_SIZE, 1)))
+
+
+# Modèle en service: une seule référence, remplacée atomiquement par load_model()
+_bundle: ModelBundle | None = None
+_load_lock = threading.Lock()
+
+# Base SQLite partagée du cache des résultats (PREDICTION_CACHE_PATH)
+_result_store: sqlite3.Connection | None = None
+_result_store_lock = threading.Lock()
+# Une erreur de la base partagée est journalisée au plus une fois par intervalle (s)
+_RESULT_STORE_WARNING_INTERVAL = 60.0
+_result_store_warned_at: float | None = None
+
+
+def artifact_paths() -> list[Path]:
+    """
+    Fichiers lus par _read_artifact selon MODEL_FORMAT: .joblib, métadonnées de l'export natif
+    et booster qu'elles désignent (absent de la liste si les métadonnées sont illisibles).
+    """
+    metadata = native_model.metadata_path(MODEL_PATH)
+    if MODEL_FORMAT == "joblib":
+        return [MODEL_PATH]
+    paths = [MODEL_PATH, metadata] if MODEL_FORMAT == "auto" else [metadata]
+    try:
+        paths.append(native_model.booster_path(metadata))
+    except (OSError, ValueError, KeyError):
+        pass
+    return paths
+
 
+def _read_artifact() -> tuple[dict[str, Any], bytes]:
+    """
+    Lit l'artefact du modèle: export natif (métadonnées .json à côté de MODEL_PATH) ou .joblib.
 
-def load_model() -> None:
-    """Charge le modèle et les transformateurs depuis le fichier joblib."""
-    global _model, _imputer, _scaler
+    En mode auto, un export natif dont l'empreinte source_sha256 ne correspond pas au .joblib
+    présent est ignoré (avec un avertissement) au profit du .joblib.
 
+    Returns:
+        Tuple (artefact: model, imputer, scaler, feature_names; octets lus, pour la version)
+    """
+    metadata = native_model.metadata_path(MODEL_PATH)
+    if MODEL_FORMAT == "native" or (MODEL_FORMAT == "auto" and metadata.exists() and not MODEL_PATH.exists()):
+        return native_model.load_native_model(metadata)
     if not MODEL_PATH.exists():
         raise FileNotFoundError(f"Modèle non trouvé: {MODEL_PATH}")
+    # Version et modèle proviennent des mêmes octets, même si le fichier est remplacé entre-temps
+    raw = MODEL_PATH.read_bytes()
+    if MODEL_FORMAT == "auto" and metadata.exists():
+        if native_model.is_export_of(metadata, raw):
+            return native_model.load_native_model(metadata)
+        # .joblib remplacé (réentraînement) sans nouvel export: l'export natif n'est plus ce modèle
+        logger.warning("Export natif %s périmé (source_sha256 différente de %s): .joblib chargé", metadata, MODEL_PATH)
+    return joblib.load(io.BytesIO(raw)), raw
+
+
+def _read_bundle() -> ModelBundle:
+    """Lit le modèle et vérifie l'ordre de ses features."""
+    data, raw = _read_artifact()
+
+    # Les entrées sont passées en tableau NumPy: l'ordre des colonnes doit être celui de l'entraînement
+    feature_names = data.get("feature_names")
+    if feature_names is not None and list(feature_names) != FEATURE_ORDER:
+        raise ValueError(f"Ordre des features du modèle inattendu: {list(feature_names)} (attendu: {FEATURE_ORDER})")
 
-    data = joblib.load(MODEL_PATH)
-    _model = data["model"]
-    # imputer/scaler are only present for CatBoost models
+    # imputer/scaler are only present for CatBoost models and native exports
     # For sklearn Pipelines (XGBoost, RF, etc.), preprocessing is included in the model
-    _imputer = data.get("imputer")
-    _scaler = data.get("scaler")
+    version = hashlib.sha256(raw).hexdigest()[:MODEL_VERSION_LENGTH]
+    return create_bundle(data["model"], data.get("imputer"), data.get("scaler"), version)
+
+
+def load_model() -> ModelBundle:
+    """
+    Charge le modèle (export natif ou MODEL_PATH, voir MODEL_FORMAT) et le met en service.
+
+    Le nouveau pipeline est lu, vérifié et préchauffé sur un lot synthétique avant de
+    remplacer le précédent d'un bloc: les prédictions en cours terminent avec l'ancien
+    bundle, les suivantes utilisent le nouveau. Si le fichier n'a pas changé (même
+    version), le bundle en service est conservé.
+    """
+    global _bundle
+
+    with _load_lock:
+        bundle = _read_bundle()
+        if _bundle is not None and _bundle.version == bundle.version:
+            return _bundle
+
+        matrix = score_table.domain_matrix(list(score_table.DEFAULT_VMA_VALUES))
+        bundle.score(matrix[np.linspace(0, len(matrix) - 1, WARMUP_ROWS, dtype=np.intp)])
+        score_table.load_score_table(bundle.model, bundle.score, bundle.version)
+
+        _bundle = bundle
+        logger.info("Modèle %s en service (%s)", bundle.version, type(bundle.model).__name__)
+        return bundle
+
+
+def get_bundle() -> ModelBundle:
+    """Retourne le modèle en service (chargé au premier appel)."""
+    bundle = _bundle
+    return bundle if bundle is not None else load_model()
+
+
+def get_model_version() -> str | None:
+    """Version du modèle en service, None s'il n'est pas encore chargé."""
+    bundle = _bundle
+    return bundle.version if bundle is not None else None
 
 
 def get_pipeline() -> tuple:
     """Retourne le pipeline complet (model, imputer, scaler)."""
-    if _model is None:
-        load_model()
-    return _model, _imputer, _scaler
+    bundle = get_bundle()
+    return bundle.model, bundle.imputer, bundle.scaler
+
+
+def _get_threshold(model: Any) -> float:
+    """Retourne le seuil de décision du modèle (seuil CatBoost personnalisé si défini)."""
+    get_threshold = getattr(model, "get_probability_threshold", None)
+    threshold = get_threshold() if callable(get_threshold) else None
+    return float(threshold) if isinstance(threshold, int | float) else DECISION_THRESHOLD
+
+
+def _get_result_store() -> sqlite3.Connection:
+    """Connexion (ouverte au premier appel) à la base SQLite partagée du cache des résultats."""
+    global _result_store
+
+    if _result_store is None:
+        _result_store = sqlite3.connect(PREDICTION_CACHE_PATH, timeout=1.0, check_same_thread=False)
+        _result_store.execute("PRAGMA journal_mode=WAL")
+        _result_store.execute(
+            "CREATE TABLE IF NOT EXISTS prediction_cache ("
+            "model TEXT NOT NULL, features TEXT NOT NULL, gravite INTEGER NOT NULL, probabilite REAL NOT NULL, "
+            "PRIMARY KEY (model, features))"
+        )
+    return _result_store
+
+
+def _result_store_failed(action: str, error: sqlite3.Error) -> None:
+    """Journalise une erreur de la base partagée (au plus une fois par _RESULT_STORE_WARNING_INTERVAL)."""
+    global _result_store_warned_at
+
+    now = time.monotonic()
+    if _result_store_warned_at is None or now - _result_store_warned_at >= _RESULT_STORE_WARNING_INTERVAL:
+        _result_store_warned_at = now
+        logger.warning("Cache partagé %s indisponible (%s ignorée): %s", PREDICTION_CACHE_PATH, action, error)
+
+
+def _cache_key(features: dict[str, Any]) -> tuple[float, ...]:
+    """Clé du cache des résultats: les features dans l'ordre du modèle, en flottants."""
+    return tuple(float(features[name]) for name in FEATURE_ORDER)
+
+
+def _cache_lookup(bundle: ModelBundle, key: tuple[float, ...]) -> tuple[int, float] | None:
+    """
+    Résultat en cache pour un vecteur de features (mémoire puis base partagée), ou None.
+
+    Une erreur de la base partagée (verrouillée, corrompue) est journalisée et vaut absence en cache.
+
+    La base partagée est indexée par la version du modèle: un nouveau modèle ne reçoit
+    jamais les résultats d'un autre.
+    """
+    if PREDICTION_CACHE_SIZE <= 0:
+        return None
+
+    cached = bundle.results.get(key)
+    if cached is None and PREDICTION_CACHE_PATH:
+        try:
+            with _result_store_lock:
+                row = (
+                    _get_result_store()
+                    .execute(
+                        "SELECT gravite, probabilite FROM prediction_cache WHERE model = ? AND features = ?",
+                        (bundle.version, repr(key)),
+                    )
+                    .fetchone()
+                )
+        except sqlite3.Error as e:
+            # Le cache ne fait jamais échouer une prédiction: une erreur vaut absence en cache
+            _result_store_failed("lecture", e)
+            return None
+        if row is not None:
+            cached = (int(row[0]), float(row[1]))
+            bundle.results.set(key, cached)
+    return cached
+
+
+def _cache_store(bundle: ModelBundle, entries: Sequence[tuple[tuple[float, ...], int, float]]) -> None:
+    """
+    Enregistre les résultats (clé, gravite, probabilité) d'un lot de vecteurs de features.
+
+    Le cache mémoire est mis à jour par entrée; la base partagée reçoit tout le lot en un
+    seul executemany, dans une seule transaction; une erreur de la base partagée est
+    journalisée et l'écriture abandonnée.
+    """
+    if PREDICTION_CACHE_SIZE <= 0 or not entries:
+        return
+    for key, gravite, prob_grave in entries:
+        bundle.results.set(key, (gravite, prob_grave))
+    if PREDICTION_CACHE_PATH:
+        rows = [(bundle.version, repr(key), gravite, prob_grave) for key, gravite, prob_grave in entries]
+        try:
+            with _result_store_lock, _get_result_store() as store:
+                store.executemany("INSERT OR REPLACE INTO prediction_cache VALUES (?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            _result_store_failed("écriture", e)
+
+
+def get_prediction_cache_stats() -> dict[str, Any]:
+    """Taille et compteurs du cache des résultats du modèle en service (enabled=False s'il est désactivé)."""
+    if PREDICTION_CACHE_SIZE <= 0:
+        return {"enabled": False}
+    bundle = _bundle
+    stats = bundle.results.stats() if bundle is not None else {}
+    return {"enabled": True, "shared_store": bool(PREDICTION_CACHE_PATH), **stats}
+
+
+def format_result(gravite: int, prob_grave: float) -> dict[str, Any]:
+    """Construit le dictionnaire de résultat renvoyé par l'API."""
+    return {
+        "gravite": gravite,
+        "probabilite_grave": round(prob_grave, 4),
+        "label": "Grave" if gravite == 1 else "Non grave",
+    }
+
+
+def _to_matrix(features_list: Sequence[dict[str, Any]]) -> np.ndarray:
+    """Range les features dans une matrice float64 (une ligne par entrée, colonnes dans FEATURE_ORDER)."""
+    matrix = np.empty((len(features_list), len(FEATURE_ORDER)), dtype=np.float64)
+    for row, features in zip(matrix, features_list, strict=True):
+        row[:] = [features[name] for name in FEATURE_ORDER]
+    return matrix
+
+
+def score_pipeline(model: Any, imputer: Any, scaler: Any, matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Applique un pipeline (model, imputer, scaler) à une matrice de features.
+
+    Un seul passage du modèle: la classe est dérivée de predict_proba avec le seuil
+    du modèle; predict n'est appelé que si le modèle n'expose pas de probabilités.
+
+    Returns:
+        Tuple (classes int, probabilités de la classe grave float64)
+    """
+    # Apply preprocessing if imputer/scaler exist (fused kernel, or CatBoost / native export as loaded)
+    # Otherwise, model is a Pipeline that handles its own preprocessing
+    # Les transformateurs sklearn ajustés sur un DataFrame avertissent à chaque appel avec un tableau
+    # NumPy; l'ordre des colonnes étant vérifié au chargement (feature_names), l'avertissement est
+    # ignoré ici seulement.
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+        input_data = matrix
+        if imputer is not None:
+            input_data = imputer.transform(input_data)
+        if scaler is not None:
+            input_data = scaler.transform(input_data)
+
+        if hasattr(model, "predict_proba"):
+            probas = np.asarray(model.predict_proba(input_data), dtype=np.float64)[:, 1]
+            predictions = (probas > _get_threshold(model)).astype(int)
+        else:
+            predictions = np.asarray(model.predict(input_data), dtype=int)
+            probas = predictions.astype(np.float64)
+    return predictions, probas
 
 
 def predict(features_dict: dict[str, Any]) -> dict[str, Any]:
@@ -60,46 +356,54 @@ def predict(features_dict: dict[str, Any]) -> dict[str, Any]:
 
     Returns:
         Dictionnaire avec gravite (0/1), probabilite_grave (float), label (str)
+        et model_version (version du modèle qui a servi la prédiction)
     """
-    logger.info("--- Début du pipeline de prédiction ---")
-    model, imputer, scaler = get_pipeline()
+    logger.debug("Valeurs brutes: %s", features_dict)
+    # Une seule lecture du modèle en service: un rechargement concurrent n'affecte pas cette prédiction
+    bundle = get_bundle()
+    key = _cache_key(features_dict)
+    cached = score_table.lookup(bundle.model, key) or _cache_lookup(bundle, key)
+    if cached is None:
+        # Ligne unique dans l'ordre attendu par le modèle (sans DataFrame)
+        row = np.fromiter(key, dtype=np.float64, count=len(FEATURE_ORDER))
+        predictions, probas = bundle.score(row.reshape(1, -1))
+        cached = (int(predictions[0]), float(probas[0]))
+        _cache_store(bundle, [(key, *cached)])
 
-    # Créer le DataFrame avec les features dans le bon ordre
-    df = pd.DataFrame([features_dict])[FEATURE_ORDER]
-    logger.info(f"DataFrame créé avec colonnes: {list(df.columns)}")
-    logger.info(f"Valeurs brutes: {df.iloc[0].to_dict()}")
+    result = {**format_result(*cached), "model_version": bundle.version}
+    logger.debug("Label: %s (probabilité grave: %.4f)", result["label"], cached[1])
+    return result
 
-    # Apply preprocessing if imputer/scaler exist (CatBoost)
-    # Otherwise, model is a Pipeline that handles its own preprocessing
-    if imputer is not None and scaler is not None:
-        df_imputed = imputer.transform(df)
-        logger.info(f"Après imputation: {df_imputed[0].tolist()}")
-        df_scaled = scaler.transform(df_imputed)
-        logger.info(f"Après scaling: {df_scaled[0].tolist()}")
-        input_data = df_scaled
-    else:
-        logger.info("Modèle Pipeline - preprocessing intégré")
-        input_data = df
-
-    # Prédiction
-    prediction = int(model.predict(input_data)[0])
-    logger.info(f"Prédiction brute du modèle: {prediction}")
-
-    # Probabilités
-    if hasattr(model, "predict_proba"):
-        proba = model.predict_proba(input_data)[0]
-        prob_grave = float(proba[1])
-        logger.info(f"Probabilités: [Non grave: {proba[0]:.4f}, Grave: {proba[1]:.4f}]")
-    else:
-        prob_grave = float(prediction)
-        logger.info("Le modèle n'a pas de predict_proba")
-
-    # Label
-    label = "Grave" if prediction == 1 else "Non grave"
-    logger.info(f"--- Fin du pipeline - Label: {label} ---")
 
-    return {
-        "gravite": prediction,
-        "probabilite_grave": round(prob_grave, 4),
-        "label": label,
-    }
+def predict_batch(features_list: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Effectue les prédictions d'un lot de features en une seule passe du modèle.
+
+    Args:
+        features_list: Liste de dictionnaires avec les 9 features
+
+    Returns:
+        Liste de dictionnaires avec gravite (0/1), probabilite_grave (float), label (str)
+        et model_version (tout le lot est servi par le même modèle)
+    """
+    if not features_list:
+        return []
+
+    logger.debug("Prédiction par lot: %d lignes", len(features_list))
+    bundle = get_bundle()
+    keys = [_cache_key(features) for features in features_list]
+    results = [score_table.lookup(bundle.model, key) or _cache_lookup(bundle, key) for key in keys]
+
+    # Seules les lignes absentes de la table et du cache passent par le modèle, en une seule passe
+    missing = [index for index, cached in enumerate(results) if cached is None]
+    if missing:
+        predictions, probas = bundle.score(_to_matrix([features_list[index] for index in missing]))
+        scored = [
+            (keys[index], gravite, prob_grave)
+            for index, gravite, prob_grave in zip(missing, predictions.tolist(), probas.tolist(), strict=True)
+        ]
+        for index, (_, gravite, prob_grave) in zip(missing, scored, strict=True):
+            results[index] = (gravite, prob_grave)
+        _cache_store(bundle, scored)
+
+    return [{**format_result(*cached), "model_version": bundle.version} for cached in results if cached is not None]
@@ -0,0 +1,138 @@
+"""
+Registre des modèles servis par /predict/{model_name}.
+
+Chaque fichier model_<nom>.joblib du répertoire MODEL_REGISTRY_DIR est enregistré sous <nom>.
+L'artefact est soit un dictionnaire (model, imputer, scaler, feature_names), comme le modèle
+principal, soit un estimateur seul accompagné de la liste features_<nom>.joblib, comme les
+modèles par catégorie de passager.
+
+Les modèles sont chargés à la première prédiction puis gardés en mémoire; au-delà de
+MODEL_REGISTRY_MAX_LOADED modèles chargés, le moins récemment utilisé est libéré.
+"""
+
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import joblib
+import numpy as np
+
+from services.cache import TTLCache
+from services.ml_service import format_result, score_pipeline
+from services.preprocessing import fuse_pipeline
+
+logger = logging.getLogger(__name__)
+
+MODEL_REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", str(Path(__file__).parent.parent / "ml_models")))
+MODEL_REGISTRY_MAX_LOADED = int(os.getenv("MODEL_REGISTRY_MAX_LOADED", "3"))
+
+_MODEL_PREFIX = "model_"
+_FEATURES_PREFIX = "features_"
+
+
+class ModelLoadError(RuntimeError):
+    """Artefact de modèle illisible ou incohérent avec sa liste de features."""
+
+
+class LoadedModel(NamedTuple):
+    """Pipeline chargé (preprocessing fusionné si reconnu) et ordre des features attendu par le modèle."""
+
+    model: Any
+    imputer: Any
+    scaler: Any
+    feature_names: list[str]
+
+
+# Modèles chargés (LRU) et verrou de chargement: un même artefact n'est lu qu'une fois
+_loaded: TTLCache[str, LoadedModel] = TTLCache(maxsize=max(MODEL_REGISTRY_MAX_LOADED, 1))
+_load_lock = threading.Lock()
+
+
+def list_models() -> list[str]:
+    """Noms des modèles enregistrés (fichiers model_<nom>.joblib de MODEL_REGISTRY_DIR)."""
+    return sorted(path.stem.removeprefix(_MODEL_PREFIX) for path in MODEL_REGISTRY_DIR.glob(f"{_MODEL_PREFIX}*.joblib"))
+
+
+def _read_artifact(name: str) -> LoadedModel:
+    """Lit l'artefact d'un modèle et vérifie l'ordre de ses features."""
+    path = MODEL_REGISTRY_DIR / f"{_MODEL_PREFIX}{name}.joblib"
+    features_path = MODEL_REGISTRY_DIR / f"{_FEATURES_PREFIX}{name}.joblib"
+    try:
+        data = joblib.load(path)
+        listed = joblib.load(features_path) if features_path.exists() else None
+    except Exception as e:
+        raise ModelLoadError(f"Modèle '{name}' illisible: {e}") from e
+
+    if not isinstance(data, dict):
+        data = {"model": data}
+    declared = data.get("feature_names")
+    feature_names = [str(feature) for feature in (declared if declared is not None else listed or [])]
+    if not feature_names:
+        raise ModelLoadError(f"Modèle '{name}' sans liste de features ({features_path.name} absent)")
+    if declared is not None and listed is not None and list(listed) != feature_names:
+        raise ModelLoadError(f"Modèle '{name}': {features_path.name} ne correspond pas à feature_names")
+
+    # Les entrées sont passées en tableau NumPy: l'ordre doit être celui de l'entraînement
+    fitted = getattr(data["model"], "feature_names_in_", None)
+    if fitted is not None and [str(feature) for feature in fitted] != feature_names:
+        raise ModelLoadError(f"Modèle '{name}': ordre des features inattendu {list(fitted)} (attendu: {feature_names})")
+
+    model, imputer, scaler = fuse_pipeline(data["model"], data.get("imputer"), data.get("scaler"))
+    return LoadedModel(model, imputer, scaler, feature_names)
+
+
+def get_model(name: str) -> LoadedModel:
+    """
+    Retourne un modèle enregistré, chargé au premier appel.
+
+    Raises:
+        KeyError: si aucun modèle n'est enregistré sous ce nom
+        ModelLoadError: si l'artefact est illisible ou incohérent
+    """
+    loaded = _loaded.get(name)
+    if loaded is not None:
+        return loaded
+
+    if name not in list_models():
+        raise KeyError(f"Modèle inconnu: {name}")
+    with _load_lock:
+        # Chargé par un autre thread pendant l'attente du verrou; le miss a déjà été compté
+        loaded = _loaded.peek(name)
+        if loaded is None:
+            loaded = _read_artifact(name)
+            _loaded.set(name, loaded)
+            logger.info("Modèle '%s' chargé (%d features)", name, len(loaded.feature_names))
+    return loaded
+
+
+def predict_with_model(name: str, features: dict[str, float | None]) -> dict[str, Any]:
+    """
+    Prédit avec un modèle enregistré à partir de ses features nommées.
+
+    Les features absentes du modèle sont refusées; None est transmis comme valeur
+    manquante (NaN) à l'imputer du pipeline.
+
+    Raises:
+        ValueError: si des features manquent ou ne sont pas attendues par le modèle
+    """
+    loaded = get_model(name)
+    missing = [feature for feature in loaded.feature_names if feature not in features]
+    unexpected = sorted(set(features) - set(loaded.feature_names))
+    if missing or unexpected:
+        raise ValueError(f"Features invalides pour '{name}': manquantes {missing}, inattendues {unexpected}")
+
+    row = np.fromiter(
+        (math.nan if features[feature] is None else features[feature] for feature in loaded.feature_names),
+        dtype=np.float64,
+        count=len(loaded.feature_names),
+    )
+    predictions, probas = score_pipeline(loaded.model, loaded.imputer, loaded.scaler, row.reshape(1, -1))
+    return format_result(int(predictions[0]), float(probas[0]))
+
+
+def get_registry_stats() -> dict[str, Any]:
+    """Modèles enregistrés et modèles chargés en mémoire (avec les compteurs du LRU)."""
+    return {"models": list_models(), **_loaded.stats()}
@@ -0,0 +1,130 @@
+"""
+Rechargement à chaud du modèle, sans redémarrage ni requête interrompue.
+
+Le nouveau fichier est chargé hors de la boucle d'événements, préchauffé puis mis en
+service d'un bloc (voir ml_service.load_model). Le rechargement est déclenché par
+POST /model/reload (worker uvicorn qui reçoit la requête) ou, si MODEL_WATCH_INTERVAL > 0,
+par la surveillance des fichiers lus au chargement (MODEL_PATH, export natif et son
+booster) dans chaque worker.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Any
+
+from services import inference_executor, ml_service
+
+logger = logging.getLogger(__name__)
+
+# Intervalle (s) de surveillance du fichier du modèle (0 = désactivée)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+
+_reload_lock = asyncio.Lock()
+_watch_task: asyncio.Task[None] | None = None
+_reloads = 0
+_failures = 0
+_last_error: str | None = None
+
+
+class ModelReloadError(RuntimeError):
+    """Échec du rechargement: le modèle précédent reste en service."""
+
+
+async def reload_model() -> dict[str, Any]:
+    """
+    Recharge MODEL_PATH et met le nouveau modèle en service.
+
+    En mode d'inférence "process", le pool est remplacé pour que ses workers chargent
+    le nouveau modèle; les inférences en cours terminent dans l'ancien pool.
+
+    Raises:
+        ModelReloadError: si le fichier est absent, illisible ou incohérent
+    """
+    global _reloads, _failures, _last_error
+
+    async with _reload_lock:
+        previous = ml_service.get_model_version()
+        try:
+            bundle = await asyncio.to_thread(ml_service.load_model)
+        except Exception as e:
+            _failures += 1
+            _last_error = str(e)
+            logger.exception("Échec du rechargement du modèle, version %s conservée", previous)
+            raise ModelReloadError(f"Rechargement impossible, version {previous} conservée: {e}") from e
+
+        reloaded = bundle.version != previous
+        if reloaded:
+            _reloads += 1
+            if inference_executor.INFERENCE_EXECUTOR == "process":
+                inference_executor.restart_executor()
+            logger.info("Modèle rechargé: %s -> %s", previous, bundle.version)
+        return {"version": bundle.version, "previous_version": previous, "reloaded": reloaded}
+
+
+def _file_signature() -> tuple[tuple[str, tuple[int, int] | None], ...]:
+    """
+    Date de modification et taille (None si absent) de chaque fichier lu au chargement du modèle:
+    .joblib, métadonnées de l'export natif et booster qu'elles désignent (voir ml_service.artifact_paths).
+    """
+    signature: list[tuple[str, tuple[int, int] | None]] = []
+    for path in ml_service.artifact_paths():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            signature.append((path.name, None))
+        else:
+            signature.append((path.name, (stat.st_mtime_ns, stat.st_size)))
+    return tuple(signature)
+
+
+async def _watch_loop() -> None:
+    """Recharge le modèle quand son fichier change; une erreur est journalisée sans arrêter la boucle."""
+    signature = _file_signature()
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        current = _file_signature()
+        if current == signature:
+            continue
+        signature = current
+        with contextlib.suppress(ModelReloadError):
+            result = await reload_model()
+            if not result["reloaded"]:
+                # Fichier réécrit à l'identique, ou fichier modifié qui n'est pas celui servi
+                logger.warning(
+                    "Fichiers du modèle modifiés mais version %s inchangée: %s",
+                    result["version"],
+                    ", ".join(name for name, _ in current),
+                )
+
+
+def start_model_watcher() -> None:
+    """Démarre la surveillance du fichier du modèle si MODEL_WATCH_INTERVAL > 0 (appelé dans le lifespan)."""
+    global _watch_task
+
+    if MODEL_WATCH_INTERVAL > 0 and _watch_task is None:
+        _watch_task = asyncio.create_task(_watch_loop(), name="model-watcher")
+
+
+async def stop_model_watcher() -> None:
+    """Arrête la surveillance du fichier du modèle."""
+    global _watch_task
+
+    if _watch_task is not None:
+        _watch_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _watch_task
+        _watch_task = None
+
+
+def get_model_stats() -> dict[str, Any]:
+    """Version du modèle en service et compteurs de rechargement."""
+    return {
+        "version": ml_service.get_model_version(),
+        "path": ml_service.MODEL_PATH.name,
+        "reloads": _reloads,
+        "failures": _failures,
+        "last_error": _last_error,
+        "watch_interval": MODEL_WATCH_INTERVAL,
+    }
@@ -0,0 +1,115 @@
+"""
+Chargement du modèle exporté au format natif du booster (voir ML/functions/model_selection.py).
+
+L'export se compose d'un fichier JSON de métadonnées, placé à côté du .joblib (même nom,
+extension .json), et du booster au format natif (XGBoost UBJSON ou CatBoost .cbm). Les
+métadonnées portent l'empreinte SHA-256 du .joblib exporté (source_sha256): un export
+dont l'empreinte ne correspond plus au .joblib présent est périmé.
+Le preprocessing (SimpleImputer, StandardScaler) est reconstitué en NumPy à partir des
+paramètres du JSON: ni pickle, ni sklearn au chargement. Seule la bibliothèque du booster
+utilisé est importée.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+NATIVE_FORMATS = ("xgboost-ubj", "catboost-cbm")
+
+
+class NativeImputer:
+    """Remplace les valeurs manquantes (NaN) par les statistiques d'un SimpleImputer ajusté."""
+
+    def __init__(self, statistics: list[float]) -> None:
+        self.statistics = np.asarray(statistics, dtype=np.float64)
+
+    def transform(self, matrix: np.ndarray) -> np.ndarray:
+        """Matrice imputée (copie)."""
+        return np.where(np.isnan(matrix), self.statistics, matrix)
+
+
+class NativeScaler:
+    """Centre et réduit les colonnes avec les paramètres d'un StandardScaler ajusté."""
+
+    def __init__(self, mean: list[float], scale: list[float]) -> None:
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, matrix: np.ndarray) -> np.ndarray:
+        """Matrice centrée réduite (copie)."""
+        return (matrix - self.mean) / self.scale
+
+
+class NativeClassifier:
+    """Booster binaire chargé depuis son format natif, exposant predict_proba comme les estimateurs sklearn."""
+
+    def __init__(self, native_format: str, path: Path, threshold: float | None = None) -> None:
+        if native_format not in NATIVE_FORMATS:
+            raise ValueError(f"Format natif inconnu: {native_format} (attendu: {', '.join(NATIVE_FORMATS)})")
+        self.native_format = native_format
+        self.threshold = threshold
+        if native_format == "xgboost-ubj":
+            import xgboost
+
+            self._booster: Any = xgboost.Booster(model_file=str(path))
+        else:
+            import catboost
+
+            self._booster = catboost.CatBoost().load_model(str(path), format="cbm")
+
+    def predict_proba(self, matrix: np.ndarray) -> np.ndarray:
+        """Probabilités (classe 0, classe 1) pour chaque ligne."""
+        if self.native_format == "xgboost-ubj":
+            proba = np.asarray(self._booster.inplace_predict(matrix), dtype=np.float64)
+        else:
+            proba = np.asarray(self._booster.predict(matrix, prediction_type="Probability"), dtype=np.float64)[:, 1]
+        return np.column_stack([1.0 - proba, proba])
+
+    def get_probability_threshold(self) -> float | None:
+        """Seuil de décision enregistré à l'export (CatBoost), None sinon."""
+        return self.threshold
+
+
+def metadata_path(model_path: Path) -> Path:
+    """Chemin du fichier de métadonnées de l'export natif associé à un .joblib."""
+    return model_path.with_suffix(".json")
+
+
+def booster_path(path: Path) -> Path:
+    """Chemin du booster (model_file) décrit par un fichier de métadonnées."""
+    model_file: str = json.loads(path.read_bytes())["model_file"]
+    return path.parent / model_file
+
+
+def is_export_of(path: Path, source: bytes) -> bool:
+    """L'export natif décrit par le fichier de métadonnées path a-t-il été produit à partir de source (.joblib) ?"""
+    source_sha256: str | None = json.loads(path.read_bytes()).get("source_sha256")
+    return source_sha256 == hashlib.sha256(source).hexdigest()
+
+
+def load_native_model(path: Path) -> tuple[dict[str, Any], bytes]:
+    """
+    Charge un export natif à partir de son fichier de métadonnées.
+
+    Returns:
+        Tuple (artefact au format du .joblib: model, imputer, scaler, model_name, feature_names;
+        octets des métadonnées et du booster, pour calculer la version du modèle)
+    """
+    raw_metadata = path.read_bytes()
+    metadata = json.loads(raw_metadata)
+    model_file = path.parent / metadata["model_file"]
+    raw_booster = model_file.read_bytes()
+
+    imputer = metadata.get("imputer")
+    scaler = metadata.get("scaler")
+    data = {
+        "model": NativeClassifier(metadata["format"], model_file, metadata.get("threshold")),
+        "imputer": NativeImputer(imputer["statistics"]) if imputer else None,
+        "scaler": NativeScaler(scaler["mean"], scaler["scale"]) if scaler else None,
+        "model_name": metadata.get("model_name"),
+        "feature_names": metadata["feature_names"],
+    }
+    return data, raw_metadata + raw_booster
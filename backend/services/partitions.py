@@ -0,0 +1,256 @@
+"""
+Partitionnement mensuel de la table predictions (PARTITION BY RANGE (created_at)).
+
+Les partitions du mois courant et des PARTITION_MONTHS_AHEAD mois suivants sont créées
+à l'avance; une partition par défaut reçoit les lignes hors plage. Les lignes d'un mois
+arrivées dans la partition par défaut sont déplacées dans la partition du mois à sa création
+(sans quoi PostgreSQL refuse de la créer). La rétention détache puis supprime les partitions
+entières de plus de PARTITION_RETENTION_MONTHS mois (DETACH PARTITION puis DROP TABLE, sans
+DELETE) et purge les lignes expirées de la partition par défaut.
+La maintenance s'exécute au démarrage puis toutes les PARTITION_MAINTENANCE_INTERVAL secondes.
+
+Conversion d'une table predictions existante (non partitionnée), à lancer une fois:
+    python -m services.partitions --migrate
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import re
+from datetime import UTC, date, datetime
+
+from sqlalchemy import Connection, text
+
+from database import Base, engine, init_db
+from models import Prediction
+
+logger = logging.getLogger(__name__)
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "2"))
+# Mois complets conservés en plus du mois courant (0 = pas de rétention)
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", "21600"))
+
+TABLE = Prediction.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+_PARTITION_NAME = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+# Verrou consultatif sérialisant la maintenance entre workers uvicorn
+_MAINTENANCE_LOCK_KEY = 7_420_252
+
+_maintenance_task: asyncio.Task[None] | None = None
+
+
+def add_months(month: date, months: int) -> date:
+    """Premier jour du mois situé months mois après celui de month."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Nom de la partition couvrant le mois de month (ex: predictions_y2024m06)."""
+    return f"{TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """La table predictions est-elle une table partitionnée ?"""
+    relkind = connection.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": TABLE})
+    return relkind.scalar() == "p"
+
+
+def list_partitions(connection: Connection) -> list[str]:
+    """Noms des partitions de la table predictions."""
+    result = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ),
+        {"table": TABLE},
+    )
+    return list(result.scalars().all())
+
+
+def _month_start(month: date) -> datetime:
+    """Début (UTC) du mois de month."""
+    return datetime(month.year, month.month, 1, tzinfo=UTC)
+
+
+def _create_partition(connection: Connection, month: date) -> None:
+    """
+    Crée la partition du mois de month.
+
+    Les lignes de ce mois déjà présentes dans la partition par défaut sont déplacées dans
+    la nouvelle table avant son rattachement: PostgreSQL refuse sinon la création.
+    """
+    name = partition_name(month)
+    upper = add_months(month, 1)
+    bounds = f"FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+    params = {"lower": _month_start(month), "upper": _month_start(upper)}
+    # Identifiants construits à partir de constantes du module, jamais d'entrées utilisateur
+    stranded = connection.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "  # nosec B608
+            "WHERE created_at >= :lower AND created_at < :upper)"
+        ),
+        params,
+    ).scalar()
+    if not stranded:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}"))
+        return
+
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "  # nosec B608
+            "WHERE created_at >= :lower AND created_at < :upper RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        params,
+    )
+    connection.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    logger.info("Partition %s créée avec %d lignes reprises de %s", name, moved.rowcount, DEFAULT_PARTITION)
+
+
+def ensure_partitions(connection: Connection, first_month: date, last_month: date) -> None:
+    """Crée la partition par défaut et les partitions mensuelles manquantes de first_month à last_month inclus."""
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+    existing = set(list_partitions(connection))
+    month = add_months(first_month, 0)
+    while month <= last_month:
+        if partition_name(month) not in existing:
+            _create_partition(connection, month)
+        month = add_months(month, 1)
+
+
+def drop_expired_partitions(connection: Connection, today: date, retention_months: int) -> list[str]:
+    """
+    Supprime les partitions entièrement antérieures à la période de rétention.
+
+    Sont conservés le mois courant et les retention_months mois précédents. Chaque partition
+    est détachée avant d'être supprimée; les lignes expirées de la partition par défaut sont
+    supprimées.
+    """
+    cutoff = add_months(today, -retention_months)
+    dropped = []
+    for name in sorted(list_partitions(connection)):
+        match = _PARTITION_NAME.match(name)
+        if match and add_months(date(int(match[1]), int(match[2]), 1), 1) <= cutoff:
+            connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    if dropped:
+        logger.info("Partitions supprimées (rétention de %d mois): %s", retention_months, ", ".join(dropped))
+    purged = connection.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at < :cutoff"),  # nosec B608
+        {"cutoff": _month_start(cutoff)},
+    )
+    if purged.rowcount:
+        logger.info("%d lignes expirées supprimées de %s", purged.rowcount, DEFAULT_PARTITION)
+    return dropped
+
+
+def maintain_partitions(connection: Connection, today: date) -> None:
+    """Crée les partitions à venir et applique la rétention."""
+    if not is_partitioned(connection):
+        logger.warning("Table %s non partitionnée: lancer `python -m services.partitions --migrate`", TABLE)
+        return
+    ensure_partitions(connection, today, add_months(today, PARTITION_MONTHS_AHEAD))
+    if PARTITION_RETENTION_MONTHS > 0:
+        drop_expired_partitions(connection, today, PARTITION_RETENTION_MONTHS)
+
+
+def migrate_to_partitioned(connection: Connection, today: date) -> None:
+    """
+    Convertit une table predictions ordinaire en table partitionnée.
+
+    L'ancienne table est renommée, la table partitionnée créée avec ses partitions
+    (du mois de la plus ancienne prédiction jusqu'aux mois à venir), les lignes copiées,
+    la séquence des identifiants repositionnée, puis l'ancienne table supprimée.
+    """
+    if is_partitioned(connection):
+        logger.info("Table %s déjà partitionnée", TABLE)
+        return
+
+    legacy = f"{TABLE}_legacy"
+    connection.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+    # Les noms de la clé primaire et des index restent attachés à l'ancienne table: on les libère
+    connection.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {TABLE}_pkey TO {legacy}_pkey"))
+    table = Base.metadata.tables[TABLE]
+    for index in table.indexes:
+        connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    table.create(connection)
+
+    # Identifiants construits à partir de constantes du module, jamais d'entrées utilisateur
+    oldest = connection.execute(text(f"SELECT min(created_at) FROM {legacy}")).scalar()  # nosec B608
+    first_month = oldest.date() if oldest is not None else today
+    ensure_partitions(connection, first_month, add_months(today, PARTITION_MONTHS_AHEAD))
+
+    columns = ", ".join(column.name for column in table.columns)
+    connection.execute(text(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {legacy}"))  # nosec B608
+    max_id = connection.execute(text(f"SELECT COALESCE(max(id), 0) FROM {TABLE}")).scalar_one()  # nosec B608
+    connection.execute(
+        text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :next_id, false)"),
+        {"table": TABLE, "next_id": max_id + 1},
+    )
+    connection.execute(text(f"DROP TABLE {legacy}"))
+    logger.info("Table %s convertie en table partitionnée", TABLE)
+
+
+async def run_partition_maintenance() -> None:
+    """Exécute la maintenance des partitions dans sa propre transaction."""
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK_KEY})
+        await conn.run_sync(maintain_partitions, datetime.now(UTC).date())
+
+
+async def _maintenance_loop() -> None:
+    """Relance la maintenance à intervalle régulier; une erreur est journalisée sans arrêter la boucle."""
+    while True:
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+        try:
+            await run_partition_maintenance()
+        except Exception:
+            logger.exception("Échec de la maintenance des partitions")
+
+
+def start_partition_maintenance() -> None:
+    """Démarre la maintenance périodique des partitions (appelé dans le lifespan)."""
+    global _maintenance_task
+
+    if _maintenance_task is None:
+        _maintenance_task = asyncio.create_task(_maintenance_loop(), name="partition-maintenance")
+
+
+async def stop_partition_maintenance() -> None:
+    """Arrête la maintenance périodique des partitions."""
+    global _maintenance_task
+
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _maintenance_task
+        _maintenance_task = None
+
+
+async def _migrate() -> None:
+    """Initialise la base puis convertit la table predictions en table partitionnée."""
+    await init_db()
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK_KEY})
+        await conn.run_sync(migrate_to_partitioned, datetime.now(UTC).date())
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Partitionnement mensuel de la table predictions")
+    parser.add_argument("--migrate", action="store_true", help="Convertit une table existante non partitionnée")
+    args = parser.parse_args()
+
+    if args.migrate:
+        asyncio.run(_migrate())
+    else:
+        asyncio.run(run_partition_maintenance())
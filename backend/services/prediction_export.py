@@ -0,0 +1,144 @@
+"""
+Export en flux de l'historique des prédictions (NDJSON, CSV, Parquet).
+
+Les lignes sont lues par un curseur côté serveur (db.stream, yield_per) et
+sérialisées paquet par paquet: la mémoire utilisée ne dépend que de
+EXPORT_CHUNK_SIZE, pas de la taille de la table.
+"""
+
+import csv
+import io
+import os
+from collections.abc import AsyncIterator, Callable, Sequence
+from datetime import datetime
+from typing import Any, Literal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic_core import to_json
+from sqlalchemy import JSON
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Prediction
+from schemas import PredictionFilters
+from services.prediction_service import history_query
+
+# Nombre de lignes lues par aller-retour avec la base et sérialisées ensemble
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+type ExportFormat = Literal["ndjson", "csv", "parquet"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _csv_value(value: Any) -> Any:
+    """Valeur d'une cellule CSV (dict/list en JSON, dates en ISO 8601)."""
+    if isinstance(value, dict | list):
+        return to_json(value).decode()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _ParquetSink:
+    """
+    Fichier en écriture minimal pour ParquetWriter: les octets écrits sont récupérés
+    par take() après chaque row group, la position totale reste exacte pour le footer.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_encoder(fields: Sequence[str]) -> tuple[Callable[[Sequence[dict[str, Any]]], bytes], Callable[[], bytes]]:
+    """Encodeur Parquet: un row group par paquet de lignes; les colonnes JSON sont écrites en texte."""
+    column_types = {name: getattr(Prediction, name).expression.type for name in fields}
+    json_fields = [name for name in fields if isinstance(column_types[name], JSON)]
+
+    def arrow_type(name: str) -> Any:
+        if name in json_fields:
+            return pa.string()
+        python_type = column_types[name].python_type
+        if python_type is datetime:
+            return pa.timestamp("us", tz="UTC")
+        return {int: pa.int64(), float: pa.float64(), bool: pa.bool_(), str: pa.string()}[python_type]
+
+    schema = pa.schema([(name, arrow_type(name)) for name in fields])
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def encode(rows: Sequence[dict[str, Any]]) -> bytes:
+        for row in rows:
+            for name in json_fields:
+                row[name] = to_json(row[name]).decode()
+        writer.write_table(pa.Table.from_pylist(list(rows), schema=schema))
+        return sink.take()
+
+    def close() -> bytes:
+        writer.close()
+        return sink.take()
+
+    return encode, close
+
+
+async def stream_predictions(
+    db: AsyncSession, fmt: ExportFormat, fields: Sequence[str], filters: PredictionFilters | None = None
+) -> AsyncIterator[bytes]:
+    """
+    Produit l'export de l'historique (colonnes fields, filtres éventuels) par paquets d'octets.
+
+    Les prédictions sont exportées de la plus ancienne à la plus récente.
+    """
+    query = (
+        history_query(filters, fields)
+        .order_by(Prediction.created_at, Prediction.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    result = await db.stream(query)
+
+    if fmt == "parquet":
+        encode, close = _parquet_encoder(fields)
+        async for partition in result.mappings().partitions():
+            yield encode([dict(row) for row in partition])
+        yield close()
+        return
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(fields)
+        yield buffer.getvalue().encode()
+        async for partition in result.mappings().partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(row[name]) for name in fields] for row in partition)
+            yield buffer.getvalue().encode()
+        return
+
+    async for partition in result.mappings().partitions():
+        yield b"".join(to_json(dict(row)) + b"\n" for row in partition)
@@ -1,32 +1,84 @@
+import base64
+import binascii
 import logging
 from collections.abc import Sequence
+from datetime import datetime
 from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, RowMapping, Select, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import Prediction
-from schemas import AccidentInput, PredictionResponse
-from services.feature_service import derive_all_features
-from services.ml_service import predict
+from schemas import AccidentInput, PredictionFilters, PredictionHistory, PredictionResponse
+from services.batcher import predict_single
+from services.feature_service import derive_all_features, derive_features_batch
+from services.inference_executor import run_inference
+from services.ml_service import predict_batch
+from services.prediction_trace import PredictionTrace
+from services.prediction_writer import get_prediction_writer
 
 logger = logging.getLogger(__name__)
 
+# Colonnes toujours renvoyées par l'historique: clé de tri et de pagination
+HISTORY_KEY_FIELDS = ("id", "created_at")
 
-async def create_prediction(data: AccidentInput, db: AsyncSession) -> PredictionResponse:
+
+def _prediction_values(data: AccidentInput, features: dict[str, Any], result: dict[str, Any]) -> dict[str, Any]:
+    """Valeurs des colonnes de la table predictions pour une prédiction."""
+    return {
+        "input_date": data.date,
+        "input_heure": data.heure,
+        "input_departement": data.departement,
+        "input_agg": data.agg,
+        "input_vma": data.vma,
+        "input_impl_vehicule_leger": data.impl_vehicule_leger,
+        "input_impl_poids_lourd": data.impl_poids_lourd,
+        "input_impl_pieton": data.impl_pieton,
+        "est_nuit": bool(features["est_nuit"]),
+        "est_heure_pointe": bool(features["est_heure_pointe"]),
+        "jour_semaine": features["jour_semaine"],
+        "est_weekend": bool(features["est_weekend"]),
+        "gravite": result["gravite"],
+        "probabilite_grave": result["probabilite_grave"],
+        "label": result["label"],
+    }
+
+
+async def _insert_predictions(
+    db: AsyncSession, rows: list[dict[str, Any]], return_id: bool
+) -> Sequence[tuple[int | None, datetime | None]]:
+    """
+    Insère des prédictions en une seule requête et valide la transaction.
+
+    Avec return_id, l'id et la date d'enregistrement générés par la base sont lus par
+    INSERT ... RETURNING (dans l'ordre des lignes), sans SELECT après le commit.
+    Sans return_id, l'INSERT ne renvoie rien et les valeurs retournées sont None.
+    """
+    if not return_id:
+        await db.execute(insert(Prediction), rows)
+        await db.commit()
+        return [(None, None)] * len(rows)
+
+    stmt = insert(Prediction).returning(Prediction.id, Prediction.created_at, sort_by_parameter_order=True)
+    generated = [(row.id, row.created_at) for row in (await db.execute(stmt, rows)).all()]
+    await db.commit()
+    return generated
+
+
+async def create_prediction(data: AccidentInput, db: AsyncSession, return_id: bool = True) -> PredictionResponse:
     """
     Orchestre la création d'une prédiction complète.
 
     1. Dérive les features depuis les données brutes
-    2. Appelle le modèle ML
-    3. Persiste le résultat en base de données
+    2. Appelle le modèle ML (micro-batching éventuel, pool d'inférence hors boucle d'événements)
+    3. Persiste le résultat en base de données (ou le place dans la file d'écriture différée)
+
+    Avec return_id=False, la réponse ne contient ni id ni created_at.
     """
-    logger.info("=" * 50)
-    logger.info("Nouvelle requête de prédiction reçue")
-    logger.info(f"Données d'entrée: {data.model_dump()}")
+    trace = PredictionTrace()
+    logger.debug("Nouvelle requête de prédiction: %s", data)
 
     # Dériver les features
-    logger.info("Dérivation des features...")
     features: dict[str, Any] = await derive_all_features(
         date_str=data.date,
         heure_str=data.heure,
@@ -37,39 +89,161 @@ async def create_prediction(data: AccidentInput, db: AsyncSession) -> Prediction
         impl_poids_lourd=data.impl_poids_lourd,
         impl_pieton=data.impl_pieton,
     )
-    logger.info(f"Features dérivées: {features}")
+    logger.debug("Features dérivées: %s", features)
+    trace.mark("features", input=data, features=features)
 
     # Prédiction ML
-    logger.info("Appel du modèle de prédiction...")
-    result = predict(features)
-    logger.info(f"Résultat de la prédiction: {result}")
+    result = await predict_single(features)
+    logger.debug("Résultat de la prédiction: %s", result)
+    trace.mark("model", result=result)
 
     # Persistance en base de données
-    prediction_record = Prediction(
-        input_date=data.date,
-        input_heure=data.heure,
-        input_departement=data.departement,
-        input_agg=data.agg,
-        input_vma=data.vma,
-        input_impl_vehicule_leger=data.impl_vehicule_leger,
-        input_impl_poids_lourd=data.impl_poids_lourd,
-        input_impl_pieton=data.impl_pieton,
-        features=features,
-        gravite=result["gravite"],
-        probabilite_grave=result["probabilite_grave"],
-        label=result["label"],
-    )
-    db.add(prediction_record)
-    await db.commit()
-    await db.refresh(prediction_record)
-    logger.info(f"Prédiction sauvegardée avec ID: {prediction_record.id}")
-    logger.info("=" * 50)
+    writer = get_prediction_writer()
+    prediction_id: int | None
+    created_at: datetime | None = None
+    if writer is not None:
+        (prediction_id,) = await writer.enqueue([_prediction_values(data, features, result)])
+        logger.debug("Prédiction mise en file d'écriture avec ID: %s", prediction_id)
+    else:
+        ((prediction_id, created_at),) = await _insert_predictions(
+            db, [_prediction_values(data, features, result)], return_id
+        )
+        logger.debug("Prédiction sauvegardée avec ID: %s", prediction_id)
+    trace.mark("persistence", id=prediction_id)
+    trace.emit()
+
+    if not return_id:
+        return PredictionResponse(**result)
+    return PredictionResponse(id=prediction_id, created_at=created_at, **result)
+
+
+async def create_predictions_batch(
+    inputs: Sequence[AccidentInput], db: AsyncSession, return_id: bool = True
+) -> list[PredictionResponse]:
+    """
+    Orchestre la création d'un lot de prédictions.
+
+    1. Dérive les features de tout le lot
+    2. Appelle le modèle ML une seule fois sur la matrice complète
+    3. Persiste les résultats avec un unique INSERT multi-lignes
+
+    Avec return_id=False, les réponses ne contiennent ni id ni created_at.
+    """
+    trace = PredictionTrace()
+    logger.debug("Nouvelle requête de prédiction par lot: %d entrées", len(inputs))
+
+    features_list = await derive_features_batch(inputs)
+    trace.mark("features", batch_size=len(inputs))
+    results = await run_inference(predict_batch, features_list)
+    trace.mark("model")
+
+    rows = [
+        _prediction_values(data, features, result)
+        for data, features, result in zip(inputs, features_list, results, strict=True)
+    ]
+    generated = await _insert_predictions(db, rows, return_id)
+    logger.debug("%d prédictions sauvegardées", len(generated))
+    trace.mark("persistence")
+    trace.emit()
 
-    return PredictionResponse(id=prediction_record.id, **result)
+    return [
+        PredictionResponse(id=prediction_id, created_at=created_at, **result)
+        for (prediction_id, created_at), result in zip(generated, results, strict=True)
+    ]
 
 
-async def get_prediction_history(db: AsyncSession, limit: int, offset: int) -> Sequence[Prediction]:
-    """Récupère l'historique des prédictions avec pagination."""
-    query = select(Prediction).order_by(Prediction.created_at.desc()).limit(limit).offset(offset)
+def encode_cursor(created_at: datetime, prediction_id: int) -> str:
+    """Curseur opaque désignant la position d'une prédiction dans l'historique (created_at, id)."""
+    raw = f"{created_at.isoformat()}|{prediction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Décode un curseur produit par encode_cursor.
+
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, prediction_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(prediction_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Curseur invalide: {cursor!r}") from e
+
+
+def _filter_conditions(filters: PredictionFilters) -> list[ColumnElement[bool]]:
+    """Conditions SQL correspondant aux filtres renseignés."""
+    conditions: list[ColumnElement[bool]] = []
+    if filters.input_departement is not None:
+        conditions.append(Prediction.input_departement == filters.input_departement)
+    if filters.created_after is not None:
+        conditions.append(Prediction.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        conditions.append(Prediction.created_at < filters.created_before)
+    if filters.label is not None:
+        # Le label est dérivé de la gravité: filtrer sur gravite permet d'utiliser son index
+        conditions.append(Prediction.gravite == (1 if filters.label == "Grave" else 0))
+    if filters.gravite is not None:
+        conditions.append(Prediction.gravite == filters.gravite)
+    if filters.min_probabilite_grave is not None:
+        conditions.append(Prediction.probabilite_grave >= filters.min_probabilite_grave)
+    return conditions
+
+
+def parse_history_fields(fields: str | None) -> list[str]:
+    """
+    Colonnes de l'historique demandées par le paramètre fields (noms séparés par des virgules).
+
+    Sans fields, toutes les colonnes de PredictionHistory. id et created_at (clé de
+    pagination) sont toujours inclus; l'ordre suit celui de PredictionHistory.
+
+    Raises:
+        ValueError: Si un champ demandé n'existe pas
+    """
+    if fields is None:
+        return list(PredictionHistory.model_fields)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - PredictionHistory.model_fields.keys())
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(unknown)}")
+    return [name for name in PredictionHistory.model_fields if name in requested or name in HISTORY_KEY_FIELDS]
+
+
+def history_query(filters: PredictionFilters | None = None, fields: Sequence[str] | None = None) -> Select:
+    """Sélection des colonnes fields (par défaut celles de PredictionHistory) avec les filtres, sans tri ni limite."""
+    # Étiquetées par leur nom: les expressions SQL (features) sont ainsi nommées comme les colonnes
+    columns = [getattr(Prediction, name).label(name) for name in fields or PredictionHistory.model_fields]
+    query = select(*columns)
+    if filters is not None:
+        query = query.where(*_filter_conditions(filters))
+    return query
+
+
+async def get_prediction_history(
+    db: AsyncSession,
+    limit: int,
+    offset: int = 0,
+    after: str | None = None,
+    filters: PredictionFilters | None = None,
+    fields: Sequence[str] | None = None,
+) -> Sequence[RowMapping]:
+    """
+    Récupère l'historique des prédictions, de la plus récente à la plus ancienne.
+
+    Avec after (curseur de la dernière prédiction de la page précédente), la page est lue
+    par pagination par clé sur l'index (created_at, id): coût constant quelle que soit la
+    profondeur. Sinon limit/offset est appliqué (conservé pour compatibilité).
+    Les filtres éventuels sont appliqués en SQL.
+
+    Seules les colonnes fields (par défaut toutes celles de PredictionHistory) sont lues,
+    et les lignes sont retournées comme mappings, sans construction d'objets ORM.
+    """
+    query = history_query(filters, fields).order_by(Prediction.created_at.desc(), Prediction.id.desc()).limit(limit)
+    if after is not None:
+        query = query.where(tuple_(Prediction.created_at, Prediction.id) < decode_cursor(after))
+    else:
+        query = query.offset(offset)
     result = await db.execute(query)
-    return result.scalars().all()
+    return result.mappings().all()
@@ -0,0 +1,55 @@
+import json
+import logging
+import os
+import random
+import time
+from typing import Any
+
+# Trace structurée des prédictions: une ligne JSON par requête échantillonnée (0 = désactivé)
+PREDICTION_TRACE_SAMPLE_RATE = float(os.getenv("PREDICTION_TRACE_SAMPLE_RATE", "0"))
+
+trace_logger = logging.getLogger("prediction.trace")
+
+
+def _json_default(value: Any) -> Any:
+    """Sérialise les objets non JSON (schémas Pydantic, dates...)."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+class PredictionTrace:
+    """
+    Trace d'une prédiction: données de chaque étape et durées, émises en une seule ligne JSON.
+
+    Seule une fraction PREDICTION_TRACE_SAMPLE_RATE des requêtes est tracée; pour les autres,
+    mark() et emit() ne font rien. Les données sont conservées par référence et ne sont
+    sérialisées qu'à l'émission.
+    """
+
+    __slots__ = ("enabled", "fields", "durations_ms", "_last")
+
+    def __init__(self, enabled: bool | None = None) -> None:
+        if enabled is None:
+            # Échantillonnage statistique, pas un usage cryptographique
+            enabled = PREDICTION_TRACE_SAMPLE_RATE > 0 and random.random() < PREDICTION_TRACE_SAMPLE_RATE  # nosec B311
+        self.enabled = enabled and trace_logger.isEnabledFor(logging.INFO)
+        self.fields: dict[str, Any] = {}
+        self.durations_ms: dict[str, float] = {}
+        self._last = time.perf_counter() if self.enabled else 0.0
+
+    def mark(self, step: str, **fields: Any) -> None:
+        """Enregistre la durée de l'étape écoulée et les données associées."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.durations_ms[step] = round((now - self._last) * 1000, 3)
+        self._last = now
+        self.fields.update(fields)
+
+    def emit(self) -> None:
+        """Émet la trace (logger 'prediction.trace', niveau INFO)."""
+        if not self.enabled:
+            return
+        payload = {"event": "prediction_trace", **self.fields, "durations_ms": self.durations_ms}
+        trace_logger.info("%s", json.dumps(payload, default=_json_default, ensure_ascii=False))
@@ -0,0 +1,302 @@
+import asyncio
+import contextlib
+import logging
+import os
+from collections import deque
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from database import async_session
+from models import Prediction
+
+logger = logging.getLogger(__name__)
+
+# Persistance des prédictions unitaires: "sync" (commit avant la réponse) ou "write_behind"
+# (réponse immédiate, écriture en base par lots dans une tâche de fond)
+PERSISTENCE_MODE = os.getenv("PERSISTENCE_MODE", "sync")
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", "50"))
+# Nombre d'identifiants réservés d'un coup dans la séquence de la table
+WRITE_BEHIND_ID_BLOCK = int(os.getenv("WRITE_BEHIND_ID_BLOCK", "1000"))
+# Tentatives d'écriture d'un lot, attente (ms) doublée entre deux tentatives
+WRITE_BEHIND_RETRY_ATTEMPTS = int(os.getenv("WRITE_BEHIND_RETRY_ATTEMPTS", "3"))
+WRITE_BEHIND_RETRY_BACKOFF_MS = float(os.getenv("WRITE_BEHIND_RETRY_BACKOFF_MS", "100"))
+# Lignes en échec conservées (dead-letter) et intervalle (s) entre deux nouvelles tentatives
+WRITE_BEHIND_DEAD_LETTER_MAX = int(os.getenv("WRITE_BEHIND_DEAD_LETTER_MAX", "10000"))
+WRITE_BEHIND_DEAD_LETTER_RETRY_INTERVAL = float(os.getenv("WRITE_BEHIND_DEAD_LETTER_RETRY_INTERVAL", "30"))
+
+if PERSISTENCE_MODE not in ("sync", "write_behind"):
+    raise ValueError(f"PERSISTENCE_MODE invalide: {PERSISTENCE_MODE!r} (attendu: 'sync' ou 'write_behind')")
+
+# Réserve n valeurs de la séquence de predictions.id en une seule requête
+_RESERVE_IDS = text("SELECT nextval(pg_get_serial_sequence('predictions', 'id')) FROM generate_series(1, :n)")
+
+
+class PersistenceOverloadedError(RuntimeError):
+    """La file d'écriture différée est pleine: la prédiction est rejetée."""
+
+
+class PredictionWriter:
+    """
+    Écriture différée (write-behind) des prédictions.
+
+    Les identifiants sont réservés par blocs dans la séquence de la table, ce qui permet
+    de répondre avant l'écriture. Les lignes sont placées dans une file bornée; une tâche
+    de fond les insère par lots (INSERT multi-lignes) dès que batch_size lignes sont en file
+    ou flush_interval_ms après la première.
+
+    Un lot en échec est réessayé retry_attempts fois au total, avec une attente doublée à
+    chaque tentative, puis placé dans une file dead-letter bornée, réessayée toutes les
+    dead_letter_retry_interval secondes et une dernière fois à l'arrêt. created_at est fixé
+    à la mise en file: une nouvelle tentative réécrit exactement la même clé primaire (id,
+    created_at), que l'INSERT ignore, et un lot dont le commit a abouti malgré l'erreur
+    n'est pas dupliqué.
+    Seules les lignes qui débordent de la file dead-letter, ou qui y restent à l'arrêt, sont
+    perdues (compteur lost).
+    """
+
+    def __init__(
+        self,
+        max_queue: int,
+        batch_size: int,
+        flush_interval_ms: float,
+        id_block: int,
+        retry_attempts: int = 3,
+        retry_backoff_ms: float = 100,
+        dead_letter_max: int = 10000,
+        dead_letter_retry_interval: float = 30,
+    ) -> None:
+        if batch_size < 1 or id_block < 1 or retry_attempts < 1:
+            raise ValueError(
+                f"batch_size, id_block et retry_attempts doivent être >= 1 (reçu: {batch_size}, {id_block}, "
+                f"{retry_attempts})"
+            )
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.id_block = id_block
+        self.retry_attempts = retry_attempts
+        self.retry_backoff = retry_backoff_ms / 1000
+        self.dead_letter_retry_interval = dead_letter_retry_interval
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=max_queue)
+        self._dead_letter: deque[dict[str, Any]] = deque()
+        self._dead_letter_max = dead_letter_max
+        self._ids: deque[int] = deque()
+        self._ids_lock = asyncio.Lock()
+        self._flusher: asyncio.Task[None] | None = None
+        self._retrier: asyncio.Task[None] | None = None
+        self._flushing: asyncio.Future[None] | None = None
+        self._in_flight = 0
+        self.written = 0
+        self.retries = 0
+        self.lost = 0
+
+    def start(self) -> None:
+        """Démarre les tâches d'écriture et de reprise des lignes en échec (dans la boucle courante)."""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run(), name="prediction-writer")
+        if self._retrier is None:
+            self._retrier = asyncio.create_task(self._retry_dead_letters(), name="prediction-writer-dead-letter")
+
+    async def stop(self) -> None:
+        """Écrit les lignes encore en file, réessaie la file dead-letter puis arrête l'écriture."""
+        for task in (self._flusher, self._retrier):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._flusher = self._retrier = None
+        if self._flushing is not None:
+            await self._flushing
+        while not self._queue.empty():
+            await self._flush(self._drain(self.batch_size))
+
+        while self._dead_letter:
+            rows = self._take_dead_letters()
+            if not await self._write(rows, self.retry_attempts):
+                self._dead_letter.extendleft(reversed(rows))
+                break
+        if self._dead_letter:
+            rows = list(self._dead_letter)
+            self._dead_letter.clear()
+            self.lost += len(rows)
+            logger.error("Arrêt: %d prédictions non écrites perdues (ids %s)", len(rows), [row["id"] for row in rows])
+
+    async def enqueue(self, rows: list[dict[str, Any]]) -> list[int]:
+        """
+        Attribue un identifiant et une date de création à chaque ligne et la place dans la file d'écriture.
+
+        Raises:
+            PersistenceOverloadedError: Si la file ne peut pas accueillir toutes les lignes
+        """
+        if self._queue.maxsize - self._queue.qsize() < len(rows):
+            raise PersistenceOverloadedError(f"File d'écriture pleine ({self._queue.maxsize} prédictions)")
+        ids = await self._reserve_ids(len(rows))
+        # created_at fixé ici (et non par now() en base): la clé primaire d'une ligne réessayée ne change pas
+        created_at = datetime.now(UTC)
+        for prediction_id, row in zip(ids, rows, strict=True):
+            self._queue.put_nowait({**row, "id": prediction_id, "created_at": created_at})
+        return ids
+
+    async def _reserve_ids(self, n: int) -> list[int]:
+        """Prend n identifiants dans le bloc réservé, en réservant un nouveau bloc si nécessaire."""
+        async with self._ids_lock:
+            if len(self._ids) < n:
+                async with async_session() as session:
+                    result = await session.execute(_RESERVE_IDS, {"n": max(self.id_block, n - len(self._ids))})
+                    self._ids.extend(result.scalars().all())
+            return [self._ids.popleft() for _ in range(n)]
+
+    def _drain(self, limit: int) -> list[dict[str, Any]]:
+        """Retire sans attendre jusqu'à limit lignes de la file."""
+        rows: list[dict[str, Any]] = []
+        while len(rows) < limit and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _run(self) -> None:
+        """Boucle d'écriture: un INSERT par lot."""
+        loop = asyncio.get_running_loop()
+        while True:
+            rows = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.flush_interval
+                while len(rows) < self.batch_size:
+                    rows.extend(self._drain(self.batch_size - len(rows)))
+                    timeout = deadline - loop.time()
+                    if len(rows) >= self.batch_size or timeout <= 0:
+                        break
+                    try:
+                        rows.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except TimeoutError:
+                        break
+            finally:
+                # Le lot collecté est écrit même si l'arrêt survient pendant la collecte ou l'INSERT
+                self._flushing = asyncio.ensure_future(self._flush(rows))
+            await asyncio.shield(self._flushing)
+
+    async def _write(self, rows: list[dict[str, Any]], attempts: int) -> bool:
+        """Insère un lot en au plus attempts tentatives (attente doublée entre deux); False si toutes échouent."""
+        self._in_flight += len(rows)
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    self.retries += 1
+                    await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                try:
+                    async with async_session() as session:
+                        await session.execute(insert(Prediction).on_conflict_do_nothing(), rows)
+                        await session.commit()
+                except Exception:
+                    logger.warning(
+                        "Échec de l'écriture différée de %d prédictions (ids %d-%d), tentative %d/%d",
+                        len(rows),
+                        rows[0]["id"],
+                        rows[-1]["id"],
+                        attempt + 1,
+                        attempts,
+                        exc_info=True,
+                    )
+                    continue
+                self.written += len(rows)
+                logger.debug("%d prédictions écrites en base", len(rows))
+                return True
+            return False
+        finally:
+            self._in_flight -= len(rows)
+
+    async def _flush(self, rows: list[dict[str, Any]]) -> None:
+        """Insère un lot de lignes; après retry_attempts échecs, le lot passe en file dead-letter."""
+        if rows and not await self._write(rows, self.retry_attempts):
+            self._add_dead_letters(rows)
+
+    def _add_dead_letters(self, rows: list[dict[str, Any]]) -> None:
+        """Place des lignes en file dead-letter; au-delà de la taille maximale, les plus anciennes sont perdues."""
+        self._dead_letter.extend(rows)
+        overflow = len(self._dead_letter) - self._dead_letter_max
+        if overflow > 0:
+            dropped = [self._dead_letter.popleft()["id"] for _ in range(overflow)]
+            self.lost += overflow
+            logger.error("File dead-letter pleine: %d prédictions perdues (ids %s)", overflow, dropped)
+        logger.error("%d prédictions en file dead-letter", len(self._dead_letter))
+
+    def _take_dead_letters(self) -> list[dict[str, Any]]:
+        """Retire jusqu'à batch_size lignes de la file dead-letter."""
+        return [self._dead_letter.popleft() for _ in range(min(self.batch_size, len(self._dead_letter)))]
+
+    async def _retry_dead_letters(self) -> None:
+        """Réessaie périodiquement la file dead-letter; un échec remet les lignes en tête de file."""
+        while True:
+            await asyncio.sleep(self.dead_letter_retry_interval)
+            while self._dead_letter:
+                rows = self._take_dead_letters()
+                written = False
+                try:
+                    written = await self._write(rows, 1)
+                finally:
+                    if not written:
+                        self._dead_letter.extendleft(reversed(rows))
+                if not written:
+                    break
+            if self._dead_letter:
+                logger.warning("%d prédictions toujours en file dead-letter", len(self._dead_letter))
+
+    def stats(self) -> dict[str, Any]:
+        """Profondeur des files (en attente d'écriture, dead-letter) et compteurs d'écriture."""
+        return {
+            "queued": self._queue.qsize(),
+            "pending": self._queue.qsize() + self._in_flight,
+            "max_queue": self._queue.maxsize,
+            "dead_letter": len(self._dead_letter),
+            "max_dead_letter": self._dead_letter_max,
+            "written": self.written,
+            "retries": self.retries,
+            "lost": self.lost,
+            "reserved_ids": len(self._ids),
+        }
+
+
+_writer: PredictionWriter | None = None
+
+
+def start_prediction_writer() -> None:
+    """Démarre l'écriture différée si PERSISTENCE_MODE=write_behind (appelé dans le lifespan)."""
+    global _writer
+
+    if PERSISTENCE_MODE == "write_behind" and _writer is None:
+        _writer = PredictionWriter(
+            WRITE_BEHIND_MAX_QUEUE,
+            WRITE_BEHIND_BATCH_SIZE,
+            WRITE_BEHIND_FLUSH_INTERVAL_MS,
+            WRITE_BEHIND_ID_BLOCK,
+            WRITE_BEHIND_RETRY_ATTEMPTS,
+            WRITE_BEHIND_RETRY_BACKOFF_MS,
+            WRITE_BEHIND_DEAD_LETTER_MAX,
+            WRITE_BEHIND_DEAD_LETTER_RETRY_INTERVAL,
+        )
+        _writer.start()
+        logger.info("Écriture différée des prédictions activée (file max: %d)", WRITE_BEHIND_MAX_QUEUE)
+
+
+async def stop_prediction_writer() -> None:
+    """Vide la file d'écriture différée en base puis l'arrête."""
+    global _writer
+
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
+
+
+def get_prediction_writer() -> PredictionWriter | None:
+    """Écriture différée active, ou None en mode synchrone."""
+    return _writer
+
+
+def get_persistence_stats() -> dict[str, Any]:
+    """Mode de persistance et, en écriture différée, lignes en attente, dead-letter et compteurs."""
+    if _writer is None:
+        return {"mode": "sync"}
+    return {"mode": "write_behind", **_writer.stats()}
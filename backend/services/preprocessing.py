@@ -0,0 +1,145 @@
+"""
+Preprocessing fusionné: imputation des valeurs manquantes et standardisation en un seul noyau NumPy.
+
+Les paramètres ajustés d'un SimpleImputer (statistiques) et d'un StandardScaler (moyenne,
+écart-type) sont extraits au chargement du modèle, qu'ils soient fournis à part (artefact
+CatBoost, export natif) ou en étapes d'un Pipeline sklearn. La transformation se fait alors
+sur une seule copie de la matrice, sans validation ni contrôle des noms de features sklearn,
+avec les mêmes opérations flottantes que sklearn (résultat identique au bit près).
+
+Un preprocessing non reconnu (autre stratégie, indicateur de valeurs manquantes, etc.)
+est laissé tel quel et appliqué par sklearn.
+"""
+
+import math
+import sys
+from typing import Any
+
+import numpy as np
+
+from services.native_model import NativeImputer, NativeScaler
+
+# Paramètres (statistiques, moyenne, écart-type) d'un preprocessing reconnu, None par étape absente
+type FusedParams = tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]
+
+
+class FusedPreprocessor:
+    """
+    Imputation puis standardisation d'une matrice en une passe.
+
+    La valeur imputée est standardisée à la construction: la matrice est centrée et réduite,
+    puis les NaN (propagés par le calcul) sont remplacés par cette valeur.
+    """
+
+    def __init__(self, statistics: np.ndarray | None, mean: np.ndarray | None, scale: np.ndarray | None) -> None:
+        self.mean = mean
+        self.scale = scale
+        fill = statistics
+        if fill is not None and mean is not None:
+            fill = fill - mean
+        if fill is not None and scale is not None:
+            fill = fill / scale
+        self.fill = fill
+
+    def transform(self, matrix: np.ndarray) -> np.ndarray:
+        """Matrice prétraitée (une seule copie float64, calculs en place)."""
+        out = np.array(matrix, dtype=np.float64)
+        if self.mean is not None:
+            np.subtract(out, self.mean, out=out)
+        if self.scale is not None:
+            np.divide(out, self.scale, out=out)
+        if self.fill is not None:
+            np.copyto(out, self.fill, where=np.isnan(out))
+        return out
+
+
+def _sklearn_class(module: str, name: str) -> Any:
+    """Classe sklearn si son module est déjà importé (un objet de cette classe ne peut exister sinon)."""
+    loaded = sys.modules.get(module)
+    return getattr(loaded, name, None) if loaded is not None else None
+
+
+def _imputer_statistics(imputer: Any) -> np.ndarray | None:
+    """Statistiques d'un imputer qui se réduit au remplacement des NaN par colonne, None sinon."""
+    if isinstance(imputer, NativeImputer):
+        return imputer.statistics
+    simple_imputer = _sklearn_class("sklearn.impute", "SimpleImputer")
+    if simple_imputer is None or type(imputer) is not simple_imputer:
+        return None
+    missing_values = imputer.missing_values
+    if imputer.add_indicator or not (isinstance(missing_values, float) and math.isnan(missing_values)):
+        return None
+    statistics = np.asarray(imputer.statistics_, dtype=np.float64)
+    # Colonne entièrement manquante à l'entraînement: supprimée par sklearn, non fusionnable
+    return None if np.isnan(statistics).any() else statistics
+
+
+def _scaler_params(scaler: Any) -> tuple[np.ndarray | None, np.ndarray | None] | None:
+    """Moyenne et écart-type d'un StandardScaler (None si non appliqués), None si non reconnu."""
+    if isinstance(scaler, NativeScaler):
+        return scaler.mean, scaler.scale
+    standard_scaler = _sklearn_class("sklearn.preprocessing", "StandardScaler")
+    if standard_scaler is None or type(scaler) is not standard_scaler:
+        return None
+    mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else None
+    scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else None
+    return mean, scale
+
+
+def _fused_params(imputer: Any, scaler: Any) -> FusedParams | None:
+    """Paramètres d'un couple (imputer, scaler), None si l'une des étapes n'est pas reconnue."""
+    statistics = None
+    if imputer is not None:
+        statistics = _imputer_statistics(imputer)
+        if statistics is None:
+            return None
+    mean = scale = None
+    if scaler is not None:
+        params = _scaler_params(scaler)
+        if params is None:
+            return None
+        mean, scale = params
+    return statistics, mean, scale
+
+
+def _split_pipeline(model: Any) -> tuple[Any, Any, Any] | None:
+    """(imputer, scaler, estimateur final) d'un Pipeline sklearn de cette forme, None sinon."""
+    pipeline = _sklearn_class("sklearn.pipeline", "Pipeline")
+    if pipeline is None or type(model) is not pipeline:
+        return None
+
+    transformers = [step for _, step in model.steps[:-1] if step not in (None, "passthrough")]
+    imputer = transformers.pop(0) if transformers and _imputer_statistics(transformers[0]) is not None else None
+    scaler = transformers.pop(0) if transformers and _scaler_params(transformers[0]) is not None else None
+    if transformers:
+        return None
+    return imputer, scaler, model.steps[-1][1]
+
+
+def fuse_pipeline(model: Any, imputer: Any = None, scaler: Any = None) -> tuple[Any, Any, Any]:
+    """
+    Remplace le preprocessing d'un pipeline par le noyau fusionné quand il est reconnu.
+
+    Args:
+        model: Estimateur, ou Pipeline sklearn (imputer, scaler, estimateur) sans imputer/scaler à part
+        imputer: Imputer appliqué avant le modèle (artefact CatBoost, export natif)
+        scaler: Scaler appliqué après l'imputer
+
+    Returns:
+        Tuple (model, imputer, scaler) à passer à score_pipeline: (estimateur, FusedPreprocessor, None)
+        si le preprocessing est fusionné, le pipeline d'origine sinon
+    """
+    if imputer is None and scaler is None:
+        split = _split_pipeline(model)
+        if split is None:
+            return model, imputer, scaler
+        imputer, scaler, estimator = split
+        if imputer is None and scaler is None:
+            return estimator, None, None
+    else:
+        estimator = model
+
+    params = _fused_params(imputer, scaler)
+    if params is None:
+        return model, imputer, scaler
+    return estimator, FusedPreprocessor(*params), None
@@ -0,0 +1,184 @@
+"""
+Table précalculée des scores du modèle sur tout son domaine d'entrée.
+
+Étape de build (charge le modèle, génère la table et ses métadonnées):
+    python -m services.score_table --vma 20 30 50 70 80 90 110 130
+
+Les 9 features du modèle sont binaires, sauf jour_semaine (0-6) et vma: la table couvre
+toutes leurs combinaisons pour les vma listées. C'est un tableau float64 de forme
+(2, 2, 7, 2, 2, nb_vma, 2, 2, 2, 2), dans l'ordre de FEATURE_ORDER, contenant pour chaque
+vecteur la classe prédite et la probabilité de la classe grave.
+
+Au chargement, la table est recalculée avec le modèle courant et doit lui être identique
+au bit près; elle n'est utilisée que pour ce modèle. Une vma hors table passe par le modèle.
+"""
+
+import argparse
+import json
+import logging
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCORE_TABLE_PATH = Path(os.getenv("SCORE_TABLE_PATH", str(Path(__file__).parent.parent / "data" / "scores.npy")))
+
+# Vitesses maximales autorisées réglementaires couvertes par défaut
+DEFAULT_VMA_VALUES = (20, 30, 50, 70, 80, 90, 110, 130)
+
+# Nombre de valeurs de chaque feature, dans l'ordre du modèle (None = vma, liste de la table)
+_DOMAIN_SIZES: tuple[int | None, ...] = (2, 2, 7, 2, 2, None, 2, 2, 2)
+_VMA_POSITION = _DOMAIN_SIZES.index(None)
+
+type ScoreFunction = Callable[[np.ndarray], tuple[np.ndarray, np.ndarray]]
+
+# Table aplatie (une ligne (classe, probabilité) par vecteur), modèle validé et index associés
+_table: np.ndarray | None = None
+_model: Any = None
+_strides: tuple[int, ...] = ()
+_vma_index: dict[float, int] = {}
+
+
+def _metadata_path(path: Path) -> Path:
+    """Chemin du fichier de métadonnées associé à la table."""
+    return path.with_suffix(".json")
+
+
+def _shape(vma_values: list[int]) -> tuple[int, ...]:
+    """Dimensions du domaine (une par feature) pour une liste de vma."""
+    return tuple(len(vma_values) if size is None else size for size in _DOMAIN_SIZES)
+
+
+def domain_matrix(vma_values: list[int]) -> np.ndarray:
+    """Matrice float64 de tous les vecteurs du domaine, dans l'ordre de la table."""
+    shape = _shape(vma_values)
+    matrix = np.indices(shape).reshape(len(shape), -1).T.astype(np.float64)
+    matrix[:, _VMA_POSITION] = np.asarray(vma_values, dtype=np.float64)[matrix[:, _VMA_POSITION].astype(np.intp)]
+    return matrix
+
+
+def compute_score_table(score: ScoreFunction, vma_values: list[int]) -> np.ndarray:
+    """Applique la fonction de score à tout le domaine: tableau (..., 2) de (classe, probabilité)."""
+    predictions, probas = score(domain_matrix(vma_values))
+    table = np.stack([np.asarray(predictions, dtype=np.float64), np.asarray(probas, dtype=np.float64)], axis=-1)
+    return table.reshape(*_shape(vma_values), 2)
+
+
+def build_score_table(
+    score: ScoreFunction, model_fingerprint: str, vma_values: list[int], path: Path = SCORE_TABLE_PATH
+) -> Path:
+    """
+    Calcule et écrit la table des scores du modèle sur tout le domaine.
+
+    Args:
+        score: Fonction de score du modèle (matrice -> (classes, probabilités))
+        model_fingerprint: Version (empreinte du fichier) du modèle, vérifiée au chargement
+        vma_values: Vitesses maximales autorisées couvertes
+        path: Fichier .npy de destination (métadonnées écrites à côté en .json)
+    """
+    if not vma_values or len(set(vma_values)) != len(vma_values):
+        raise ValueError(f"Liste de vma invalide: {vma_values}")
+
+    table = compute_score_table(score, vma_values)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, table)
+    metadata = {"model_fingerprint": model_fingerprint, "vma": list(vma_values)}
+    _metadata_path(path).write_text(json.dumps(metadata), encoding="utf-8")
+    logger.info("Table des scores écrite: %s %s", path, table.shape)
+    return path
+
+
+def load_score_table(model: Any, score: ScoreFunction, model_fingerprint: str, path: Path = SCORE_TABLE_PATH) -> bool:
+    """
+    Charge la table après l'avoir vérifiée contre le modèle courant.
+
+    Retourne False si la table est absente, générée pour un autre fichier de modèle ou
+    différente (au bit près) des scores du modèle: les prédictions passent alors par le modèle.
+    """
+    global _table, _model, _strides, _vma_index
+
+    unload_score_table()
+    metadata_path = _metadata_path(path)
+    if not path.exists() or not metadata_path.exists():
+        logger.info("Table des scores absente (%s), prédictions par le modèle", path)
+        return False
+
+    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+    if metadata["model_fingerprint"] != model_fingerprint:
+        logger.warning("Table des scores générée pour un autre modèle (%s), ignorée", path)
+        return False
+
+    vma_values = metadata["vma"]
+    table = np.load(path)
+    if table.shape != (*_shape(vma_values), 2) or not np.array_equal(table, compute_score_table(score, vma_values)):
+        logger.error("Table des scores différente des scores du modèle (%s), ignorée", path)
+        return False
+
+    flat = table.reshape(-1, 2)
+    flat.flags.writeable = False
+    _table = flat
+    _model = model
+    _strides = tuple(int(np.prod(table.shape[position + 1 : -1])) for position in range(len(_DOMAIN_SIZES)))
+    _vma_index = {float(vma): i for i, vma in enumerate(vma_values)}
+    logger.info("Table des scores chargée: %s %s", path, table.shape)
+    return True
+
+
+def unload_score_table() -> None:
+    """Libère la table (retour aux prédictions par le modèle)."""
+    global _table, _model, _strides, _vma_index
+    _table = None
+    _model = None
+    _strides = ()
+    _vma_index = {}
+
+
+def lookup(model: Any, key: tuple[float, ...]) -> tuple[int, float] | None:
+    """
+    Retourne (classe, probabilité grave) d'un vecteur de features, ou None si hors table.
+
+    None est renvoyé si la table n'est pas chargée, si elle a été validée pour un autre
+    modèle ou si une feature sort du domaine précalculé (vma non listée notamment).
+    """
+    if _table is None or model is not _model:
+        return None
+
+    index = 0
+    for value, size, stride in zip(key, _DOMAIN_SIZES, _strides, strict=True):
+        if size is None:
+            offset = _vma_index.get(value)
+        elif value.is_integer() and 0 <= value < size:
+            offset = int(value)
+        else:
+            offset = None
+        if offset is None:
+            return None
+        index += offset * stride
+
+    gravite, prob_grave = _table[index]
+    return int(gravite), float(prob_grave)
+
+
+def get_score_table_stats() -> dict[str, Any]:
+    """État de la table des scores (vecteurs couverts et vma)."""
+    if _table is None:
+        return {"loaded": False}
+    return {"loaded": True, "entries": len(_table), "vma": sorted(int(vma) for vma in _vma_index)}
+
+
+if __name__ == "__main__":
+    from services import ml_service
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Précalcule la table des scores du modèle")
+    parser.add_argument("--vma", type=int, nargs="+", default=list(DEFAULT_VMA_VALUES))
+    parser.add_argument("--output", type=Path, default=SCORE_TABLE_PATH)
+    args = parser.parse_args()
+
+    bundle = ml_service.load_model()
+    build_score_table(bundle.score, bundle.version, args.vma, args.output)
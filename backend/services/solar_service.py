@@ -0,0 +1,103 @@
+"""
+Calcul local des heures de lever/coucher du soleil.
+
+Implémentation vectorisée (NumPy) des équations de la NOAA Solar Calculator:
+aucune dépendance réseau, résultat déterministe pour une date et une position données.
+
+Les heures sont exprimées en minutes depuis minuit UTC, comme les valeurs renvoyées
+par l'API sunrise-sunset.org (formatted=0) qu'elles remplacent.
+"""
+
+from datetime import date, time
+
+import numpy as np
+import numpy.typing as npt
+
+MINUTES_PER_DAY = 24 * 60
+
+# Jour julien du 1970-01-01 à 0h UTC
+_JULIAN_DAY_EPOCH = 2440587.5
+# Jour julien de l'époque J2000.0
+_JULIAN_DAY_J2000 = 2451545.0
+# Angle zénithal du lever/coucher (réfraction atmosphérique + rayon apparent du soleil)
+_SUNRISE_ZENITH = np.radians(90.833)
+
+
+def sun_times_minutes(
+    dates: npt.ArrayLike, latitudes: npt.ArrayLike, longitudes: npt.ArrayLike
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calcule les heures de lever et de coucher du soleil (minutes UTC depuis minuit).
+
+    Args:
+        dates: Tableau de dates (convertible en datetime64[D])
+        latitudes: Latitudes en degrés (nord positif)
+        longitudes: Longitudes en degrés (est positif)
+
+    Returns:
+        Tuple (sunrise, sunset) de tableaux float64 aux dimensions diffusées des entrées.
+        En cas de nuit polaire, lever et coucher sont confondus au midi solaire
+        (au minuit solaire en cas de jour polaire).
+    """
+    days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.asarray(longitudes, dtype=np.float64)
+
+    # Siècles juliens depuis J2000, évalués au midi solaire approximatif
+    julian_day = days + _JULIAN_DAY_EPOCH + 0.5 - lon / 360.0
+    jc = (julian_day - _JULIAN_DAY_J2000) / 36525.0
+
+    mean_long = np.radians((280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360.0)
+    mean_anom = np.radians(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    eccent = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+    eq_center = (
+        np.sin(mean_anom) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(2 * mean_anom) * (0.019993 - 0.000101 * jc)
+        + np.sin(3 * mean_anom) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * jc)
+    app_long = np.radians(np.degrees(mean_long) + eq_center - 0.00569 - 0.00478 * np.sin(omega))
+
+    mean_obliq = 23.0 + (26.0 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60.0) / 60.0
+    obliq = np.radians(mean_obliq + 0.00256 * np.cos(omega))
+    declination = np.arcsin(np.sin(obliq) * np.sin(app_long))
+
+    var_y = np.tan(obliq / 2) ** 2
+    eq_time = 4.0 * np.degrees(
+        var_y * np.sin(2 * mean_long)
+        - 2 * eccent * np.sin(mean_anom)
+        + 4 * eccent * var_y * np.sin(mean_anom) * np.cos(2 * mean_long)
+        - 0.5 * var_y**2 * np.sin(4 * mean_long)
+        - 1.25 * eccent**2 * np.sin(2 * mean_anom)
+    )
+
+    cos_hour_angle = np.cos(_SUNRISE_ZENITH) / (np.cos(lat) * np.cos(declination)) - np.tan(lat) * np.tan(declination)
+    hour_angle = np.degrees(np.arccos(np.clip(cos_hour_angle, -1.0, 1.0)))
+
+    solar_noon = 720.0 - 4.0 * lon - eq_time
+    sunrise = (solar_noon - 4.0 * hour_angle) % MINUTES_PER_DAY
+    sunset = (solar_noon + 4.0 * hour_angle) % MINUTES_PER_DAY
+    return sunrise, sunset
+
+
+def to_whole_minutes(minutes: npt.ArrayLike) -> np.ndarray:
+    """
+    Arrondit des minutes fractionnaires à la minute entière supérieure (après arrondi à la seconde).
+
+    Pour une heure h exprimée en minutes entières, `h < to_whole_minutes(m)` équivaut à
+    `h < minutes_to_time(m)`: la comparaison à la minute reste exacte.
+    """
+    return (np.ceil(np.round(np.asarray(minutes) * 60) / 60) % MINUTES_PER_DAY).astype(np.int16)
+
+
+def minutes_to_time(minutes: float) -> time:
+    """Convertit un nombre de minutes depuis minuit en datetime.time (précision seconde)."""
+    total_seconds = int(round(minutes * 60)) % (MINUTES_PER_DAY * 60)
+    return time(total_seconds // 3600, (total_seconds // 60) % 60, total_seconds % 60)
+
+
+def compute_sun_times(date_obj: date, latitude: float, longitude: float) -> dict[str, time]:
+    """Heures de lever/coucher du soleil (UTC) pour une date et une position."""
+    sunrise, sunset = sun_times_minutes(np.datetime64(date_obj, "D"), np.float64(latitude), np.float64(longitude))
+    return {"sunrise": minutes_to_time(float(sunrise)), "sunset": minutes_to_time(float(sunset))}
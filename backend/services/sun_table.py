@@ -0,0 +1,129 @@
+"""
+Table précalculée des horaires du soleil par département et par jour.
+
+Étape de build (génère la table et ses métadonnées):
+    python -m services.sun_table --start-year 2005 --end-year 2040
+
+La table est un tableau int16 de forme (départements, jours, 2) contenant le lever et le
+coucher du soleil en minutes UTC (voir solar_service.to_whole_minutes). Elle est mappée en
+mémoire au démarrage: une recherche est un simple accès indexé, sans appel réseau ni cache.
+"""
+
+import argparse
+import json
+import logging
+import os
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from services.solar_service import sun_times_minutes, to_whole_minutes
+
+logger = logging.getLogger(__name__)
+
+SUN_TABLE_PATH = Path(os.getenv("SUN_TABLE_PATH", str(Path(__file__).parent.parent / "data" / "sun_times.npy")))
+
+# Table mappée en mémoire et index associés
+_table: np.ndarray | None = None
+_start_ordinal = 0
+_departement_index: dict[str, int] = {}
+
+
+def _metadata_path(path: Path) -> Path:
+    """Chemin du fichier de métadonnées associé à la table."""
+    return path.with_suffix(".json")
+
+
+def build_sun_table(
+    departements: dict[str, dict[str, float]], start_year: int, end_year: int, path: Path = SUN_TABLE_PATH
+) -> Path:
+    """
+    Calcule et écrit la table des horaires du soleil pour chaque département et chaque jour.
+
+    Args:
+        departements: Centroïdes des départements ({code: {"lat", "lon"}})
+        start_year: Première année couverte
+        end_year: Dernière année couverte (incluse)
+        path: Fichier .npy de destination (métadonnées écrites à côté en .json)
+    """
+    if end_year < start_year:
+        raise ValueError(f"Plage d'années invalide: {start_year}-{end_year}")
+
+    codes = list(departements)
+    dates = np.arange(np.datetime64(f"{start_year}-01-01"), np.datetime64(f"{end_year + 1}-01-01"))
+    latitudes = np.array([departements[code]["lat"] for code in codes])[:, np.newaxis]
+    longitudes = np.array([departements[code]["lon"] for code in codes])[:, np.newaxis]
+
+    sunrise, sunset = sun_times_minutes(dates[np.newaxis, :], latitudes, longitudes)
+    table = np.stack([to_whole_minutes(sunrise), to_whole_minutes(sunset)], axis=-1)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, table)
+    metadata = {"start_date": f"{start_year}-01-01", "departements": codes}
+    _metadata_path(path).write_text(json.dumps(metadata), encoding="utf-8")
+    logger.info("Table des horaires du soleil écrite: %s %s", path, table.shape)
+    return path
+
+
+def load_sun_table(path: Path = SUN_TABLE_PATH) -> bool:
+    """
+    Mappe la table en mémoire (lecture seule).
+
+    Retourne False si la table est absente: les horaires sont alors calculés à la volée.
+    """
+    global _table, _start_ordinal, _departement_index
+
+    metadata_path = _metadata_path(path)
+    if not path.exists() or not metadata_path.exists():
+        logger.warning("Table des horaires du soleil absente (%s), calcul à la volée", path)
+        return False
+
+    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+    table = np.load(path, mmap_mode="r")
+    if table.ndim != 3 or table.shape[0] != len(metadata["departements"]) or table.shape[2] != 2:
+        raise ValueError(f"Table des horaires du soleil invalide: {path} {table.shape}")
+
+    _table = table
+    _start_ordinal = date.fromisoformat(metadata["start_date"]).toordinal()
+    _departement_index = {code: i for i, code in enumerate(metadata["departements"])}
+    logger.info("Table des horaires du soleil chargée: %s %s", path, table.shape)
+    return True
+
+
+def unload_sun_table() -> None:
+    """Libère la table (retour au calcul à la volée)."""
+    global _table, _start_ordinal, _departement_index
+    _table = None
+    _start_ordinal = 0
+    _departement_index = {}
+
+
+def lookup(departement: str, date_obj: date) -> tuple[int, int] | None:
+    """
+    Retourne (lever, coucher) en minutes UTC, ou None si hors table.
+
+    None est renvoyé si la table n'est pas chargée, si le département n'y figure pas
+    ou si la date sort de la plage d'années précalculée.
+    """
+    if _table is None:
+        return None
+    index = _departement_index.get(departement)
+    day = date_obj.toordinal() - _start_ordinal
+    if index is None or not 0 <= day < _table.shape[1]:
+        return None
+    sunrise, sunset = _table[index, day]
+    return int(sunrise), int(sunset)
+
+
+if __name__ == "__main__":
+    from services.feature_service import DEPARTEMENTS
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Précalcule la table des horaires du soleil")
+    parser.add_argument("--start-year", type=int, default=2005)
+    parser.add_argument("--end-year", type=int, default=2040)
+    parser.add_argument("--output", type=Path, default=SUN_TABLE_PATH)
+    args = parser.parse_args()
+
+    build_sun_table(DEPARTEMENTS, args.start_year, args.end_year, args.output)
@@ -8,7 +8,7 @@ Architecture MVC:
 """
 
 from collections.abc import AsyncIterator, Iterator
-from datetime import time
+from datetime import UTC, datetime, time
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -79,8 +79,10 @@ def mock_db_session() -> AsyncMock:
     session = AsyncMock()
     session.add = MagicMock()
     session.commit = AsyncMock()
-    session.refresh = AsyncMock()
-    session.execute = AsyncMock()
+    # Ligne renvoyée par INSERT ... RETURNING id, created_at
+    result = MagicMock()
+    result.all.return_value = [MagicMock(id=1, created_at=datetime(2024, 6, 15, 8, 30, tzinfo=UTC))]
+    session.execute = AsyncMock(return_value=result)
     return session
 
 
@@ -105,6 +107,7 @@ def test_client(mock_db_session: AsyncMock, mock_model: MagicMock) -> Iterator[T
         patch("database.async_sessionmaker"),
     ):
         from main import app
+        from services.ml_service import create_bundle
 
         # Override de la dépendance DB
         async def override_get_db() -> AsyncIterator[AsyncMock]:
@@ -116,9 +119,7 @@ def test_client(mock_db_session: AsyncMock, mock_model: MagicMock) -> Iterator[T
 
         # Mock du modèle
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", None),
-            patch("services.ml_service._scaler", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
         ):
             yield TestClient(app)
 
@@ -134,6 +135,7 @@ async def async_client(mock_db_session: AsyncMock, mock_model: MagicMock) -> Asy
         patch("database.async_sessionmaker"),
     ):
         from main import app
+        from services.ml_service import create_bundle
 
         async def override_get_db() -> AsyncIterator[AsyncMock]:
             yield mock_db_session
@@ -143,9 +145,7 @@ async def async_client(mock_db_session: AsyncMock, mock_model: MagicMock) -> Asy
         app.dependency_overrides[get_db] = override_get_db
 
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", None),
-            patch("services.ml_service._scaler", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
         ):
             transport = ASGITransport(app=app)
             async with AsyncClient(transport=transport, base_url="http://test") as client:
@@ -0,0 +1,187 @@
+"""
+Tests du cache LRU à expiration (services.cache).
+
+Ces tests vérifient l'éviction, l'expiration et les compteurs exposés.
+"""
+
+import asyncio
+
+import pytest
+
+from services.cache import SingleFlight, TTLCache
+
+
+class FakeClock:
+    """Horloge manuelle pour piloter l'expiration."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """Tests du cache TTLCache."""
+
+    def test_get_set(self) -> None:
+        """Valeur retrouvée après insertion, None sinon."""
+        cache: TTLCache[str, int] = TTLCache(maxsize=2)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_peek_not_counted(self) -> None:
+        """peek(): valeur sans hit/miss comptés ni changement de l'ordre LRU."""
+        clock = FakeClock()
+        cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=5, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.peek("a") == 1
+        assert cache.peek("z") is None
+        cache.set("c", 3)
+        clock.now = 5.0
+
+        assert cache.peek("a") is None
+        assert cache.peek("b") is None
+        assert (cache.stats()["hits"], cache.stats()["misses"], cache.stats()["evictions"]) == (0, 0, 1)
+
+    def test_lru_eviction(self) -> None:
+        """L'entrée la moins récemment utilisée est évincée."""
+        cache: TTLCache[str, int] = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 1
+
+    def test_default_ttl(self) -> None:
+        """Expiration selon le TTL par défaut."""
+        clock = FakeClock()
+        cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 4.9
+        assert cache.get("a") == 1
+        clock.now = 5.0
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 0
+
+    def test_per_entry_ttl(self) -> None:
+        """TTL spécifique à une entrée, les autres n'expirent pas."""
+        clock = FakeClock()
+        cache: TTLCache[str, int] = TTLCache(maxsize=10, clock=clock)
+        cache.set("permanent", 1)
+        cache.set("short", 2, ttl=1)
+
+        clock.now = 1000.0
+        assert cache.get("permanent") == 1
+        assert cache.get("short") is None
+
+    def test_overwrite_resets_ttl(self) -> None:
+        """Réécrire une entrée remplace sa valeur et son expiration."""
+        clock = FakeClock()
+        cache: TTLCache[str, int] = TTLCache(maxsize=10, clock=clock)
+        cache.set("a", 1, ttl=1)
+        cache.set("a", 2)
+
+        clock.now = 10.0
+        assert cache.get("a") == 2
+
+    def test_clear(self) -> None:
+        """clear() vide le cache."""
+        cache: TTLCache[str, int] = TTLCache(maxsize=10)
+        cache.set("a", 1)
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.get("a") is None
+
+    def test_invalid_maxsize(self) -> None:
+        """Taille maximale nulle rejetée."""
+        with pytest.raises(ValueError, match="maxsize"):
+            TTLCache(maxsize=0)
+
+
+class TestSingleFlight:
+    """Tests de la déduplication des appels concurrents."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_coalesced(self) -> None:
+        """Appels concurrents sur la même clé: une seule exécution partagée."""
+        flight: SingleFlight[str, int] = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch() -> int:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return 42
+
+        tasks = [asyncio.create_task(flight.run("key", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == [42] * 5
+        assert calls == 1
+        assert flight.coalesced == 4
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_distinct_keys_not_coalesced(self) -> None:
+        """Clés distinctes: exécutions distinctes."""
+        flight: SingleFlight[str, str] = SingleFlight()
+
+        async def fetch(key: str) -> str:
+            await asyncio.sleep(0)
+            return key
+
+        results = await asyncio.gather(flight.run("a", lambda: fetch("a")), flight.run("b", lambda: fetch("b")))
+
+        assert results == ["a", "b"]
+        assert flight.coalesced == 0
+
+    @pytest.mark.asyncio
+    async def test_exception_shared(self) -> None:
+        """L'erreur est propagée à tous les appelants, puis la clé est libérée."""
+        flight: SingleFlight[str, int] = SingleFlight()
+
+        async def failing() -> int:
+            await asyncio.sleep(0)
+            raise RuntimeError("échec")
+
+        results = await asyncio.gather(flight.run("key", failing), flight.run("key", failing), return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_caller_cancellation_does_not_cancel_others(self) -> None:
+        """L'annulation d'un appelant n'interrompt pas l'appel partagé."""
+        flight: SingleFlight[str, int] = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch() -> int:
+            await release.wait()
+            return 7
+
+        first = asyncio.create_task(flight.run("key", fetch))
+        second = asyncio.create_task(flight.run("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == 7
+        with pytest.raises(asyncio.CancelledError):
+            await first
@@ -0,0 +1,102 @@
+"""
+Tests du pool de connexions instrumenté (database.TimedQueuePool).
+
+Ces tests vérifient les compteurs de connexions et de temps d'obtention exposés par /health/db.
+"""
+
+from collections.abc import Iterator
+from types import ModuleType
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+
+@pytest.fixture
+def database_module() -> Iterator[ModuleType]:
+    """Module database importé avec un engine mocké."""
+    with (
+        patch.dict("os.environ", {"POSTGRES_USER": "test", "POSTGRES_PASSWORD": "test"}),
+        patch("database.create_async_engine"),
+        patch("database.async_sessionmaker"),
+    ):
+        import database
+
+        yield database
+
+
+class TestTimedQueuePool:
+    """Tests des statistiques du pool."""
+
+    def test_checkout_counted(self, database_module: ModuleType) -> None:
+        """Connexions utilisées/rendues et temps d'obtention sont comptés."""
+        pool = database_module.TimedQueuePool(creator=MagicMock, pool_size=2, max_overflow=0)
+
+        connection = pool.connect()
+        stats = pool.stats()
+        assert stats["checked_out"] == 1
+        assert stats["acquisitions"] == 1
+        assert stats["acquire_max_ms"] >= 0
+
+        connection.close()
+        assert pool.stats()["checked_in"] == 1
+        assert pool.stats()["checked_out"] == 0
+
+    @pytest.mark.asyncio
+    async def test_timeout_counted(self, database_module: ModuleType) -> None:
+        """Pool épuisé: l'attente dépasse le timeout et est comptée."""
+        pool = database_module.TimedQueuePool(creator=MagicMock, pool_size=1, max_overflow=0, timeout=0.01)
+
+        connection = await greenlet_spawn(pool.connect)
+        with pytest.raises(exc.TimeoutError):
+            await greenlet_spawn(pool.connect)
+        await greenlet_spawn(connection.close)
+
+        stats = pool.stats()
+        assert stats["timeouts"] == 1
+        assert stats["acquisitions"] == 2
+        assert stats["acquire_max_ms"] >= 10
+
+
+class TestFeaturesStorage:
+    """Tests du stockage des features en colonnes typées."""
+
+    def test_features_rebuilt_in_model_order(self, database_module: ModuleType) -> None:
+        """La colonne calculée features reprend les 9 features dans l'ordre du modèle."""
+        import re
+
+        from models import Prediction
+        from services.ml_service import FEATURE_ORDER
+
+        sql = str(Prediction.features.expression.compile(compile_kwargs={"literal_binds": True}))
+
+        assert re.findall(r"'(\w+)'", sql) == FEATURE_ORDER
+
+    def test_pending_migration_warned(self, database_module: ModuleType, caplog: pytest.LogCaptureFixture) -> None:
+        """Table avec l'ancienne colonne JSON: la migration n'est pas lancée au démarrage, seulement signalée."""
+        connection = MagicMock()
+        inspector = MagicMock()
+        inspector.get_columns.return_value = [{"name": "id"}, {"name": "features"}]
+
+        with patch.object(database_module, "inspect", return_value=inspector):
+            database_module._warn_pending_migrations(connection)
+
+        connection.execute.assert_not_called()
+        assert "services.migrations" in caplog.text
+
+    def test_missing_indexes_warned(self, database_module: ModuleType, caplog: pytest.LogCaptureFixture) -> None:
+        """Index déclarés absents de la table: ils ne sont pas construits au démarrage, seulement signalés."""
+        from models import Prediction  # noqa: F401  (déclare la table predictions)
+
+        connection = MagicMock()
+        inspector = MagicMock()
+        inspector.get_columns.return_value = [{"name": "id"}]
+        inspector.get_indexes.return_value = [{"name": "ix_predictions_created_at_id"}]
+
+        with patch.object(database_module, "inspect", return_value=inspector):
+            database_module._warn_pending_migrations(connection)
+
+        connection.execute.assert_not_called()
+        assert "ix_predictions_probabilite_grave" in caplog.text
+        assert "ix_predictions_created_at_id" not in caplog.text
@@ -0,0 +1,138 @@
+"""
+Tests de l'export en flux de l'historique (GET /predictions/export).
+
+Ces tests vérifient les formats NDJSON, CSV et Parquet, la lecture par curseur
+côté serveur et la prise en compte des filtres.
+"""
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import UTC, datetime
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pyarrow.parquet as pq
+import pytest
+from httpx import AsyncClient
+
+
+class FakeStreamResult:
+    """Résultat de db.stream(): partitions de mappings."""
+
+    def __init__(self, partitions: Sequence[Sequence[dict[str, Any]]]) -> None:
+        self._partitions = partitions
+
+    def mappings(self) -> "FakeStreamResult":
+        return self
+
+    async def partitions(self) -> AsyncIterator[Sequence[dict[str, Any]]]:
+        for partition in self._partitions:
+            yield [dict(row) for row in partition]
+
+
+def history_row(prediction_id: int) -> dict[str, Any]:
+    """Ligne complète de l'historique."""
+    return {
+        "id": prediction_id,
+        "created_at": datetime(2024, 6, 15, 8, prediction_id, tzinfo=UTC),
+        "input_date": "2024-06-15",
+        "input_heure": "08:30",
+        "input_departement": "75",
+        "input_agg": True,
+        "input_vma": 50,
+        "input_impl_vehicule_leger": True,
+        "input_impl_poids_lourd": False,
+        "input_impl_pieton": False,
+        "features": {"est_nuit": 0, "vma": 50},
+        "gravite": prediction_id % 2,
+        "probabilite_grave": 0.25,
+        "label": "Grave" if prediction_id % 2 else "Non grave",
+    }
+
+
+@pytest.fixture
+def streamed_rows(mock_db_session: AsyncMock) -> list[dict[str, Any]]:
+    """Trois prédictions lues en deux paquets par le curseur."""
+    rows = [history_row(1), history_row(2), history_row(3)]
+    mock_db_session.stream = AsyncMock(return_value=FakeStreamResult([rows[:2], rows[2:]]))
+    return rows
+
+
+class TestExportFormats:
+    """Tests des formats d'export."""
+
+    @pytest.mark.asyncio
+    async def test_ndjson(self, async_client: AsyncClient, streamed_rows: list[dict[str, Any]]) -> None:
+        """NDJSON: une ligne JSON par prédiction."""
+        response = await async_client.get("/predictions/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == [1, 2, 3]
+        assert lines[0]["features"] == {"est_nuit": 0, "vma": 50}
+        assert lines[0]["created_at"] == "2024-06-15T08:01:00Z"
+
+    @pytest.mark.asyncio
+    async def test_csv(self, async_client: AsyncClient, streamed_rows: list[dict[str, Any]]) -> None:
+        """CSV: en-tête puis une ligne par prédiction, features en JSON."""
+        response = await async_client.get("/predictions/export?format=csv&fields=features,label")
+
+        assert response.status_code == 200
+        assert 'filename="predictions.csv"' in response.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert list(rows[0]) == ["id", "created_at", "features", "label"]
+        assert [row["id"] for row in rows] == ["1", "2", "3"]
+        assert json.loads(rows[0]["features"]) == {"est_nuit": 0, "vma": 50}
+        assert rows[1]["label"] == "Non grave"
+
+    @pytest.mark.asyncio
+    async def test_parquet(self, async_client: AsyncClient, streamed_rows: list[dict[str, Any]]) -> None:
+        """Parquet: un row group par paquet lu en base."""
+        response = await async_client.get("/predictions/export?format=parquet")
+
+        assert response.status_code == 200
+        parquet_file = pq.ParquetFile(io.BytesIO(response.content))
+        assert parquet_file.metadata.num_row_groups == 2
+        table = parquet_file.read()
+        assert table.column("id").to_pylist() == [1, 2, 3]
+        assert json.loads(table.column("features")[0].as_py()) == {"est_nuit": 0, "vma": 50}
+        assert table.column("created_at")[0].as_py() == datetime(2024, 6, 15, 8, 1, tzinfo=UTC)
+
+    @pytest.mark.asyncio
+    async def test_unknown_format(self, async_client: AsyncClient) -> None:
+        """Format inconnu: 422."""
+        response = await async_client.get("/predictions/export?format=xlsx")
+
+        assert response.status_code == 422
+
+
+class TestExportQuery:
+    """Tests de la requête d'export."""
+
+    @pytest.mark.asyncio
+    async def test_server_side_cursor_with_filters(
+        self, async_client: AsyncClient, mock_db_session: AsyncMock, streamed_rows: list[dict[str, Any]]
+    ) -> None:
+        """La requête est lue en flux (yield_per), triée par clé et filtrée."""
+        from services.prediction_export import EXPORT_CHUNK_SIZE
+
+        response = await async_client.get("/predictions/export?input_departement=75&gravite=1")
+
+        assert response.status_code == 200
+        query = mock_db_session.stream.call_args.args[0]
+        assert query.get_execution_options()["yield_per"] == EXPORT_CHUNK_SIZE
+        sql = str(query)
+        assert "predictions.input_departement =" in sql
+        assert "predictions.gravite =" in sql
+        assert "ORDER BY predictions.created_at, predictions.id" in sql
+        mock_db_session.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unknown_field_rejected(self, async_client: AsyncClient) -> None:
+        """Champ inconnu: 400."""
+        response = await async_client.get("/predictions/export?fields=inconnu")
+
+        assert response.status_code == 400
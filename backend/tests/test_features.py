@@ -5,7 +5,9 @@ Ces tests vérifient la logique métier de dérivation des features
 à partir des données brutes.
 """
 
+from collections.abc import Iterator
 from datetime import date, time
+from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -18,7 +20,9 @@ from services.feature_service import (
     _is_rush_hour,
     _is_weekend,
     derive_all_features,
+    derive_features_batch,
 )
+from services.solar_service import compute_sun_times, minutes_to_time, sun_times_minutes, to_whole_minutes
 
 
 class TestDepartementCoords:
@@ -59,6 +63,281 @@ class TestDepartementCoords:
             assert -180 <= coords["lon"] <= 180
 
 
+class TestLocalSunTimes:
+    """Tests du calcul local des horaires du soleil (UTC)."""
+
+    @staticmethod
+    def _minutes(value: time) -> float:
+        return value.hour * 60 + value.minute + value.second / 60
+
+    @pytest.mark.parametrize(
+        ("date_obj", "sunrise_utc", "sunset_utc"),
+        [
+            (date(2024, 6, 21), time(3, 47), time(19, 58)),  # Solstice d'été, Paris
+            (date(2024, 12, 21), time(7, 42), time(15, 56)),  # Solstice d'hiver, Paris
+        ],
+    )
+    def test_paris_solstices(self, date_obj: date, sunrise_utc: time, sunset_utc: time) -> None:
+        """Horaires conformes aux éphémérides à 2 minutes près."""
+        sun_times = compute_sun_times(date_obj, 48.9, 2.3)
+
+        assert abs(self._minutes(sun_times["sunrise"]) - self._minutes(sunrise_utc)) <= 2
+        assert abs(self._minutes(sun_times["sunset"]) - self._minutes(sunset_utc)) <= 2
+
+    def test_vectorized_matches_scalar(self) -> None:
+        """Le calcul vectorisé donne les mêmes valeurs que le calcul unitaire."""
+        import numpy as np
+
+        dates = ["2024-03-01", "2024-06-15", "2024-11-30"]
+        coords = [DEPARTEMENTS["75"], DEPARTEMENTS["2A"], DEPARTEMENTS["974"]]
+        sunrises, sunsets = sun_times_minutes(
+            np.array(dates, dtype="datetime64[D]"),
+            np.array([c["lat"] for c in coords]),
+            np.array([c["lon"] for c in coords]),
+        )
+
+        for date_str, c, sunrise, sunset in zip(dates, coords, sunrises, sunsets, strict=True):
+            expected = compute_sun_times(date.fromisoformat(date_str), c["lat"], c["lon"])
+            assert expected == {"sunrise": minutes_to_time(sunrise), "sunset": minutes_to_time(sunset)}
+
+    def test_all_departements_sunrise_before_sunset(self) -> None:
+        """Le lever précède le coucher pour tous les départements (en UTC)."""
+        for c in DEPARTEMENTS.values():
+            sun_times = compute_sun_times(date(2024, 6, 15), c["lat"], c["lon"])
+            assert sun_times["sunrise"] < sun_times["sunset"]
+
+    def test_minutes_to_time(self) -> None:
+        """Conversion minutes -> heure, arrondie à la seconde."""
+        assert minutes_to_time(0) == time(0, 0)
+        assert minutes_to_time(390.5) == time(6, 30, 30)
+        assert minutes_to_time(1439.999) == time(0, 0)
+
+
+class TestSunTable:
+    """Tests de la table précalculée des horaires du soleil."""
+
+    @pytest.fixture
+    def loaded_sun_table(self, tmp_path: Path) -> Iterator[Path]:
+        """Table construite pour l'année 2024 et mappée en mémoire."""
+        from services import sun_table
+
+        path = sun_table.build_sun_table(DEPARTEMENTS, 2024, 2024, tmp_path / "sun_times.npy")
+        assert sun_table.load_sun_table(path)
+        yield path
+        sun_table.unload_sun_table()
+
+    def test_table_shape_and_dtype(self, loaded_sun_table: Path) -> None:
+        """Table int16 de forme (départements, jours, 2)."""
+        import numpy as np
+
+        table = np.load(loaded_sun_table, mmap_mode="r")
+
+        assert table.dtype == np.int16
+        assert table.shape == (len(DEPARTEMENTS), 366, 2)
+
+    def test_lookup_matches_computation(self, loaded_sun_table: Path) -> None:
+        """La lecture dans la table est identique au calcul à la volée."""
+        import numpy as np
+
+        from services import sun_table
+
+        for date_obj in (date(2024, 1, 1), date(2024, 6, 21), date(2024, 12, 31)):
+            for code, c in DEPARTEMENTS.items():
+                sunrise, sunset = sun_times_minutes(np.datetime64(date_obj, "D"), c["lat"], c["lon"])
+                assert sun_table.lookup(code, date_obj) == (
+                    int(to_whole_minutes(sunrise)),
+                    int(to_whole_minutes(sunset)),
+                )
+
+    def test_lookup_out_of_range(self, loaded_sun_table: Path) -> None:
+        """Date hors plage ou département inconnu: None."""
+        from services import sun_table
+
+        assert sun_table.lookup("75", date(2023, 12, 31)) is None
+        assert sun_table.lookup("75", date(2025, 1, 1)) is None
+        assert sun_table.lookup("999", date(2024, 6, 1)) is None
+
+    def test_lookup_without_table(self) -> None:
+        """Table non chargée: None."""
+        from services import sun_table
+
+        assert sun_table.lookup("75", date(2024, 6, 1)) is None
+
+    def test_load_missing_table(self, tmp_path: Path) -> None:
+        """Table absente: chargement refusé sans erreur."""
+        from services import sun_table
+
+        assert not sun_table.load_sun_table(tmp_path / "absent.npy")
+
+    def test_build_invalid_year_range(self, tmp_path: Path) -> None:
+        """Plage d'années inversée rejetée."""
+        from services import sun_table
+
+        with pytest.raises(ValueError, match="Plage d'années invalide"):
+            sun_table.build_sun_table(DEPARTEMENTS, 2025, 2024, tmp_path / "sun_times.npy")
+
+    @pytest.mark.asyncio
+    async def test_derive_features_table_matches_computation(self, loaded_sun_table: Path) -> None:
+        """est_nuit identique avec et sans table, à la minute près autour du lever et du coucher."""
+        from services import sun_table
+
+        sun_times = compute_sun_times(date(2024, 3, 10), *_get_departement_coords("29"))
+        heures = [
+            f"{h:02d}:{m:02d}"
+            for t in (sun_times["sunrise"], sun_times["sunset"])
+            for h, m in ((t.hour, t.minute), (t.hour, (t.minute + 1) % 60))
+        ]
+
+        async def est_nuit(heure: str) -> int:
+            features = await derive_all_features(
+                date_str="2024-03-10",
+                heure_str=heure,
+                departement="29",
+                agg=True,
+                vma=50,
+                impl_vehicule_leger=True,
+                impl_poids_lourd=False,
+                impl_pieton=False,
+            )
+            return int(features["est_nuit"])
+
+        with_table = [await est_nuit(heure) for heure in heures]
+        sun_table.unload_sun_table()
+        without_table = [await est_nuit(heure) for heure in heures]
+
+        assert with_table == without_table
+        assert with_table == [
+            _is_night(int(h[:2]), int(h[3:]), sun_times["sunrise"], sun_times["sunset"]) for h in heures
+        ]
+
+
+class TestSunTimesApiCache:
+    """Tests du cache des horaires du soleil en mode API."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self) -> Iterator[None]:
+        from services.feature_service import _sun_times_cache
+
+        _sun_times_cache.clear()
+        yield
+        _sun_times_cache.clear()
+
+    @staticmethod
+    def _api_client(response_json: dict | None = None, error: Exception | None = None) -> AsyncMock:
+        """Client httpx partagé mocké."""
+        from unittest.mock import MagicMock
+
+        response = MagicMock()
+        response.json.return_value = response_json
+        client = AsyncMock()
+        client.get.side_effect = error
+        client.get.return_value = response
+        return client
+
+    @pytest.mark.asyncio
+    async def test_success_cached(self) -> None:
+        """Réponse de l'API mise en cache sans expiration."""
+        from services.feature_service import _get_sun_times
+
+        payload = {
+            "status": "OK",
+            "results": {"sunrise": "2024-06-15T03:47:00+00:00", "sunset": "2024-06-15T19:57:00+00:00"},
+        }
+        client = self._api_client(payload)
+
+        with patch("services.feature_service.get_http_client", return_value=client):
+            first = await _get_sun_times("2024-06-15", 48.9, 2.3)
+            second = await _get_sun_times("2024-06-15", 48.9, 2.3)
+
+        assert first == second == {"sunrise": time(3, 47), "sunset": time(19, 57)}
+        assert client.get.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_expires(self) -> None:
+        """La valeur de repli n'est conservée que SUN_CACHE_FALLBACK_TTL secondes."""
+        from services.feature_service import _get_sun_times, _sun_times_cache
+
+        client = self._api_client(error=RuntimeError("API indisponible"))
+        now = [0.0]
+
+        with (
+            patch("services.feature_service.get_http_client", return_value=client),
+            patch.object(_sun_times_cache, "_clock", lambda: now[0]),
+        ):
+            first = await _get_sun_times("2024-06-15", 48.9, 2.3)
+            await _get_sun_times("2024-06-15", 48.9, 2.3)  # repli encore valide: pas d'appel
+            now[0] = 1000.0
+            await _get_sun_times("2024-06-15", 48.9, 2.3)  # repli expiré: nouvel appel
+
+        assert first == {"sunrise": time(6, 0), "sunset": time(22, 0)}
+        assert client.get.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_single_api_call(self) -> None:
+        """Requêtes concurrentes pour la même clé: un seul appel à l'API."""
+        import asyncio
+
+        from services.feature_service import _get_sun_times
+
+        payload = {
+            "status": "OK",
+            "results": {"sunrise": "2024-06-15T03:47:00+00:00", "sunset": "2024-06-15T19:57:00+00:00"},
+        }
+        client = self._api_client(payload)
+
+        with patch("services.feature_service.get_http_client", return_value=client):
+            results = await asyncio.gather(*(_get_sun_times("2024-06-15", 48.9, 2.3) for _ in range(10)))
+
+        assert all(r == {"sunrise": time(3, 47), "sunset": time(19, 57)} for r in results)
+        assert client.get.await_count == 1
+
+    def test_cache_stats(self) -> None:
+        """Les statistiques du cache sont exposées."""
+        from services.feature_service import get_sun_cache_stats
+
+        assert set(get_sun_cache_stats()) == {
+            "size",
+            "maxsize",
+            "hits",
+            "misses",
+            "evictions",
+            "expirations",
+            "inflight",
+            "coalesced",
+        }
+
+
+class TestHttpClient:
+    """Tests du client HTTP partagé."""
+
+    @pytest.mark.asyncio
+    async def test_client_shared_and_closed(self) -> None:
+        """Un seul client réutilisé entre les appels, fermé à l'arrêt."""
+        from services.http_client import close_http_client, get_http_client, init_http_client
+
+        client = init_http_client()
+
+        assert get_http_client() is client
+        assert init_http_client() is client
+
+        await close_http_client()
+
+        assert client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_client_recreated_after_close(self) -> None:
+        """Hors lifespan, un nouveau client est créé à la demande."""
+        from services.http_client import close_http_client, get_http_client
+
+        first = get_http_client()
+        await close_http_client()
+        second = get_http_client()
+
+        assert second is not first
+        assert not second.is_closed
+        await close_http_client()
+
+
 class TestIsNight:
     """Tests de détection de la nuit."""
 
@@ -161,7 +440,10 @@ class TestDeriveAllFeatures:
     @pytest.mark.asyncio
     async def test_derive_features_complete(self, mock_sun_times: dict[str, time]) -> None:
         """Dérivation complète des features."""
-        with patch("services.feature_service._get_sun_times", new_callable=AsyncMock, return_value=mock_sun_times):
+        with (
+            patch("services.feature_service.SUN_TIMES_MODE", "api"),
+            patch("services.feature_service._get_sun_times", new_callable=AsyncMock, return_value=mock_sun_times),
+        ):
             features = await derive_all_features(
                 date_str="2024-06-15",
                 heure_str="08:30",
@@ -186,7 +468,10 @@ class TestDeriveAllFeatures:
     @pytest.mark.asyncio
     async def test_derive_features_night(self, mock_sun_times: dict[str, time]) -> None:
         """Dérivation avec heure de nuit."""
-        with patch("services.feature_service._get_sun_times", new_callable=AsyncMock, return_value=mock_sun_times):
+        with (
+            patch("services.feature_service.SUN_TIMES_MODE", "api"),
+            patch("services.feature_service._get_sun_times", new_callable=AsyncMock, return_value=mock_sun_times),
+        ):
             features = await derive_all_features(
                 date_str="2024-06-15",
                 heure_str="23:00",
@@ -203,6 +488,35 @@ class TestDeriveAllFeatures:
         assert features["agg"] == 0
         assert features["vma"] == 130
 
+    @pytest.mark.asyncio
+    async def test_derive_features_local_mode_offline(self) -> None:
+        """Le mode local par défaut n'appelle pas l'API externe."""
+        with patch("services.feature_service._get_sun_times", new_callable=AsyncMock) as mock_sun:
+            day = await derive_all_features(
+                date_str="2024-12-21",
+                heure_str="12:00",
+                departement="75",
+                agg=True,
+                vma=50,
+                impl_vehicule_leger=True,
+                impl_poids_lourd=False,
+                impl_pieton=False,
+            )
+            night = await derive_all_features(
+                date_str="2024-12-21",
+                heure_str="17:00",
+                departement="75",
+                agg=True,
+                vma=50,
+                impl_vehicule_leger=True,
+                impl_poids_lourd=False,
+                impl_pieton=False,
+            )
+
+        mock_sun.assert_not_called()
+        assert day["est_nuit"] == 0
+        assert night["est_nuit"] == 1
+
     @pytest.mark.asyncio
     async def test_derive_features_invalid_departement(self) -> None:
         """Département invalide lève une erreur."""
@@ -233,7 +547,10 @@ class TestDeriveAllFeatures:
             "impl_pieton",
         }
 
-        with patch("services.feature_service._get_sun_times", new_callable=AsyncMock, return_value=mock_sun_times):
+        with (
+            patch("services.feature_service.SUN_TIMES_MODE", "api"),
+            patch("services.feature_service._get_sun_times", new_callable=AsyncMock, return_value=mock_sun_times),
+        ):
             features = await derive_all_features(
                 date_str="2024-06-15",
                 heure_str="12:00",
@@ -246,3 +563,100 @@ class TestDeriveAllFeatures:
             )
 
         assert set(features.keys()) == expected_keys
+
+
+class TestDeriveFeaturesBatch:
+    """Tests de la dérivation des features par lot."""
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_single(self, valid_accident_input: dict, mock_sun_times: dict[str, time]) -> None:
+        """Le lot donne les mêmes features que l'appel unitaire."""
+        from schemas import AccidentInput
+
+        night_input = {**valid_accident_input, "heure": "23:00", "agg": False, "vma": 90}
+        inputs = [AccidentInput(**valid_accident_input), AccidentInput(**night_input)]
+
+        with (
+            patch("services.feature_service.SUN_TIMES_MODE", "api"),
+            patch("services.feature_service._get_sun_times", new_callable=AsyncMock, return_value=mock_sun_times),
+        ):
+            batch = await derive_features_batch(inputs)
+            singles = [
+                await derive_all_features(
+                    date_str=item.date,
+                    heure_str=item.heure,
+                    departement=item.departement,
+                    agg=item.agg,
+                    vma=item.vma,
+                    impl_vehicule_leger=item.impl_vehicule_leger,
+                    impl_poids_lourd=item.impl_poids_lourd,
+                    impl_pieton=item.impl_pieton,
+                )
+                for item in inputs
+            ]
+
+        assert batch == singles
+
+    @pytest.mark.asyncio
+    async def test_batch_sun_times_deduplicated(
+        self, valid_accident_input: dict, mock_sun_times: dict[str, time]
+    ) -> None:
+        """Un seul appel soleil par couple (date, département) distinct."""
+        from schemas import AccidentInput
+
+        inputs = [
+            AccidentInput(**valid_accident_input),
+            AccidentInput(**{**valid_accident_input, "heure": "12:00"}),
+            AccidentInput(**{**valid_accident_input, "departement": "69"}),
+        ]
+
+        with (
+            patch("services.feature_service.SUN_TIMES_MODE", "api"),
+            patch(
+                "services.feature_service._get_sun_times", new_callable=AsyncMock, return_value=mock_sun_times
+            ) as mock_sun,
+        ):
+            features = await derive_features_batch(inputs)
+
+        assert len(features) == 3
+        assert mock_sun.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_local_mode_matches_single(self, valid_accident_input: dict) -> None:
+        """En mode local, le calcul vectorisé du lot donne les mêmes features que l'appel unitaire."""
+        from schemas import AccidentInput
+
+        inputs = [
+            AccidentInput(**{**valid_accident_input, "date": "2024-12-21", "heure": "17:00"}),
+            AccidentInput(**{**valid_accident_input, "departement": "974", "heure": "04:00"}),
+        ]
+
+        batch = await derive_features_batch(inputs)
+        singles = [
+            await derive_all_features(
+                date_str=item.date,
+                heure_str=item.heure,
+                departement=item.departement,
+                agg=item.agg,
+                vma=item.vma,
+                impl_vehicule_leger=item.impl_vehicule_leger,
+                impl_poids_lourd=item.impl_poids_lourd,
+                impl_pieton=item.impl_pieton,
+            )
+            for item in inputs
+        ]
+
+        assert batch == singles
+
+    @pytest.mark.asyncio
+    async def test_batch_invalid_departement(self, valid_accident_input: dict) -> None:
+        """Un département inconnu fait échouer tout le lot."""
+        from schemas import AccidentInput
+
+        inputs = [
+            AccidentInput(**valid_accident_input),
+            AccidentInput(**{**valid_accident_input, "departement": "999"}),
+        ]
+
+        with pytest.raises(ValueError, match="Département inconnu"):
+            await derive_features_batch(inputs)
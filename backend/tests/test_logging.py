@@ -0,0 +1,136 @@
+"""
+Tests de la configuration du logging et de la trace des prédictions.
+
+Ces tests vérifient les niveaux par module et l'émission échantillonnée
+de la trace structurée.
+"""
+
+import json
+import logging
+from collections.abc import Iterator
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from logging_config import configure_logging, parse_log_levels
+from services.prediction_trace import PredictionTrace
+
+
+class TestLogLevels:
+    """Tests de la politique de niveaux de log."""
+
+    def test_parse_log_levels(self) -> None:
+        """Liste module=NIVEAU parsée, niveaux normalisés en majuscules."""
+        levels = parse_log_levels("services.ml_service=debug, prediction.trace=INFO,")
+
+        assert levels == {"services.ml_service": "DEBUG", "prediction.trace": "INFO"}
+
+    def test_parse_empty(self) -> None:
+        """Chaîne vide: aucun niveau spécifique."""
+        assert parse_log_levels("") == {}
+
+    @pytest.mark.parametrize("spec", ["services.ml_service", "=DEBUG", "services.ml_service="])
+    def test_parse_invalid(self, spec: str) -> None:
+        """Entrée mal formée rejetée."""
+        with pytest.raises(ValueError, match="LOG_LEVELS invalide"):
+            parse_log_levels(spec)
+
+    def test_configure_logging_per_module(self) -> None:
+        """Les niveaux par module sont appliqués aux loggers."""
+        target = logging.getLogger("tests.logging.target")
+
+        with patch("logging_config.LOG_LEVELS", "tests.logging.target=WARNING"):
+            configure_logging()
+
+        assert target.level == logging.WARNING
+        target.setLevel(logging.NOTSET)
+
+
+class TestPredictionTrace:
+    """Tests de la trace structurée des prédictions."""
+
+    @pytest.fixture
+    def trace_caplog(self, caplog: pytest.LogCaptureFixture) -> Iterator[pytest.LogCaptureFixture]:
+        with caplog.at_level(logging.INFO, logger="prediction.trace"):
+            yield caplog
+
+    def test_disabled_trace_emits_nothing(self, trace_caplog: pytest.LogCaptureFixture) -> None:
+        """Trace non échantillonnée: aucune émission."""
+        trace = PredictionTrace(enabled=False)
+        trace.mark("features", features={"vma": 50})
+        trace.emit()
+
+        assert trace_caplog.records == []
+        assert trace.fields == {}
+
+    def test_enabled_trace_emits_json(self, trace_caplog: pytest.LogCaptureFixture) -> None:
+        """Trace échantillonnée: une ligne JSON avec données et durées par étape."""
+        from schemas import PredictionResponse
+
+        trace = PredictionTrace(enabled=True)
+        trace.mark("features", features={"vma": 50})
+        trace.mark("model", result=PredictionResponse(id=None, gravite=0, probabilite_grave=0.2, label="Non grave"))
+        trace.emit()
+
+        assert len(trace_caplog.records) == 1
+        payload = json.loads(trace_caplog.records[0].getMessage())
+        assert payload["event"] == "prediction_trace"
+        assert payload["features"] == {"vma": 50}
+        assert payload["result"]["label"] == "Non grave"
+        assert set(payload["durations_ms"]) == {"features", "model"}
+
+    def test_sample_rate_zero_disables(self) -> None:
+        """Taux d'échantillonnage nul: trace désactivée."""
+        with patch("services.prediction_trace.PREDICTION_TRACE_SAMPLE_RATE", 0.0):
+            assert not PredictionTrace().enabled
+
+    def test_sample_rate_one_enables(self, trace_caplog: pytest.LogCaptureFixture) -> None:
+        """Taux d'échantillonnage de 1: toutes les requêtes sont tracées."""
+        with patch("services.prediction_trace.PREDICTION_TRACE_SAMPLE_RATE", 1.0):
+            assert PredictionTrace().enabled
+
+
+class TestPredictionPathLogging:
+    """Tests du volume de logs sur le chemin de prédiction."""
+
+    @pytest.mark.asyncio
+    async def test_no_info_logs_per_request(
+        self,
+        async_client: AsyncClient,
+        valid_accident_input: dict[str, Any],
+        mock_db_session: AsyncMock,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Au niveau INFO, une prédiction réussie n'émet aucun log."""
+        from services.inference_executor import start_executor
+
+        start_executor()  # démarrage du pool (normalement fait dans le lifespan)
+        with caplog.at_level(logging.INFO):
+            response = await async_client.post("/predict", json=valid_accident_input)
+
+        assert response.status_code == 200
+        assert [r for r in caplog.records if r.name.startswith(("services", "controllers"))] == []
+
+    @pytest.mark.asyncio
+    async def test_sampled_request_traced(
+        self,
+        async_client: AsyncClient,
+        valid_accident_input: dict[str, Any],
+        mock_db_session: AsyncMock,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        """Requête échantillonnée: trace avec entrée, features, résultat et durées."""
+        with (
+            patch("services.prediction_trace.PREDICTION_TRACE_SAMPLE_RATE", 1.0),
+            caplog.at_level(logging.INFO, logger="prediction.trace"),
+        ):
+            response = await async_client.post("/predict", json=valid_accident_input)
+
+        assert response.status_code == 200
+        traces = [json.loads(r.getMessage()) for r in caplog.records if r.name == "prediction.trace"]
+        assert len(traces) == 1
+        assert traces[0]["input"]["departement"] == "75"
+        assert traces[0]["features"]["vma"] == 50
+        assert set(traces[0]["durations_ms"]) == {"features", "model", "persistence"}
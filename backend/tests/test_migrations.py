@@ -0,0 +1,187 @@
+"""
+Tests des migrations ponctuelles de la table predictions (services.migrations).
+
+Ces tests vérifient le remplissage par lots des colonnes typées et l'ordre
+des étapes de la conversion de l'ancienne colonne JSON.
+"""
+
+from collections.abc import Iterator
+from contextlib import asynccontextmanager
+from types import ModuleType
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+@pytest.fixture
+def migrations() -> Iterator[ModuleType]:
+    """Module de migrations importé avec une BDD mockée."""
+    with (
+        patch.dict("os.environ", {"POSTGRES_USER": "test", "POSTGRES_PASSWORD": "test"}),
+        patch("database.create_async_engine"),
+        patch("database.async_sessionmaker"),
+    ):
+        import services.migrations as module
+
+        yield module
+
+
+def executed_sql(connection: MagicMock) -> list[str]:
+    """Requêtes SQL exécutées sur la connexion mockée."""
+    return [str(call.args[0]) for call in connection.execute.call_args_list]
+
+
+class FakeEngine:
+    """Engine dont chaque transaction exécute run_sync sur la même connexion synchrone mockée."""
+
+    def __init__(self, connection: MagicMock) -> None:
+        self.connection = connection
+        self.transactions = 0
+
+    @asynccontextmanager
+    async def _transaction(self) -> Any:
+        self.transactions += 1
+        outer = self
+
+        class Conn:
+            async def run_sync(self, fn: Any, *args: Any) -> Any:
+                return fn(outer.connection, *args)
+
+        yield Conn()
+
+    def begin(self) -> Any:
+        return self._transaction()
+
+    def connect(self) -> Any:
+        return self._transaction()
+
+
+class TestJsonFeaturesMigration:
+    """Tests de la conversion de predictions.features (JSON) en colonnes typées."""
+
+    def test_backfill_batch_bounded_by_id(self, migrations: ModuleType) -> None:
+        """Un lot couvre les batch_size identifiants suivants et ne touche que les lignes non remplies."""
+        connection = MagicMock()
+        connection.execute.return_value.scalar.return_value = 2500
+        connection.execute.return_value.rowcount = 1000
+
+        assert migrations.backfill_features_batch(connection, 1500, 1000) == (2500, 1000)
+
+        (bound_sql, bound_params), (update_sql, update_params) = [
+            (str(call.args[0]), call.args[1]) for call in connection.execute.call_args_list
+        ]
+        assert "ORDER BY id LIMIT :n" in bound_sql
+        assert bound_params == {"after": 1500, "n": 1000}
+        assert "id > :after AND id <= :until AND est_nuit IS NULL" in update_sql
+        assert update_params == {"after": 1500, "until": 2500}
+
+    def test_backfill_done(self, migrations: ModuleType) -> None:
+        """Plus de lignes après le dernier identifiant: fin du remplissage, sans UPDATE."""
+        connection = MagicMock()
+        connection.execute.return_value.scalar.return_value = None
+
+        assert migrations.backfill_features_batch(connection, 2500, 1000) is None
+        assert connection.execute.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_migration_steps(self, migrations: ModuleType) -> None:
+        """Colonnes ajoutées, un lot par transaction, contrainte validée, puis NOT NULL et suppression du JSON."""
+        connection = MagicMock()
+        engine = FakeEngine(connection)
+        batches = iter([(1000, 1000), (1800, 800), None])
+
+        with (
+            patch.object(migrations, "engine", engine),
+            patch.object(migrations, "has_json_features", return_value=True),
+            patch.object(migrations, "backfill_features_batch", side_effect=lambda *_: next(batches)) as backfill,
+        ):
+            await migrations.migrate_json_features(batch_size=1000)
+
+        assert [call.args[1:] for call in backfill.call_args_list] == [(0, 1000), (1000, 1000), (1800, 1000)]
+        sql = [statement for statement in executed_sql(connection) if "lock_timeout" not in statement]
+        assert "ADD COLUMN IF NOT EXISTS est_nuit" in sql[0]
+        assert "NOT VALID" in sql[2]
+        assert "VALIDATE CONSTRAINT" in sql[3]
+        assert "SET NOT NULL" in sql[4] and "DROP COLUMN features" in sql[4]
+        # Vérification, ajout des colonnes, 3 lots, contrainte, validation, suppression du JSON
+        assert engine.transactions == 8
+
+    @pytest.mark.asyncio
+    async def test_migration_skipped_when_done(self, migrations: ModuleType) -> None:
+        """Table déjà migrée: aucune requête de migration."""
+        connection = MagicMock()
+
+        with (
+            patch.object(migrations, "engine", FakeEngine(connection)),
+            patch.object(migrations, "has_json_features", return_value=False),
+        ):
+            await migrations.migrate_json_features()
+
+        connection.execute.assert_not_called()
+
+
+class TestMissingIndexes:
+    """Tests de la construction concurrente des index manquants."""
+
+    @pytest.fixture
+    def connection(self, migrations: ModuleType) -> Iterator[MagicMock]:
+        """Connexion mockée sur une table existante n'ayant que l'index sur created_at."""
+        connection = MagicMock()
+        connection.dialect.identifier_preparer.quote.side_effect = lambda name: name
+        inspector = MagicMock()
+        inspector.get_indexes.return_value = [{"name": "ix_predictions_created_at_id"}]
+        with patch.object(migrations, "inspect", return_value=inspector):
+            yield connection
+
+    def test_concurrent_build_on_plain_table(self, migrations: ModuleType, connection: MagicMock) -> None:
+        """Table ordinaire: CREATE INDEX CONCURRENTLY des seuls index absents, un index invalide est reconstruit."""
+        invalid = {"predictions": {"ix_predictions_probabilite_grave"}}
+
+        with (
+            patch.object(migrations, "is_partitioned", return_value=False),
+            patch.object(migrations, "_invalid_indexes", side_effect=lambda _, table: invalid.get(table, set())),
+        ):
+            built = migrations.build_missing_indexes(connection)
+
+        assert built == [
+            "ix_predictions_departement_created_at_id",
+            "ix_predictions_gravite_created_at_id",
+            "ix_predictions_probabilite_grave",
+        ]
+        sql = executed_sql(connection)
+        assert all("CONCURRENTLY" in statement for statement in sql)
+        assert "ix_predictions_created_at_id " not in " ".join(sql)
+        assert sql[-2] == "DROP INDEX CONCURRENTLY IF EXISTS ix_predictions_probabilite_grave"
+        assert sql[-1] == (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_predictions_probabilite_grave "
+            "ON predictions (probabilite_grave)"
+        )
+
+    def test_partitioned_table_built_per_partition(self, migrations: ModuleType, connection: MagicMock) -> None:
+        """Table partitionnée: index ON ONLY sur la parente, index concurrent par partition puis rattachement."""
+        with (
+            patch.object(migrations, "is_partitioned", return_value=True),
+            patch.object(migrations, "list_partitions", return_value=["predictions_y2024m06", "predictions_default"]),
+            patch.object(migrations, "_invalid_indexes", return_value=set()),
+            patch.object(
+                migrations.Base.metadata.tables["predictions"],
+                "indexes",
+                {
+                    index
+                    for index in migrations.Prediction.__table__.indexes
+                    if index.name.endswith("probabilite_grave")
+                },
+            ),
+        ):
+            migrations.build_missing_indexes(connection)
+
+        assert executed_sql(connection) == [
+            "CREATE INDEX IF NOT EXISTS ix_predictions_probabilite_grave ON ONLY predictions (probabilite_grave)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS predictions_default_probabilite_grave "
+            "ON predictions_default (probabilite_grave)",
+            "ALTER INDEX ix_predictions_probabilite_grave ATTACH PARTITION predictions_default_probabilite_grave",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS predictions_y2024m06_probabilite_grave "
+            "ON predictions_y2024m06 (probabilite_grave)",
+            "ALTER INDEX ix_predictions_probabilite_grave ATTACH PARTITION predictions_y2024m06_probabilite_grave",
+        ]
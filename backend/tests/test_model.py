@@ -4,12 +4,14 @@ Tests du module de prédiction ML.
 Ces tests vérifient le chargement du modèle et la logique de prédiction.
 """
 
+from collections.abc import Iterator
 from typing import Any
 from unittest.mock import MagicMock, patch
 
 import pytest
+from httpx import AsyncClient
 
-from services.ml_service import FEATURE_ORDER, predict
+from services.ml_service import FEATURE_ORDER, create_bundle, predict, predict_batch
 
 
 class TestFeatureOrder:
@@ -44,9 +46,7 @@ class TestPredict:
         mock_model.predict_proba.return_value = [[0.75, 0.25]]
 
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", None),
-            patch("services.ml_service._scaler", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
         ):
             result = predict(valid_features)
 
@@ -60,9 +60,7 @@ class TestPredict:
         mock_model.predict_proba.return_value = [[0.20, 0.80]]
 
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", None),
-            patch("services.ml_service._scaler", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
         ):
             result = predict(valid_features)
 
@@ -76,9 +74,7 @@ class TestPredict:
         mock_model.predict_proba.return_value = [[0.765432, 0.234568]]
 
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", None),
-            patch("services.ml_service._scaler", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
         ):
             result = predict(valid_features)
 
@@ -99,9 +95,7 @@ class TestPredict:
         mock_scaler.transform.return_value = np.array([[0.0, 1.0, 0.5, 1.0, 1.0, 0.4, 1.0, 0.0, 0.0]])
 
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", mock_imputer),
-            patch("services.ml_service._scaler", mock_scaler),
+            patch("services.ml_service._bundle", create_bundle(mock_model, mock_imputer, mock_scaler)),
         ):
             result = predict(valid_features)
 
@@ -116,9 +110,7 @@ class TestPredict:
         del mock_model.predict_proba
 
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", None),
-            patch("services.ml_service._scaler", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
         ):
             result = predict(valid_features)
 
@@ -126,19 +118,333 @@ class TestPredict:
         assert result["probabilite_grave"] == 1.0
         assert result["label"] == "Grave"
 
+    def test_predict_single_model_pass(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Un seul appel predict_proba sur une ligne NumPy ordonnée, sans appel à predict."""
+        mock_model.predict_proba.return_value = [[0.30, 0.70]]
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            result = predict(valid_features)
+
+        mock_model.predict_proba.assert_called_once()
+        mock_model.predict.assert_not_called()
+        input_data = mock_model.predict_proba.call_args.args[0]
+        assert input_data.tolist() == [[valid_features[name] for name in FEATURE_ORDER]]
+        assert result["gravite"] == 1
+
+    def test_predict_uses_model_threshold(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """La classe est dérivée du seuil de probabilité du modèle (CatBoost)."""
+        mock_model.predict_proba.return_value = [[0.35, 0.65]]
+        mock_model.get_probability_threshold.return_value = 0.7
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            result = predict(valid_features)
+
+        assert result["gravite"] == 0
+        assert result["probabilite_grave"] == 0.65
+
     def test_predict_returns_expected_keys(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
         """Résultat contient les clés attendues."""
         mock_model.predict.return_value = [0]
         mock_model.predict_proba.return_value = [[0.70, 0.30]]
 
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", None),
-            patch("services.ml_service._scaler", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            result = predict(valid_features)
+
+        assert set(result.keys()) == {"gravite", "probabilite_grave", "label", "model_version"}
+
+    def test_feature_names_warning_suppressed_locally(self) -> None:
+        """L'avertissement sklearn sur les noms de features n'est ignoré que pendant le scoring."""
+        import warnings
+
+        import numpy as np
+        import pandas as pd
+        from sklearn.preprocessing import StandardScaler
+
+        from services.ml_service import score_pipeline
+
+        scaler = StandardScaler().fit(pd.DataFrame({"a": [0.0, 1.0], "b": [1.0, 3.0]}))
+        model = MagicMock()
+        model.predict_proba.return_value = np.array([[0.9, 0.1]])
+        matrix = np.array([[0.5, 2.0]])
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            score_pipeline(model, None, scaler, matrix)
+            assert not caught
+            scaler.transform(matrix)
+
+        assert any("valid feature names" in str(w.message) for w in caught)
+
+
+class TestPredictBatch:
+    """Tests de la prédiction par lot."""
+
+    def test_predict_batch_single_model_call(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Un seul appel predict_proba pour tout le lot, sans appel à predict."""
+        import numpy as np
+
+        mock_model.predict_proba.return_value = np.array([[0.75, 0.25], [0.20, 0.80], [0.5, 0.5]])
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            results = predict_batch([valid_features] * 3)
+
+        mock_model.predict_proba.assert_called_once()
+        mock_model.predict.assert_not_called()
+        input_data = mock_model.predict_proba.call_args.args[0]
+        assert input_data.shape == (3, len(FEATURE_ORDER))
+        assert [r["gravite"] for r in results] == [0, 1, 0]
+        assert [r["label"] for r in results] == ["Non grave", "Grave", "Non grave"]
+        assert results[1]["probabilite_grave"] == 0.8
+
+    def test_predict_batch_matches_single(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Le résultat par lot est identique à la prédiction unitaire."""
+        mock_model.predict.return_value = [0]
+        mock_model.predict_proba.return_value = [[0.765432, 0.234568]]
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            assert predict_batch([valid_features]) == [predict(valid_features)]
+
+    def test_predict_batch_empty(self) -> None:
+        """Lot vide: aucun appel au modèle."""
+        assert predict_batch([]) == []
+
+
+class TestPredictionCache:
+    """Tests du cache des résultats de prédiction."""
+
+    def test_repeated_vector_served_from_cache(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Un vecteur déjà prédit ne repasse pas par le modèle."""
+        mock_model.predict_proba.return_value = [[0.30, 0.70]]
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            first = predict(valid_features)
+            second = predict(dict(valid_features))
+
+        mock_model.predict_proba.assert_called_once()
+        assert first == second
+
+    def test_batch_scores_only_missing_rows(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Par lot, seules les lignes absentes du cache sont envoyées au modèle."""
+        import numpy as np
+
+        other = {**valid_features, "vma": 90}
+        mock_model.predict_proba.return_value = np.array([[0.30, 0.70]])
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            cached = predict(valid_features)
+            mock_model.predict_proba.return_value = np.array([[0.90, 0.10]])
+            results = predict_batch([valid_features, other])
+
+        assert mock_model.predict_proba.call_count == 2
+        assert mock_model.predict_proba.call_args.args[0].tolist() == [[other[name] for name in FEATURE_ORDER]]
+        assert results[0] == cached
+        assert results[1]["gravite"] == 0
+
+    def test_invalidated_when_model_changes(self, valid_features: dict[str, Any]) -> None:
+        """Un nouveau modèle ne reçoit pas les résultats de l'ancien."""
+        old_model, new_model = MagicMock(), MagicMock()
+        old_model.predict_proba.return_value = [[0.30, 0.70]]
+        new_model.predict_proba.return_value = [[0.80, 0.20]]
+
+        with patch("services.ml_service._bundle", create_bundle(old_model, version="v1")):
+            assert predict(valid_features)["gravite"] == 1
+        with patch("services.ml_service._bundle", create_bundle(new_model, version="v2")):
+            assert predict(valid_features)["gravite"] == 0
+
+        new_model.predict_proba.assert_called_once()
+
+    def test_shared_store_keyed_by_model_version(
+        self, valid_features: dict[str, Any], mock_model: MagicMock, tmp_path: Any
+    ) -> None:
+        """La base partagée sert un autre processus pour le même fichier de modèle uniquement."""
+        from services import ml_service
+
+        mock_model.predict_proba.return_value = [[0.30, 0.70]]
+
+        with (
+            patch("services.ml_service.PREDICTION_CACHE_PATH", str(tmp_path / "cache.db")),
+            patch("services.ml_service._result_store", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model, version="v1")),
+        ):
+            predict(valid_features)
+            # Cache mémoire vide, comme dans un autre worker
+            with patch("services.ml_service._bundle", create_bundle(mock_model, version="v1")):
+                assert predict(valid_features)["gravite"] == 1
+            mock_model.predict_proba.assert_called_once()
+
+            with patch("services.ml_service._bundle", create_bundle(mock_model, version="v2")):
+                predict(valid_features)
+            assert mock_model.predict_proba.call_count == 2
+            ml_service._get_result_store().close()
+
+    def test_batch_misses_stored_in_one_transaction(
+        self, valid_features: dict[str, Any], mock_model: MagicMock, tmp_path: Any
+    ) -> None:
+        """Par lot, les résultats absents sont écrits dans la base partagée en un seul executemany."""
+        import numpy as np
+
+        store = MagicMock()
+        store.__enter__.return_value = store
+        store.execute.return_value.fetchone.return_value = None
+        other = {**valid_features, "vma": 90}
+        mock_model.predict_proba.return_value = np.array([[0.30, 0.70], [0.90, 0.10]])
+
+        with (
+            patch("services.ml_service.PREDICTION_CACHE_PATH", str(tmp_path / "cache.db")),
+            patch("services.ml_service._result_store", store),
+            patch("services.ml_service._bundle", create_bundle(mock_model, version="v1")),
+        ):
+            predict_batch([valid_features, other])
+
+        store.executemany.assert_called_once()
+        sql, rows = store.executemany.call_args.args
+        assert sql.startswith("INSERT OR REPLACE INTO prediction_cache")
+        assert [(row[0], row[2]) for row in rows] == [("v1", 1), ("v1", 0)]
+        store.__enter__.assert_called_once()
+        store.__exit__.assert_called_once()
+
+    def test_shared_store_errors_fail_open(
+        self, valid_features: dict[str, Any], mock_model: MagicMock, tmp_path: Any, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Base partagée verrouillée: la prédiction passe par le modèle, l'erreur est journalisée une fois."""
+        import sqlite3
+
+        store = MagicMock()
+        store.__enter__.return_value = store
+        store.execute.side_effect = sqlite3.OperationalError("database is locked")
+        store.executemany.side_effect = sqlite3.OperationalError("database is locked")
+        mock_model.predict_proba.return_value = [[0.30, 0.70]]
+
+        with (
+            patch("services.ml_service.PREDICTION_CACHE_PATH", str(tmp_path / "cache.db")),
+            patch("services.ml_service._result_store", store),
+            patch("services.ml_service._result_store_warned_at", None),
+            patch("services.ml_service._bundle", create_bundle(mock_model, version="v1")),
+            caplog.at_level("WARNING"),
         ):
             result = predict(valid_features)
+            other = predict({**valid_features, "vma": 90})
 
-        assert set(result.keys()) == {"gravite", "probabilite_grave", "label"}
+        assert (result["gravite"], other["gravite"]) == (1, 1)
+        assert mock_model.predict_proba.call_count == 2
+        store.executemany.assert_called()
+        assert caplog.text.count("database is locked") == 1
+
+    def test_disabled_cache(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """PREDICTION_CACHE_SIZE=0: chaque prédiction passe par le modèle."""
+        from services.ml_service import get_prediction_cache_stats
+
+        with (
+            patch("services.ml_service.PREDICTION_CACHE_SIZE", 0),
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            predict(valid_features)
+            predict(valid_features)
+            assert get_prediction_cache_stats() == {"enabled": False}
+
+        assert mock_model.predict_proba.call_count == 2
+
+
+class TestScoreTable:
+    """Tests de la table précalculée des scores."""
+
+    VMA = [30, 50, 90]
+
+    @staticmethod
+    def _score(matrix: Any) -> Any:
+        """Score déterministe distinct pour chaque vecteur du domaine."""
+        import numpy as np
+
+        probas = (matrix @ np.arange(1, matrix.shape[1] + 1)) / 1000.0
+        return (probas > 0.5).astype(int), probas
+
+    @pytest.fixture
+    def loaded_score_table(self, tmp_path: Any, mock_model: MagicMock) -> Iterator[Any]:
+        """Table générée dans un répertoire temporaire et chargée pour mock_model."""
+        from services import score_table
+
+        path = score_table.build_score_table(self._score, "v1", self.VMA, tmp_path / "scores.npy")
+        assert score_table.load_score_table(mock_model, self._score, "v1", path)
+        yield path
+        score_table.unload_score_table()
+
+    def test_table_covers_whole_domain(self, loaded_score_table: Any) -> None:
+        """Une entrée par combinaison des features, dans l'ordre du modèle."""
+        import numpy as np
+
+        table = np.load(loaded_score_table)
+        assert table.shape == (2, 2, 7, 2, 2, len(self.VMA), 2, 2, 2, 2)
+        assert table.dtype == np.float64
+
+    def test_lookup_matches_model(self, loaded_score_table: Any, mock_model: MagicMock) -> None:
+        """Chaque vecteur du domaine est servi avec le score exact du modèle."""
+        from services import score_table
+
+        matrix = score_table.domain_matrix(self.VMA)
+        predictions, probas = self._score(matrix)
+        for row, gravite, prob_grave in zip(matrix, predictions, probas, strict=True):
+            assert score_table.lookup(mock_model, tuple(row)) == (int(gravite), float(prob_grave))
+
+    def test_lookup_out_of_domain(self, loaded_score_table: Any, mock_model: MagicMock) -> None:
+        """vma non listée, valeur hors domaine ou autre modèle: pas de réponse de la table."""
+        from services import score_table
+
+        key = (0.0, 1.0, 3.0, 0.0, 1.0, 50.0, 1.0, 0.0, 0.0)
+        assert score_table.lookup(mock_model, key) is not None
+        assert score_table.lookup(mock_model, key[:5] + (70.0,) + key[6:]) is None
+        assert score_table.lookup(mock_model, key[:2] + (7.0,) + key[3:]) is None
+        assert score_table.lookup(MagicMock(), key) is None
+
+    def test_rejected_when_model_differs(self, loaded_score_table: Any, mock_model: MagicMock) -> None:
+        """Table refusée si elle diffère au bit près des scores du modèle ou d'un autre fichier de modèle."""
+        import numpy as np
+
+        from services import score_table
+
+        def shifted(matrix: Any) -> Any:
+            predictions, probas = self._score(matrix)
+            return predictions, np.nextafter(probas, 1.0)
+
+        assert not score_table.load_score_table(mock_model, shifted, "v1", loaded_score_table)
+        assert score_table.get_score_table_stats() == {"loaded": False}
+        assert not score_table.load_score_table(mock_model, self._score, "v2", loaded_score_table)
+        assert score_table.load_score_table(mock_model, self._score, "v1", loaded_score_table)
+
+    def test_predict_served_from_table(
+        self, loaded_score_table: Any, valid_features: dict[str, Any], mock_model: MagicMock
+    ) -> None:
+        """Prédictions du domaine servies par la table, vma hors table par le modèle."""
+        import numpy as np
+
+        mock_model.predict_proba.return_value = [[0.30, 0.70]]
+        features = {**valid_features, "vma": 50}
+        _, expected = self._score(np.array([[features[name] for name in FEATURE_ORDER]], dtype=np.float64))
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            results = predict_batch([features, {**valid_features, "vma": 70}])
+            single = predict(features)
+
+        mock_model.predict_proba.assert_called_once()
+        assert mock_model.predict_proba.call_args.args[0].shape == (1, len(FEATURE_ORDER))
+        assert results[0] == single
+        assert single["probabilite_grave"] == round(float(expected[0]), 4)
+        assert results[1]["gravite"] == 1
 
 
 class TestLoadModel:
@@ -153,32 +459,629 @@ class TestLoadModel:
         fake_path = MagicMock(spec=Path)
         fake_path.exists.return_value = False
 
-        with patch("services.ml_service.MODEL_PATH", fake_path):
+        with patch("services.ml_service.MODEL_PATH", fake_path), patch("services.ml_service.MODEL_FORMAT", "joblib"):
             with pytest.raises(FileNotFoundError):
                 load_model()
 
-    def test_load_model_success(self) -> None:
-        """Chargement réussi du modèle."""
+    def test_load_model_feature_order_mismatch(self) -> None:
+        """ValueError si l'ordre des features du modèle diffère de FEATURE_ORDER."""
         from services.ml_service import load_model
 
-        mock_model = MagicMock()
-        mock_data = {"model": mock_model, "imputer": None, "scaler": None}
+        mock_data = {"model": MagicMock(), "feature_names": list(reversed(FEATURE_ORDER))}
 
         with (
             patch("services.ml_service.MODEL_PATH") as mock_path,
+            patch("services.ml_service.MODEL_FORMAT", "joblib"),
             patch("services.ml_service.joblib.load", return_value=mock_data),
         ):
             mock_path.exists.return_value = True
+            mock_path.read_bytes.return_value = b"model"
+
+            with pytest.raises(ValueError, match="Ordre des features"):
+                load_model()
+
+    @staticmethod
+    def _model(proba: float) -> MagicMock:
+        """Modèle renvoyant la même probabilité grave pour chaque ligne."""
+        import numpy as np
 
+        model = MagicMock()
+        model.predict_proba.side_effect = lambda matrix: np.tile([1 - proba, proba], (len(matrix), 1))
+        return model
+
+    @pytest.fixture
+    def model_file(self) -> Iterator[MagicMock]:
+        """Fichier du modèle simulé (contenu dans read_bytes), aucun modèle en service au départ."""
+        with (
+            patch("services.ml_service.MODEL_PATH") as mock_path,
+            patch("services.ml_service.MODEL_FORMAT", "joblib"),
+            patch("services.ml_service._bundle", None),
+            patch("services.score_table.load_score_table", return_value=False),
+        ):
+            mock_path.exists.return_value = True
+            mock_path.read_bytes.return_value = b"model v1"
+            yield mock_path
+
+    def test_load_model_success(self, model_file: MagicMock) -> None:
+        """Le modèle est préchauffé sur un lot synthétique puis mis en service avec sa version."""
+        import hashlib
+
+        from services.ml_service import WARMUP_ROWS, get_bundle, get_pipeline, load_model
+
+        mock_model = self._model(0.2)
+        with (
+            patch("services.ml_service.joblib.load", return_value={"model": mock_model}),
+            patch("services.score_table.load_score_table", return_value=False) as mock_load_table,
+        ):
+            bundle = load_model()
+
+        assert bundle.version == hashlib.sha256(b"model v1").hexdigest()[:12]
+        assert get_bundle() is bundle
+        assert get_pipeline() == (mock_model, None, None)
+        assert mock_model.predict_proba.call_args.args[0].shape == (WARMUP_ROWS, len(FEATURE_ORDER))
+        mock_load_table.assert_called_once_with(mock_model, bundle.score, bundle.version)
+
+    def test_reload_swaps_bundle(self, model_file: MagicMock, valid_features: dict[str, Any]) -> None:
+        """Nouveau fichier: nouveau bundle; même fichier: bundle conservé."""
+        from services.ml_service import load_model
+
+        with patch("services.ml_service.joblib.load", return_value={"model": self._model(0.2)}):
+            first = load_model()
+            assert load_model() is first
+        first_result = predict(valid_features)
+
+        model_file.read_bytes.return_value = b"model v2"
+        with patch("services.ml_service.joblib.load", return_value={"model": self._model(0.9)}):
+            second = load_model()
+
+        assert second.version != first.version
+        result = predict(valid_features)
+        assert (first_result["gravite"], first_result["model_version"]) == (0, first.version)
+        assert (result["gravite"], result["model_version"]) == (1, second.version)
+
+    def test_failed_warmup_keeps_previous_model(self, model_file: MagicMock) -> None:
+        """Un modèle qui échoue au préchauffage n'est pas mis en service."""
+        from services.ml_service import get_bundle, load_model
+
+        with patch("services.ml_service.joblib.load", return_value={"model": self._model(0.2)}):
+            first = load_model()
+
+        broken = MagicMock()
+        broken.predict_proba.side_effect = RuntimeError("modèle corrompu")
+        model_file.read_bytes.return_value = b"model v2"
+        with (
+            patch("services.ml_service.joblib.load", return_value={"model": broken}),
+            pytest.raises(RuntimeError, match="corrompu"),
+        ):
             load_model()
 
-        # Vérifie que le modèle est chargé (via get_pipeline)
-        from services.ml_service import get_pipeline
+        assert get_bundle() is first
+
+    def test_in_flight_batch_served_by_one_model(self, model_file: MagicMock, valid_features: dict[str, Any]) -> None:
+        """Un rechargement pendant une prédiction n'affecte pas cette prédiction."""
+        from services.ml_service import load_model
+
+        with patch("services.ml_service.joblib.load", return_value={"model": self._model(0.2)}):
+            first = load_model()
+        new_model = self._model(0.9)
+
+        def reload_during_scoring(matrix: Any) -> Any:
+            model_file.read_bytes.return_value = b"model v2"
+            with patch("services.ml_service.joblib.load", return_value={"model": new_model}):
+                load_model()
+            return self._model(0.2).predict_proba(matrix)
+
+        first.model.predict_proba.side_effect = reload_during_scoring
+        results = predict_batch([valid_features, {**valid_features, "vma": 90}])
 
+        assert {(r["gravite"], r["model_version"]) for r in results} == {(0, first.version)}
+        assert predict(valid_features)["gravite"] == 1
+
+
+class TestNativeModel:
+    """Tests du chargement de l'export natif du modèle (booster + métadonnées JSON)."""
+
+    @pytest.fixture
+    def native_export(self, tmp_path: Any) -> Iterator[Any]:
+        """Export natif livré copié seul (sans .joblib) dans un répertoire temporaire."""
+        import shutil
+
+        from services import ml_service, native_model
+
+        shipped = native_model.metadata_path(ml_service.MODEL_PATH)
+        shutil.copy(shipped, tmp_path)
+        shutil.copy(shipped.with_suffix(".ubj"), tmp_path)
         with (
-            patch("services.ml_service._model", mock_model),
-            patch("services.ml_service._imputer", None),
-            patch("services.ml_service._scaler", None),
+            patch("services.ml_service.MODEL_PATH", tmp_path / ml_service.MODEL_PATH.name),
+            patch("services.ml_service._bundle", None),
+            patch("services.score_table.load_score_table", return_value=False),
         ):
-            model, imputer, scaler = get_pipeline()
-            assert model is mock_model
+            yield tmp_path
+
+    @pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+    def test_native_scores_match_joblib(self) -> None:
+        """L'export natif livré donne au bit près les scores du .joblib sur tout le domaine."""
+        import numpy as np
+
+        from services import ml_service, native_model, score_table
+
+        joblib_bundle = ml_service.create_bundle(
+            **{
+                key: value
+                for key, value in ml_service.joblib.load(ml_service.MODEL_PATH).items()
+                if key in ("model", "imputer", "scaler")
+            }
+        )
+        data, _ = native_model.load_native_model(native_model.metadata_path(ml_service.MODEL_PATH))
+        native_bundle = ml_service.create_bundle(data["model"], data["imputer"], data["scaler"])
+
+        matrix = score_table.domain_matrix(list(score_table.DEFAULT_VMA_VALUES))
+        expected, actual = joblib_bundle.score(matrix), native_bundle.score(matrix)
+        assert data["feature_names"] == FEATURE_ORDER
+        assert np.array_equal(expected[0], actual[0])
+        assert np.array_equal(expected[1], actual[1])
+
+    def test_auto_prefers_native_export(self, native_export: Any) -> None:
+        """MODEL_FORMAT=auto charge l'export natif quand ses métadonnées existent."""
+        from services import ml_service
+        from services.native_model import NativeClassifier
+
+        with patch("services.ml_service.MODEL_FORMAT", "auto"):
+            bundle = ml_service.load_model()
+
+        assert isinstance(bundle.model, NativeClassifier)
+        assert bundle.version
+
+    def test_shipped_export_matches_shipped_joblib(self) -> None:
+        """L'export natif livré a été produit à partir du .joblib livré."""
+        from services import ml_service, native_model
+
+        metadata = native_model.metadata_path(ml_service.MODEL_PATH)
+        assert native_model.is_export_of(metadata, ml_service.MODEL_PATH.read_bytes())
+
+    def test_auto_ignores_stale_native_export(self, native_export: Any, caplog: pytest.LogCaptureFixture) -> None:
+        """.joblib remplacé après l'export (réentraînement): MODEL_FORMAT=auto charge le .joblib."""
+        from pathlib import Path
+
+        from services import ml_service
+        from services.native_model import NativeClassifier
+
+        shipped = Path(ml_service.__file__).parent.parent / "ml_models" / ml_service.MODEL_PATH.name
+        retrained = {**ml_service.joblib.load(shipped), "model_name": "XGBoost réentraîné"}
+        ml_service.joblib.dump(retrained, ml_service.MODEL_PATH)
+
+        with patch("services.ml_service.MODEL_FORMAT", "auto"), caplog.at_level("WARNING"):
+            bundle = ml_service.load_model()
+
+        assert not isinstance(bundle.model, NativeClassifier)
+        assert "périmé" in caplog.text
+
+    def test_joblib_format_ignores_native_export(self, native_export: Any) -> None:
+        """MODEL_FORMAT=joblib n'utilise jamais l'export natif."""
+        from services import ml_service
+
+        with patch("services.ml_service.MODEL_FORMAT", "joblib"), pytest.raises(FileNotFoundError):
+            ml_service.load_model()
+
+    def test_preprocessing_matches_sklearn(self) -> None:
+        """Imputer et scaler reconstitués depuis leurs paramètres: mêmes résultats que sklearn."""
+        import numpy as np
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import StandardScaler
+
+        from services.native_model import NativeImputer, NativeScaler
+
+        rng = np.random.default_rng(0)
+        matrix = rng.normal(size=(50, 4))
+        matrix[rng.random(matrix.shape) < 0.2] = np.nan
+        imputer = SimpleImputer(strategy="median").fit(matrix)
+        scaler = StandardScaler().fit(imputer.transform(matrix))
+
+        native_imputer = NativeImputer(imputer.statistics_.tolist())
+        native_scaler = NativeScaler(scaler.mean_.tolist(), scaler.scale_.tolist())
+
+        imputed = native_imputer.transform(matrix)
+        np.testing.assert_array_equal(imputed, imputer.transform(matrix))
+        np.testing.assert_array_equal(native_scaler.transform(imputed), scaler.transform(imputed))
+
+    def test_unknown_native_format(self, tmp_path: Any) -> None:
+        """ValueError si le format déclaré dans les métadonnées est inconnu."""
+        from services.native_model import NativeClassifier
+
+        with pytest.raises(ValueError, match="Format natif inconnu"):
+            NativeClassifier("onnx", tmp_path / "model.onnx")
+
+
+class TestFusedPreprocessing:
+    """Tests du noyau de preprocessing fusionné (imputer + scaler)."""
+
+    @staticmethod
+    def _matrix_with_missing() -> Any:
+        """Domaine complet du modèle avec des valeurs manquantes (NaN) aléatoires."""
+        import numpy as np
+
+        from services import score_table
+
+        matrix = score_table.domain_matrix(list(score_table.DEFAULT_VMA_VALUES))
+        matrix[np.random.default_rng(0).random(matrix.shape) < 0.2] = np.nan
+        return matrix
+
+    @pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+    def test_pipeline_steps_fused(self) -> None:
+        """Le Pipeline livré est réduit à son estimateur, avec les scores exacts du Pipeline."""
+        import numpy as np
+
+        from services import ml_service
+        from services.preprocessing import FusedPreprocessor
+
+        pipeline = ml_service.joblib.load(ml_service.MODEL_PATH)["model"]
+        bundle = ml_service.create_bundle(pipeline)
+        matrix = self._matrix_with_missing()
+        original = matrix.copy()
+
+        assert bundle.model is pipeline.steps[-1][1]
+        assert isinstance(bundle.imputer, FusedPreprocessor) and bundle.scaler is None
+        np.testing.assert_array_equal(bundle.imputer.transform(matrix), pipeline[:-1].transform(matrix))
+        np.testing.assert_array_equal(bundle.score(matrix)[1], pipeline.predict_proba(matrix)[:, 1])
+        np.testing.assert_array_equal(matrix, original)
+
+    def test_separate_imputer_and_scaler_fused(self) -> None:
+        """Imputer et scaler fournis à part (artefact CatBoost): mêmes valeurs que sklearn, ligne seule ou lot."""
+        import numpy as np
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import StandardScaler
+
+        from services.preprocessing import FusedPreprocessor, fuse_pipeline
+
+        matrix = self._matrix_with_missing()
+        imputer = SimpleImputer(strategy="median").fit(matrix)
+        scaler = StandardScaler().fit(imputer.transform(matrix))
+        model = MagicMock()
+
+        fused_model, fused, rest = fuse_pipeline(model, imputer, scaler)
+
+        assert fused_model is model and rest is None
+        assert isinstance(fused, FusedPreprocessor)
+        for rows in (matrix[:1], matrix):
+            np.testing.assert_array_equal(fused.transform(rows), scaler.transform(imputer.transform(rows)))
+
+    def test_unsupported_preprocessing_kept(self) -> None:
+        """Un preprocessing non reconnu est laissé à sklearn."""
+        import numpy as np
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import MinMaxScaler
+
+        from services.preprocessing import fuse_pipeline
+
+        matrix = self._matrix_with_missing()
+        indicator = SimpleImputer(add_indicator=True).fit(matrix)
+        imputer = SimpleImputer().fit(matrix)
+        min_max = MinMaxScaler().fit(np.nan_to_num(matrix))
+        model = MagicMock()
+
+        assert fuse_pipeline(model, indicator, None) == (model, indicator, None)
+        assert fuse_pipeline(model, imputer, min_max) == (model, imputer, min_max)
+        assert fuse_pipeline(model) == (model, None, None)
+
+
+class TestModelReload:
+    """Tests du rechargement à chaud (POST /model/reload, surveillance du fichier)."""
+
+    @pytest.mark.asyncio
+    async def test_reload_endpoint(self, async_client: AsyncClient) -> None:
+        """POST /model/reload met le nouveau modèle en service et retourne les versions."""
+        new_bundle = create_bundle(MagicMock(), version="v2")
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(MagicMock(), version="v1")),
+            patch("services.ml_service.load_model", return_value=new_bundle),
+        ):
+            response = await async_client.post("/model/reload")
+
+        assert response.status_code == 200
+        assert response.json() == {"version": "v2", "previous_version": "v1", "reloaded": True}
+
+    @pytest.mark.asyncio
+    async def test_reload_failure_503(self, async_client: AsyncClient) -> None:
+        """Échec du rechargement: 503, modèle précédent conservé et échec compté."""
+        with (
+            patch("services.ml_service._bundle", create_bundle(MagicMock(), version="v1")),
+            patch("services.ml_service.load_model", side_effect=ValueError("Ordre des features")),
+        ):
+            response = await async_client.post("/model/reload")
+            info = (await async_client.get("/model")).json()
+
+        assert response.status_code == 503
+        assert "v1" in response.json()["detail"]
+        assert info["version"] == "v1"
+        assert info["last_error"] == "Ordre des features"
+
+    @pytest.mark.asyncio
+    async def test_process_pool_restarted(self) -> None:
+        """En mode "process", le pool est remplacé pour que ses workers chargent le nouveau modèle."""
+        from services.model_reload import reload_model
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(MagicMock(), version="v1")),
+            patch("services.ml_service.load_model", return_value=create_bundle(MagicMock(), version="v2")),
+            patch("services.inference_executor.INFERENCE_EXECUTOR", "process"),
+            patch("services.inference_executor.restart_executor") as mock_restart,
+        ):
+            await reload_model()
+
+        mock_restart.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_watcher_reloads_on_change(self, tmp_path: Any) -> None:
+        """La surveillance recharge le modèle quand son fichier change."""
+        import asyncio
+
+        from services import model_reload
+
+        model_path = tmp_path / "model.joblib"
+        model_path.write_bytes(b"v1")
+
+        with (
+            patch("services.ml_service.MODEL_PATH", model_path),
+            patch("services.model_reload.MODEL_WATCH_INTERVAL", 0.01),
+            patch("services.model_reload.reload_model") as mock_reload,
+        ):
+            model_reload.start_model_watcher()
+            await asyncio.sleep(0.05)
+            mock_reload.assert_not_called()
+
+            model_path.write_bytes(b"v2 plus long")
+            await asyncio.sleep(0.05)
+            await model_reload.stop_model_watcher()
+
+        mock_reload.assert_called_once()
+
+    def test_watcher_signature_includes_native_export(self, tmp_path: Any) -> None:
+        """Métadonnées de l'export natif et booster qu'elles désignent font partie de la signature surveillée."""
+        import json
+
+        from services import model_reload
+
+        model_path = tmp_path / "model.joblib"
+        model_path.write_bytes(b"v1")
+
+        with patch("services.ml_service.MODEL_PATH", model_path), patch("services.ml_service.MODEL_FORMAT", "auto"):
+            before = model_reload._file_signature()
+            (tmp_path / "model.json").write_text(json.dumps({"model_file": "model.ubj"}), encoding="utf-8")
+            (tmp_path / "model.ubj").write_bytes(b"booster v1")
+            with_export = model_reload._file_signature()
+            (tmp_path / "model.ubj").write_bytes(b"booster v2 plus long")
+            after = model_reload._file_signature()
+
+        assert before == (("model.joblib", before[0][1]), ("model.json", None))
+        assert [name for name, _ in with_export] == ["model.joblib", "model.json", "model.ubj"]
+        assert after[:2] == with_export[:2] and after[2] != with_export[2]
+
+    def test_watcher_signature_follows_model_format(self, tmp_path: Any) -> None:
+        """MODEL_FORMAT=joblib: seul le .joblib est surveillé; native: seul l'export natif."""
+        import json
+
+        from services import model_reload
+
+        model_path = tmp_path / "model.joblib"
+        (tmp_path / "model.json").write_text(json.dumps({"model_file": "model.ubj"}), encoding="utf-8")
+
+        with patch("services.ml_service.MODEL_PATH", model_path):
+            with patch("services.ml_service.MODEL_FORMAT", "joblib"):
+                assert [name for name, _ in model_reload._file_signature()] == ["model.joblib"]
+            with patch("services.ml_service.MODEL_FORMAT", "native"):
+                assert [name for name, _ in model_reload._file_signature()] == ["model.json", "model.ubj"]
+
+    @pytest.mark.asyncio
+    async def test_watcher_warns_when_version_unchanged(self, tmp_path: Any, caplog: pytest.LogCaptureFixture) -> None:
+        """Fichier modifié mais même version après rechargement: avertissement."""
+        import asyncio
+
+        from services import model_reload
+
+        model_path = tmp_path / "model.joblib"
+        model_path.write_bytes(b"v1")
+        unchanged = {"version": "v1", "previous_version": "v1", "reloaded": False}
+
+        with (
+            patch("services.ml_service.MODEL_PATH", model_path),
+            patch("services.ml_service.MODEL_FORMAT", "joblib"),
+            patch("services.model_reload.MODEL_WATCH_INTERVAL", 0.01),
+            patch("services.model_reload.reload_model", return_value=unchanged),
+            caplog.at_level("WARNING"),
+        ):
+            model_reload.start_model_watcher()
+            await asyncio.sleep(0.03)
+            model_path.write_bytes(b"v1 rewritten")
+            await asyncio.sleep(0.05)
+            await model_reload.stop_model_watcher()
+
+        assert "version v1 inchangée" in caplog.text
+
+
+class TestInferenceExecutor:
+    """Tests de l'exécution de l'inférence hors de la boucle d'événements."""
+
+    @pytest.mark.asyncio
+    async def test_runs_in_worker_thread(self) -> None:
+        """L'inférence s'exécute dans un thread du pool."""
+        import threading
+
+        from services.inference_executor import run_inference
+
+        worker_thread = await run_inference(threading.current_thread)
+
+        assert worker_thread is not threading.current_thread()
+        assert worker_thread.name.startswith("inference")
+
+    @pytest.mark.asyncio
+    async def test_event_loop_not_blocked(self) -> None:
+        """La boucle d'événements continue de tourner pendant une inférence lente."""
+        import asyncio
+        import time
+
+        from services.inference_executor import run_inference
+
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await run_inference(time.sleep, 0.2)
+        task.cancel()
+
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_overloaded_rejected(self) -> None:
+        """File pleine: la requête est rejetée et comptée."""
+        from services.inference_executor import InferenceOverloadedError, get_inference_stats, run_inference
+
+        rejected = get_inference_stats()["rejected"]
+
+        with patch("services.inference_executor.INFERENCE_MAX_PENDING", 0):
+            with pytest.raises(InferenceOverloadedError):
+                await run_inference(len, [])
+
+        assert get_inference_stats()["rejected"] == rejected + 1
+        assert get_inference_stats()["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_exception_propagated(self) -> None:
+        """Une erreur du modèle est propagée à l'appelant et libère la place."""
+        from services.inference_executor import get_inference_stats, run_inference
+
+        def failing() -> None:
+            raise ValueError("échec")
+
+        with pytest.raises(ValueError, match="échec"):
+            await run_inference(failing)
+
+        assert get_inference_stats()["pending"] == 0
+
+
+class TestMicroBatcher:
+    """Tests du regroupement des prédictions unitaires concurrentes."""
+
+    @staticmethod
+    def _proba(matrix: Any) -> Any:
+        """predict_proba mocké: probabilité 0.8 pour chaque ligne."""
+        import numpy as np
+
+        return np.tile([0.2, 0.8], (len(matrix), 1))
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_grouped(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Des appels concurrents sont servis par un seul predict_proba."""
+        import asyncio
+
+        from services.batcher import MicroBatcher
+
+        mock_model.predict_proba.side_effect = self._proba
+        batcher = MicroBatcher(max_batch_size=64, max_wait_ms=50, max_queue=100)
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            batcher.start()
+            results = await asyncio.gather(*(batcher.submit(valid_features) for _ in range(5)))
+            await batcher.stop()
+
+        mock_model.predict_proba.assert_called_once()
+        assert mock_model.predict_proba.call_args.args[0].shape == (5, len(FEATURE_ORDER))
+        assert results == [{"gravite": 1, "probabilite_grave": 0.8, "label": "Grave", "model_version": ""}] * 5
+        assert batcher.stats()["batches"] == 1
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size_respected(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Un lot ne dépasse jamais max_batch_size entrées."""
+        import asyncio
+
+        from services.batcher import MicroBatcher
+
+        mock_model.predict_proba.side_effect = self._proba
+        batcher = MicroBatcher(max_batch_size=2, max_wait_ms=50, max_queue=100)
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            batcher.start()
+            # Vecteurs distincts: aucun ne doit être servi par le cache des résultats
+            results = await asyncio.gather(*(batcher.submit({**valid_features, "vma": 30 + i}) for i in range(5)))
+            await batcher.stop()
+
+        sizes = [call.args[0].shape[0] for call in mock_model.predict_proba.call_args_list]
+        assert sizes == [2, 2, 1]
+        assert len(results) == 5
+
+    @pytest.mark.asyncio
+    async def test_error_propagated_to_all_callers(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Une erreur du modèle est propagée à chaque appelant du lot."""
+        import asyncio
+
+        from services.batcher import MicroBatcher
+
+        mock_model.predict_proba.side_effect = RuntimeError("échec")
+        batcher = MicroBatcher(max_batch_size=64, max_wait_ms=50, max_queue=100)
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            batcher.start()
+            results = await asyncio.gather(*(batcher.submit(valid_features) for _ in range(3)), return_exceptions=True)
+            await batcher.stop()
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_queue_full_rejected(self, valid_features: dict[str, Any]) -> None:
+        """File pleine: la prédiction est rejetée comme une surcharge."""
+        from services.batcher import MicroBatcher
+        from services.inference_executor import InferenceOverloadedError
+
+        batcher = MicroBatcher(max_batch_size=64, max_wait_ms=2, max_queue=1)
+        batcher._queue.put_nowait(({}, MagicMock()))
+
+        with pytest.raises(InferenceOverloadedError):
+            await batcher.submit(valid_features)
+
+    @pytest.mark.asyncio
+    async def test_predict_single_without_batcher(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Sans micro-batcher démarré, la prédiction unitaire passe par le chemin direct."""
+        from services.batcher import get_batcher_stats, predict_single
+
+        mock_model.predict_proba.return_value = [[0.7655, 0.2345]]
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            result = await predict_single(valid_features)
+
+        assert result == {"gravite": 0, "probabilite_grave": 0.2345, "label": "Non grave", "model_version": ""}
+        assert get_batcher_stats() == {"enabled": False}
+
+    @pytest.mark.asyncio
+    async def test_stop_resolves_pending_calls(self, valid_features: dict[str, Any], mock_model: MagicMock) -> None:
+        """Les prédictions en cours de collecte à l'arrêt sont tout de même servies."""
+        import asyncio
+
+        from services.batcher import MicroBatcher
+
+        mock_model.predict_proba.side_effect = self._proba
+        batcher = MicroBatcher(max_batch_size=64, max_wait_ms=10_000, max_queue=100)
+
+        with (
+            patch("services.ml_service._bundle", create_bundle(mock_model)),
+        ):
+            batcher.start()
+            calls = [asyncio.create_task(batcher.submit(valid_features)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            await batcher.stop()
+            results = await asyncio.wait_for(asyncio.gather(*calls), timeout=1)
+
+        assert len(results) == 3
+        mock_model.predict_proba.assert_called_once()
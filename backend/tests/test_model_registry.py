@@ -0,0 +1,189 @@
+"""
+Tests du registre de modèles (POST /predict/{model_name}).
+
+Ces tests vérifient le chargement à la demande des artefacts, la validation
+de l'ordre des features et l'éviction LRU des modèles chargés.
+"""
+
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import joblib
+import pytest
+from httpx import AsyncClient
+
+FEATURES = ["age", "vma", "est_nuit"]
+
+
+def fitted_pipeline(features: list[str]) -> Any:
+    """Pipeline imputer + régression logistique entraîné sur un DataFrame (feature_names_in_)."""
+    import pandas as pd
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    data = pd.DataFrame([[20, 50, 0], [80, 130, 1], [30, 90, 1], [70, 30, 0]], columns=features)
+    return Pipeline([("imputer", SimpleImputer()), ("model", LogisticRegression())]).fit(data, [0, 1, 1, 0])
+
+
+@pytest.fixture
+def registry_dir(tmp_path: Path) -> Iterator[Path]:
+    """Répertoire de modèles: estimateur + liste de features, dictionnaire, et artefacts invalides."""
+    from services.cache import TTLCache
+
+    pipeline = fitted_pipeline(FEATURES)
+    joblib.dump(pipeline, tmp_path / "model_passager_test.joblib")
+    joblib.dump(FEATURES, tmp_path / "features_passager_test.joblib")
+    joblib.dump(pipeline, tmp_path / "model_passager_autre.joblib")
+    joblib.dump(FEATURES, tmp_path / "features_passager_autre.joblib")
+    joblib.dump({"model": pipeline, "feature_names": FEATURES}, tmp_path / "model_accident_test.joblib")
+    joblib.dump(pipeline, tmp_path / "model_wrong_order.joblib")
+    joblib.dump(["vma", "age", "est_nuit"], tmp_path / "features_wrong_order.joblib")
+    joblib.dump(pipeline, tmp_path / "model_no_features.joblib")
+    (tmp_path / "model_corrupted.joblib").write_bytes(b"not a pickle")
+
+    with (
+        patch("services.model_registry.MODEL_REGISTRY_DIR", tmp_path),
+        patch("services.model_registry._loaded", TTLCache(maxsize=2)),
+    ):
+        yield tmp_path
+
+
+class TestModelRegistry:
+    """Tests du chargement et de la prédiction par le registre."""
+
+    def test_models_listed_from_directory(self, registry_dir: Path) -> None:
+        """Chaque fichier model_<nom>.joblib est enregistré sous <nom>."""
+        from services.model_registry import list_models
+
+        assert list_models() == [
+            "accident_test",
+            "corrupted",
+            "no_features",
+            "passager_autre",
+            "passager_test",
+            "wrong_order",
+        ]
+
+    @pytest.mark.parametrize("name", ["passager_test", "accident_test"])
+    def test_predict_matches_pipeline(self, registry_dir: Path, name: str) -> None:
+        """Estimateur seul ou dictionnaire: même résultat que le pipeline appliqué directement."""
+        import pandas as pd
+
+        from services.model_registry import predict_with_model
+
+        pipeline = joblib.load(registry_dir / "model_passager_test.joblib")
+        expected = float(pipeline.predict_proba(pd.DataFrame([[25, 50, 1]], columns=FEATURES))[0, 1])
+
+        result = predict_with_model(name, {"vma": 50, "est_nuit": 1, "age": 25})
+
+        assert result["probabilite_grave"] == round(expected, 4)
+        assert result["gravite"] == int(expected > 0.5)
+
+    def test_missing_value_imputed(self, registry_dir: Path) -> None:
+        """None est transmis comme valeur manquante à l'imputer du pipeline."""
+        from services.model_registry import predict_with_model
+
+        result = predict_with_model("passager_test", {"age": None, "vma": 50, "est_nuit": 0})
+
+        assert 0 <= result["probabilite_grave"] <= 1
+
+    def test_invalid_features_rejected(self, registry_dir: Path) -> None:
+        """Features manquantes ou inattendues: ValueError."""
+        from services.model_registry import predict_with_model
+
+        with pytest.raises(ValueError, match="manquantes \\['est_nuit'\\], inattendues \\['agg'\\]"):
+            predict_with_model("passager_test", {"age": 25, "vma": 50, "agg": 1})
+
+    def test_unknown_model(self, registry_dir: Path) -> None:
+        """Nom absent du répertoire: KeyError."""
+        from services.model_registry import get_model
+
+        with pytest.raises(KeyError):
+            get_model("inconnu")
+
+    @pytest.mark.parametrize("name", ["wrong_order", "no_features", "corrupted"])
+    def test_invalid_artifact_rejected(self, registry_dir: Path, name: str) -> None:
+        """Ordre des features différent de l'entraînement, liste absente ou fichier illisible."""
+        from services.model_registry import ModelLoadError, get_model
+
+        with pytest.raises(ModelLoadError):
+            get_model(name)
+
+    def test_loaded_once_and_lru_evicted(self, registry_dir: Path) -> None:
+        """Un modèle est lu une seule fois; au-delà de la limite, le moins récemment utilisé est libéré."""
+        from services import model_registry
+
+        first = model_registry.get_model("passager_test")
+        assert model_registry.get_model("passager_test") is first
+        model_registry.get_model("accident_test")
+        model_registry.get_model("passager_test")
+        model_registry.get_model("passager_autre")
+
+        stats = model_registry.get_registry_stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+        # Un seul miss par chargement à froid (trois modèles chargés), un hit par appel servi du cache
+        assert (stats["misses"], stats["hits"]) == (3, 2)
+        # accident_test, le moins récemment utilisé, a été libéré: il est relu
+        with patch("services.model_registry.joblib.load", wraps=joblib.load) as mock_load:
+            assert model_registry.get_model("passager_test") is first
+            model_registry.get_model("accident_test")
+        mock_load.assert_called_once()
+
+
+class TestModelRoutes:
+    """Tests des routes du registre."""
+
+    @pytest.mark.asyncio
+    async def test_predict_with_model(self, async_client: AsyncClient, registry_dir: Path) -> None:
+        """POST /predict/{model_name} retourne la prédiction du modèle demandé."""
+        response = await async_client.post(
+            "/predict/passager_test", json={"features": {"age": 25, "vma": 50, "est_nuit": 1}}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["model"] == "passager_test"
+        assert set(data) == {"model", "gravite", "probabilite_grave", "label"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_model_404(self, async_client: AsyncClient, registry_dir: Path) -> None:
+        """Modèle inconnu: 404."""
+        response = await async_client.post("/predict/inconnu", json={"features": {}})
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_invalid_features_400(self, async_client: AsyncClient, registry_dir: Path) -> None:
+        """Features incomplètes: 400."""
+        response = await async_client.post("/predict/passager_test", json={"features": {"age": 25}})
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_invalid_artifact_503(self, async_client: AsyncClient, registry_dir: Path) -> None:
+        """Artefact invalide: 503."""
+        response = await async_client.post("/predict/wrong_order", json={"features": {}})
+
+        assert response.status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_batch_route_not_shadowed(self, async_client: AsyncClient, registry_dir: Path) -> None:
+        """/predict/batch reste la prédiction par lot, pas un modèle nommé "batch"."""
+        response = await async_client.post("/predict/batch", json={"features": {}})
+
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_models_health(self, async_client: AsyncClient, registry_dir: Path) -> None:
+        """GET /health/models liste les modèles enregistrés et chargés."""
+        await async_client.post("/predict/passager_test", json={"features": {"age": 25, "vma": 50, "est_nuit": 1}})
+
+        response = await async_client.get("/health/models")
+
+        assert response.status_code == 200
+        assert "passager_test" in response.json()["models"]
+        assert response.json()["size"] == 1
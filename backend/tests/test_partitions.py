@@ -0,0 +1,178 @@
+"""
+Tests du partitionnement mensuel de la table predictions (services.partitions).
+
+Ces tests vérifient le nommage et les bornes des partitions, la reprise des lignes
+de la partition par défaut, la rétention et la déclaration de la table partitionnée.
+"""
+
+from collections.abc import Iterator
+from datetime import UTC, date, datetime
+from types import ModuleType
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+@pytest.fixture
+def partitions() -> Iterator[ModuleType]:
+    """Module de partitionnement importé avec une BDD mockée."""
+    with (
+        patch.dict("os.environ", {"POSTGRES_USER": "test", "POSTGRES_PASSWORD": "test"}),
+        patch("database.create_async_engine"),
+        patch("database.async_sessionmaker"),
+    ):
+        import services.partitions as module
+
+        yield module
+
+
+def executed_sql(connection: MagicMock) -> list[str]:
+    """Requêtes SQL exécutées sur la connexion mockée."""
+    return [str(call.args[0]) for call in connection.execute.call_args_list]
+
+
+class TestMonths:
+    """Tests du calcul des mois."""
+
+    @pytest.mark.parametrize(
+        ("month", "months", "expected"),
+        [
+            (date(2024, 6, 15), 0, date(2024, 6, 1)),
+            (date(2024, 11, 1), 2, date(2025, 1, 1)),
+            (date(2024, 1, 31), -1, date(2023, 12, 1)),
+            (date(2024, 3, 1), -14, date(2023, 1, 1)),
+        ],
+    )
+    def test_add_months(self, partitions: ModuleType, month: date, months: int, expected: date) -> None:
+        """Premier jour du mois décalé, changements d'année compris."""
+        assert partitions.add_months(month, months) == expected
+
+    def test_partition_name(self, partitions: ModuleType) -> None:
+        """Une partition par mois, nommée par année et mois."""
+        assert partitions.partition_name(date(2024, 6, 15)) == "predictions_y2024m06"
+
+
+class TestEnsurePartitions:
+    """Tests de la création des partitions."""
+
+    def test_creates_default_and_monthly_partitions(self, partitions: ModuleType) -> None:
+        """Partition par défaut puis une partition par mois manquant, bornes au premier du mois en UTC."""
+        connection = MagicMock()
+        connection.execute.return_value.scalar.return_value = False
+
+        with patch.object(partitions, "list_partitions", return_value=["predictions_default", "predictions_y2024m12"]):
+            partitions.ensure_partitions(connection, date(2024, 11, 20), date(2025, 1, 1))
+
+        created = [statement for statement in executed_sql(connection) if statement.startswith("CREATE")]
+        assert "PARTITION OF predictions DEFAULT" in created[0]
+        assert len(created) == 3
+        assert "predictions_y2024m11 PARTITION OF" in created[1]
+        assert "FROM ('2024-11-01 00:00:00+00') TO ('2024-12-01 00:00:00+00')" in created[1]
+        assert "FROM ('2025-01-01 00:00:00+00') TO ('2025-02-01 00:00:00+00')" in created[2]
+        assert not any("ATTACH" in statement for statement in executed_sql(connection))
+
+    def test_moves_default_rows_into_new_partition(self, partitions: ModuleType) -> None:
+        """Lignes du mois dans la partition par défaut: déplacées dans la table, rattachée ensuite."""
+        connection = MagicMock()
+        connection.execute.return_value.scalar.return_value = True
+        connection.execute.return_value.rowcount = 3
+
+        with patch.object(partitions, "list_partitions", return_value=["predictions_default"]):
+            partitions.ensure_partitions(connection, date(2024, 11, 1), date(2024, 11, 1))
+
+        statements = executed_sql(connection)[1:]
+        assert "FROM predictions_default" in statements[0]
+        assert "predictions_y2024m11 (LIKE predictions" in statements[1]
+        assert "DELETE FROM predictions_default" in statements[2]
+        assert "INSERT INTO predictions_y2024m11" in statements[2]
+        assert statements[3] == (
+            "ALTER TABLE predictions ATTACH PARTITION predictions_y2024m11 "
+            "FOR VALUES FROM ('2024-11-01 00:00:00+00') TO ('2024-12-01 00:00:00+00')"
+        )
+        assert connection.execute.call_args_list[3].args[1] == {
+            "lower": datetime(2024, 11, 1, tzinfo=UTC),
+            "upper": datetime(2024, 12, 1, tzinfo=UTC),
+        }
+
+
+class TestRetention:
+    """Tests de la suppression des partitions expirées."""
+
+    def test_drops_only_expired_partitions(self, partitions: ModuleType) -> None:
+        """Partitions antérieures à la rétention détachées puis supprimées, jamais la partition par défaut."""
+        connection = MagicMock()
+        connection.execute.return_value.rowcount = 0
+        existing = [
+            "predictions_default",
+            "predictions_y2024m03",
+            "predictions_y2024m04",
+            "predictions_y2024m05",
+            "predictions_y2024m06",
+        ]
+
+        with patch.object(partitions, "list_partitions", return_value=existing):
+            dropped = partitions.drop_expired_partitions(connection, date(2024, 6, 15), retention_months=1)
+
+        assert dropped == ["predictions_y2024m03", "predictions_y2024m04"]
+        assert executed_sql(connection)[:4] == [
+            "ALTER TABLE predictions DETACH PARTITION predictions_y2024m03",
+            "DROP TABLE predictions_y2024m03",
+            "ALTER TABLE predictions DETACH PARTITION predictions_y2024m04",
+            "DROP TABLE predictions_y2024m04",
+        ]
+
+    def test_purges_expired_default_rows(self, partitions: ModuleType) -> None:
+        """Les lignes expirées de la partition par défaut sont supprimées."""
+        connection = MagicMock()
+        connection.execute.return_value.rowcount = 2
+
+        with patch.object(partitions, "list_partitions", return_value=["predictions_default"]):
+            dropped = partitions.drop_expired_partitions(connection, date(2024, 6, 15), retention_months=1)
+
+        assert dropped == []
+        (call,) = connection.execute.call_args_list
+        assert str(call.args[0]) == "DELETE FROM predictions_default WHERE created_at < :cutoff"
+        assert call.args[1] == {"cutoff": datetime(2024, 5, 1, tzinfo=UTC)}
+
+    def test_maintenance_skips_unpartitioned_table(self, partitions: ModuleType) -> None:
+        """Table non partitionnée: aucune partition créée."""
+        connection = MagicMock()
+
+        with (
+            patch.object(partitions, "is_partitioned", return_value=False),
+            patch.object(partitions, "ensure_partitions") as ensure,
+        ):
+            partitions.maintain_partitions(connection, date(2024, 6, 15))
+
+        ensure.assert_not_called()
+
+    def test_maintenance_retention_disabled_by_default(self, partitions: ModuleType) -> None:
+        """Sans PARTITION_RETENTION_MONTHS, aucune partition n'est supprimée."""
+        connection = MagicMock()
+
+        with (
+            patch.object(partitions, "is_partitioned", return_value=True),
+            patch.object(partitions, "ensure_partitions") as ensure,
+            patch.object(partitions, "drop_expired_partitions") as drop,
+        ):
+            partitions.maintain_partitions(connection, date(2024, 6, 15))
+
+        ensure.assert_called_once_with(connection, date(2024, 6, 15), date(2024, 8, 1))
+        drop.assert_not_called()
+
+
+class TestPartitionedTable:
+    """Tests de la déclaration de la table."""
+
+    def test_table_partitioned_by_created_at(self, partitions: ModuleType) -> None:
+        """Table partitionnée par plage de created_at, incluse dans la clé primaire."""
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.schema import CreateTable
+
+        from database import Base
+
+        ddl = str(CreateTable(Base.metadata.tables["predictions"]).compile(dialect=postgresql.dialect()))
+
+        assert "PARTITION BY RANGE (created_at)" in ddl
+        assert "PRIMARY KEY (id, created_at)" in ddl
+        assert "id SERIAL" in ddl
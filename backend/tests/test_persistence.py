@@ -0,0 +1,294 @@
+"""
+Tests de l'écriture différée des prédictions (services.prediction_writer).
+
+Ces tests vérifient la réservation des identifiants, l'écriture par lots,
+la reprise des lots en échec (dead-letter) et la vidange de la file à l'arrêt.
+"""
+
+import asyncio
+from collections.abc import Iterator
+from contextlib import asynccontextmanager
+from datetime import UTC
+from types import ModuleType
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+
+def make_session_factory(session: AsyncMock) -> MagicMock:
+    """Fabrique de sessions mockée: chaque `async with` retourne la même session."""
+
+    @asynccontextmanager
+    async def factory() -> Any:
+        yield session
+
+    return MagicMock(side_effect=factory)
+
+
+def make_db_session(first_id: int = 1) -> AsyncMock:
+    """Session mockée: la réservation d'identifiants renvoie des valeurs croissantes."""
+    session = AsyncMock()
+    next_id = first_id
+
+    async def execute(stmt: Any, params: Any = None) -> MagicMock:
+        nonlocal next_id
+        result = MagicMock()
+        if isinstance(params, dict) and "n" in params:
+            result.scalars.return_value.all.return_value = list(range(next_id, next_id + params["n"]))
+            next_id += params["n"]
+        return result
+
+    session.execute = AsyncMock(side_effect=execute)
+    return session
+
+
+def inserted_batches(session: AsyncMock) -> list[list[dict[str, Any]]]:
+    """Lots de lignes passés aux INSERT (hors réservations d'identifiants)."""
+    return [call.args[1] for call in session.execute.call_args_list if isinstance(call.args[1], list)]
+
+
+@pytest.fixture
+def writer_module() -> Iterator[ModuleType]:
+    """Module d'écriture différée importé avec une BDD mockée."""
+    with (
+        patch.dict("os.environ", {"POSTGRES_USER": "test", "POSTGRES_PASSWORD": "test"}),
+        patch("database.create_async_engine"),
+        patch("database.async_sessionmaker"),
+    ):
+        import services.prediction_writer as module
+
+        yield module
+
+
+class TestPredictionWriter:
+    """Tests de la file d'écriture différée."""
+
+    @pytest.mark.asyncio
+    async def test_ids_reserved_by_block(self, writer_module: ModuleType) -> None:
+        """Les identifiants viennent d'un bloc réservé en une seule requête."""
+        session = make_db_session(first_id=100)
+        writer = writer_module.PredictionWriter(max_queue=10, batch_size=10, flush_interval_ms=1, id_block=5)
+
+        with patch.object(writer_module, "async_session", make_session_factory(session)):
+            assert await writer.enqueue([{"gravite": 0}]) == [100]
+            assert await writer.enqueue([{"gravite": 1}, {"gravite": 0}]) == [101, 102]
+
+        assert session.execute.await_count == 1
+        assert writer.stats()["reserved_ids"] == 2
+
+    @pytest.mark.asyncio
+    async def test_rows_flushed_in_one_insert(self, writer_module: ModuleType) -> None:
+        """Les lignes en file sont écrites en un seul INSERT avec leurs identifiants."""
+        session = make_db_session()
+        writer = writer_module.PredictionWriter(max_queue=10, batch_size=10, flush_interval_ms=20, id_block=10)
+
+        with patch.object(writer_module, "async_session", make_session_factory(session)):
+            writer.start()
+            await writer.enqueue([{"gravite": 0}, {"gravite": 1}])
+            await writer.enqueue([{"gravite": 1}])
+            await writer.stop()
+
+        (batch,) = inserted_batches(session)
+        assert [{"gravite": row["gravite"], "id": row["id"]} for row in batch] == [
+            {"gravite": 0, "id": 1},
+            {"gravite": 1, "id": 2},
+            {"gravite": 1, "id": 3},
+        ]
+        assert all(row["created_at"].tzinfo is UTC for row in batch)
+        session.commit.assert_awaited_once()
+        assert writer.stats()["written"] == 3
+        assert writer.stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_pending_rows(self, writer_module: ModuleType) -> None:
+        """L'arrêt écrit les lignes encore en file, par lots de batch_size."""
+        session = make_db_session()
+        writer = writer_module.PredictionWriter(max_queue=10, batch_size=2, flush_interval_ms=1000, id_block=10)
+
+        with patch.object(writer_module, "async_session", make_session_factory(session)):
+            await writer.enqueue([{"gravite": 0}] * 5)
+            await writer.stop()
+
+        assert [len(batch) for batch in inserted_batches(session)] == [2, 2, 1]
+        assert writer.stats()["written"] == 5
+
+    @pytest.mark.asyncio
+    async def test_queue_full_rejected(self, writer_module: ModuleType) -> None:
+        """File pleine: la prédiction est rejetée sans consommer d'identifiant."""
+        session = make_db_session()
+        writer = writer_module.PredictionWriter(max_queue=2, batch_size=10, flush_interval_ms=1000, id_block=10)
+
+        with patch.object(writer_module, "async_session", make_session_factory(session)):
+            await writer.enqueue([{"gravite": 0}, {"gravite": 0}])
+            with pytest.raises(writer_module.PersistenceOverloadedError):
+                await writer.enqueue([{"gravite": 1}])
+
+        assert writer.stats()["queued"] == 2
+        assert writer.stats()["reserved_ids"] == 8
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_retried(self, writer_module: ModuleType) -> None:
+        """Un INSERT en échec est réessayé: le lot est écrit, sans perte."""
+        session = make_db_session()
+        session.commit.side_effect = [RuntimeError("connexion perdue"), None, None]
+        writer = writer_module.PredictionWriter(
+            max_queue=10, batch_size=1, flush_interval_ms=1000, id_block=10, retry_backoff_ms=0
+        )
+
+        with patch.object(writer_module, "async_session", make_session_factory(session)):
+            await writer.enqueue([{"gravite": 0}, {"gravite": 1}])
+            await writer.stop()
+
+        stats = writer.stats()
+        assert (stats["written"], stats["retries"], stats["lost"], stats["dead_letter"]) == (2, 1, 0, 0)
+        assert [batch[0]["id"] for batch in inserted_batches(session)] == [1, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_replayed_batch_written_once(self, writer_module: ModuleType) -> None:
+        """Commit abouti mais erreur côté client: le lot rejoué a la même clé primaire et n'est pas dupliqué."""
+        session = make_db_session()
+        table: dict[tuple[int, Any], dict[str, Any]] = {}
+        pending: list[dict[str, Any]] = []
+        reserve = session.execute.side_effect
+
+        async def execute(stmt: Any, params: Any = None) -> MagicMock:
+            if isinstance(params, list):
+                pending.extend(params)
+                return MagicMock()
+            result: MagicMock = await reserve(stmt, params)
+            return result
+
+        async def commit() -> None:
+            # ON CONFLICT DO NOTHING sur la clé primaire (id, created_at)
+            for row in pending:
+                table.setdefault((row["id"], row["created_at"]), row)
+            pending.clear()
+            if len(inserted_batches(session)) == 1:
+                raise RuntimeError("connexion perdue après COMMIT")
+
+        session.execute = AsyncMock(side_effect=execute)
+        session.commit = AsyncMock(side_effect=commit)
+        writer = writer_module.PredictionWriter(
+            max_queue=10, batch_size=10, flush_interval_ms=1000, id_block=10, retry_backoff_ms=0
+        )
+
+        with patch.object(writer_module, "async_session", make_session_factory(session)):
+            await writer.enqueue([{"gravite": 0}])
+            await writer.stop()
+
+        first, replay = inserted_batches(session)
+        assert first == replay
+        assert len(table) == 1
+        assert writer.stats()["retries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_exhausted_retries_go_to_dead_letter(self, writer_module: ModuleType) -> None:
+        """Après toutes les tentatives, le lot passe en file dead-letter puis est écrit à la reprise suivante."""
+        session = make_db_session()
+        session.commit.side_effect = [RuntimeError("BDD indisponible")] * 2 + [None]
+        writer = writer_module.PredictionWriter(
+            max_queue=10,
+            batch_size=10,
+            flush_interval_ms=1,
+            id_block=10,
+            retry_attempts=2,
+            retry_backoff_ms=0,
+            dead_letter_retry_interval=0.05,
+        )
+
+        with patch.object(writer_module, "async_session", make_session_factory(session)):
+            writer.start()
+            await writer.enqueue([{"gravite": 0}, {"gravite": 1}])
+            await asyncio.sleep(0.02)
+            assert writer.stats()["dead_letter"] == 2
+            await asyncio.sleep(0.1)
+            stats = writer.stats()
+            await writer.stop()
+
+        assert (stats["dead_letter"], stats["written"], stats["lost"]) == (0, 2, 0)
+
+    @pytest.mark.asyncio
+    async def test_stop_retries_dead_letter_before_giving_up(self, writer_module: ModuleType) -> None:
+        """À l'arrêt, la file dead-letter est réessayée; ce qui reste est compté comme perdu."""
+        session = make_db_session()
+        session.commit.side_effect = RuntimeError("BDD indisponible")
+        writer = writer_module.PredictionWriter(
+            max_queue=10, batch_size=10, flush_interval_ms=1000, id_block=10, retry_attempts=2, retry_backoff_ms=0
+        )
+
+        with patch.object(writer_module, "async_session", make_session_factory(session)):
+            await writer.enqueue([{"gravite": 0}, {"gravite": 1}])
+            await writer.stop()
+
+        stats = writer.stats()
+        assert len(inserted_batches(session)) == 4
+        assert (stats["dead_letter"], stats["written"], stats["lost"], stats["pending"]) == (0, 0, 2, 0)
+
+    def test_dead_letter_bounded(self, writer_module: ModuleType) -> None:
+        """File dead-letter pleine: les lignes les plus anciennes sont perdues et comptées."""
+        writer = writer_module.PredictionWriter(
+            max_queue=10, batch_size=10, flush_interval_ms=1000, id_block=10, dead_letter_max=3
+        )
+
+        writer._add_dead_letters([{"id": i} for i in range(5)])
+
+        assert [row["id"] for row in writer._dead_letter] == [2, 3, 4]
+        assert (writer.stats()["dead_letter"], writer.stats()["lost"]) == (3, 2)
+
+    @pytest.mark.asyncio
+    async def test_health_reports_pending_and_dead_letter(
+        self, writer_module: ModuleType, async_client: AsyncClient
+    ) -> None:
+        """/health/persistence expose les lignes en attente, la file dead-letter et les pertes."""
+        writer = writer_module.PredictionWriter(max_queue=10, batch_size=10, flush_interval_ms=1000, id_block=10)
+        writer._add_dead_letters([{"id": 1}])
+
+        with patch("services.prediction_writer._writer", writer):
+            response = await async_client.get("/health/persistence")
+
+        body = response.json()
+        assert body["mode"] == "write_behind"
+        assert (body["pending"], body["dead_letter"], body["lost"]) == (0, 1, 0)
+
+
+class TestWriteBehindRoute:
+    """Tests de /predict en mode écriture différée."""
+
+    @pytest.mark.asyncio
+    async def test_predict_returns_reserved_id(
+        self,
+        async_client: AsyncClient,
+        valid_accident_input: dict[str, Any],
+        mock_db_session: AsyncMock,
+    ) -> None:
+        """La réponse porte l'identifiant réservé, sans commit dans la requête."""
+        import services.prediction_writer as writer_module
+
+        writer = MagicMock()
+        writer.enqueue = AsyncMock(return_value=[7])
+
+        with patch("services.prediction_service.get_prediction_writer", return_value=writer):
+            response = await async_client.post("/predict", json=valid_accident_input)
+
+        assert response.status_code == 200
+        assert response.json()["id"] == 7
+        mock_db_session.commit.assert_not_awaited()
+        assert writer_module.get_persistence_stats() == {"mode": "sync"}
+
+    @pytest.mark.asyncio
+    async def test_predict_queue_full_returns_503(
+        self, async_client: AsyncClient, valid_accident_input: dict[str, Any]
+    ) -> None:
+        """File d'écriture pleine: 503 avec Retry-After."""
+        from services.prediction_writer import PersistenceOverloadedError
+
+        writer = MagicMock()
+        writer.enqueue = AsyncMock(side_effect=PersistenceOverloadedError("File d'écriture pleine"))
+
+        with patch("services.prediction_service.get_prediction_writer", return_value=writer):
+            response = await async_client.post("/predict", json=valid_accident_input)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
@@ -36,6 +36,50 @@ class TestHealthEndpoint:
         assert response.json() == {"status": "healthy"}
 
 
+class TestCacheStatsEndpoint:
+    """Tests de l'endpoint de statistiques des caches."""
+
+    @pytest.mark.asyncio
+    async def test_cache_stats(self, async_client: AsyncClient) -> None:
+        """GET /health/cache retourne les compteurs du cache des horaires du soleil."""
+        response = await async_client.get("/health/cache")
+
+        assert response.status_code == 200
+        stats = response.json()["sun_times"]
+        assert {"size", "maxsize", "hits", "misses", "evictions", "expirations"} <= set(stats)
+        assert response.json()["predictions"]["enabled"] is True
+
+
+class TestDbHealthEndpoint:
+    """Tests de la sonde de disponibilité de la BDD."""
+
+    @pytest.mark.asyncio
+    async def test_db_health_ok(self, async_client: AsyncClient) -> None:
+        """GET /health/db retourne la latence et l'état du pool."""
+        pool_stats = {"size": 5, "checked_in": 4, "checked_out": 1}
+
+        with (
+            patch("controllers.health.ping_db", new_callable=AsyncMock, return_value=1.5),
+            patch("controllers.health.get_pool_stats", return_value=pool_stats),
+        ):
+            response = await async_client.get("/health/db")
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok", "latency_ms": 1.5, "pool": pool_stats}
+
+    @pytest.mark.asyncio
+    async def test_db_health_unavailable(self, async_client: AsyncClient) -> None:
+        """GET /health/db retourne 503 si la BDD ne répond pas."""
+        with (
+            patch("controllers.health.ping_db", new_callable=AsyncMock, side_effect=ConnectionRefusedError()),
+            patch("controllers.health.get_pool_stats", return_value={}),
+        ):
+            response = await async_client.get("/health/db")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "unavailable"
+
+
 class TestPredictEndpoint:
     """Tests de l'endpoint de prédiction."""
 
@@ -47,14 +91,8 @@ class TestPredictEndpoint:
         mock_db_session: AsyncMock,
     ) -> None:
         """POST /predict avec données valides retourne une prédiction."""
-        # Mock de l'ID généré par la BDD
-        mock_prediction = MagicMock()
-        mock_prediction.id = 42
-
-        async def mock_refresh(obj: Any) -> None:
-            obj.id = 42
-
-        mock_db_session.refresh = mock_refresh
+        # Mock de l'ID généré par la BDD (INSERT ... RETURNING)
+        mock_db_session.execute.return_value.all.return_value = [MagicMock(id=42, created_at=None)]
 
         with patch("services.feature_service._get_sun_times", new_callable=AsyncMock) as mock_sun:
             from datetime import time
@@ -71,6 +109,26 @@ class TestPredictEndpoint:
         assert data["gravite"] in [0, 1]
         assert 0.0 <= data["probabilite_grave"] <= 1.0
         assert data["label"] in ["Grave", "Non grave"]
+        assert data["id"] == 42
+        mock_db_session.execute.assert_awaited_once()
+        mock_db_session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_predict_without_returning_id(
+        self,
+        async_client: AsyncClient,
+        valid_accident_input: dict[str, Any],
+        mock_db_session: AsyncMock,
+    ) -> None:
+        """POST /predict?return_id=false insère sans RETURNING et ne renvoie pas d'id."""
+        response = await async_client.post("/predict?return_id=false", json=valid_accident_input)
+
+        assert response.status_code == 200
+        assert response.json()["id"] is None
+        assert response.json()["created_at"] is None
+        stmt = mock_db_session.execute.call_args.args[0]
+        assert not stmt._returning
+        mock_db_session.commit.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_predict_invalid_date_format(
@@ -140,6 +198,111 @@ class TestPredictEndpoint:
         assert "Département inconnu" in response.json()["detail"]
 
 
+class TestInferenceBackpressure:
+    """Tests du rejet des requêtes quand le pool d'inférence est saturé."""
+
+    @pytest.mark.asyncio
+    async def test_predict_overloaded_returns_503(
+        self,
+        async_client: AsyncClient,
+        valid_accident_input: dict[str, Any],
+    ) -> None:
+        """POST /predict avec file d'inférence pleine retourne 503 et Retry-After."""
+        with patch("services.inference_executor.INFERENCE_MAX_PENDING", 0):
+            response = await async_client.post("/predict", json=valid_accident_input)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    @pytest.mark.asyncio
+    async def test_inference_stats(self, async_client: AsyncClient) -> None:
+        """GET /health/inference expose la charge du pool."""
+        response = await async_client.get("/health/inference")
+
+        assert response.status_code == 200
+        assert {"executor", "workers", "pending", "max_pending", "rejected"} <= set(response.json())
+
+
+class TestPredictBatchEndpoint:
+    """Tests de l'endpoint de prédiction par lot."""
+
+    @pytest.mark.asyncio
+    async def test_predict_batch_success(
+        self,
+        async_client: AsyncClient,
+        valid_accident_input: dict[str, Any],
+        mock_db_session: AsyncMock,
+        mock_model: MagicMock,
+    ) -> None:
+        """POST /predict/batch retourne une prédiction par entrée, dans l'ordre."""
+        from datetime import time
+
+        mock_model.predict_proba.return_value = [[0.7, 0.3], [0.1, 0.9]]
+        mock_result = MagicMock()
+        mock_result.all.return_value = [MagicMock(id=10, created_at=None), MagicMock(id=11, created_at=None)]
+        mock_db_session.execute.return_value = mock_result
+
+        with patch("services.feature_service._get_sun_times", new_callable=AsyncMock) as mock_sun:
+            mock_sun.return_value = {"sunrise": time(6, 0), "sunset": time(21, 0)}
+
+            response = await async_client.post(
+                "/predict/batch", json={"inputs": [valid_accident_input, valid_accident_input]}
+            )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["id"] for item in data] == [10, 11]
+        assert [item["label"] for item in data] == ["Non grave", "Grave"]
+        mock_db_session.execute.assert_awaited_once()
+        mock_db_session.commit.assert_awaited_once()
+        assert len(mock_db_session.execute.call_args.args[1]) == 2
+
+    @pytest.mark.asyncio
+    async def test_predict_batch_stores_typed_features(
+        self,
+        async_client: AsyncClient,
+        valid_accident_input: dict[str, Any],
+        mock_db_session: AsyncMock,
+        mock_model: MagicMock,
+    ) -> None:
+        """Les features dérivées sont insérées en colonnes typées, sans JSON."""
+        mock_model.predict_proba.return_value = [[0.7, 0.3]]
+        mock_db_session.execute.return_value.all.return_value = [MagicMock(id=1, created_at=None)]
+
+        response = await async_client.post("/predict/batch", json={"inputs": [valid_accident_input]})
+
+        assert response.status_code == 200
+        (row,) = mock_db_session.execute.call_args.args[1]
+        assert "features" not in row
+        # 2024-06-15 08:30 à Paris: samedi, heure de pointe, de jour
+        assert row["est_nuit"] is False
+        assert row["est_heure_pointe"] is True
+        assert row["jour_semaine"] == 5
+        assert row["est_weekend"] is True
+
+    @pytest.mark.asyncio
+    async def test_predict_batch_empty(self, async_client: AsyncClient) -> None:
+        """POST /predict/batch avec lot vide retourne 422."""
+        response = await async_client.post("/predict/batch", json={"inputs": []})
+
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_predict_batch_invalid_departement(
+        self,
+        async_client: AsyncClient,
+        valid_accident_input: dict[str, Any],
+    ) -> None:
+        """POST /predict/batch avec un département invalide retourne 400."""
+        invalid_input = {**valid_accident_input, "departement": "999"}
+
+        with patch("services.feature_service._get_sun_times", new_callable=AsyncMock):
+            response = await async_client.post("/predict/batch", json={"inputs": [valid_accident_input, invalid_input]})
+
+        assert response.status_code == 400
+        assert "Département inconnu" in response.json()["detail"]
+
+
 class TestPredictionsEndpoint:
     """Tests de l'endpoint d'historique des prédictions."""
 
@@ -151,7 +314,7 @@ class TestPredictionsEndpoint:
     ) -> None:
         """GET /predictions sans données retourne liste vide."""
         mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = []
+        mock_result.mappings.return_value.all.return_value = []
         mock_db_session.execute.return_value = mock_result
 
         response = await async_client.get("/predictions")
@@ -167,7 +330,7 @@ class TestPredictionsEndpoint:
     ) -> None:
         """GET /predictions avec limit respecte la pagination."""
         mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = []
+        mock_result.mappings.return_value.all.return_value = []
         mock_db_session.execute.return_value = mock_result
 
         response = await async_client.get("/predictions?limit=10&offset=5")
@@ -203,3 +366,221 @@ class TestPredictionsEndpoint:
         response = await async_client.get("/predictions?offset=-1")
 
         assert response.status_code == 422
+
+
+class TestPredictionsKeysetPagination:
+    """Tests de la pagination par curseur de l'historique."""
+
+    @staticmethod
+    def _history_row(prediction_id: int) -> dict[str, Any]:
+        """Ligne complète de l'historique."""
+        from datetime import UTC, datetime
+
+        return {
+            "id": prediction_id,
+            "created_at": datetime(2024, 6, 15, 8, prediction_id, tzinfo=UTC),
+            "input_date": "2024-06-15",
+            "input_heure": "08:30",
+            "input_departement": "75",
+            "input_agg": True,
+            "input_vma": 50,
+            "input_impl_vehicule_leger": True,
+            "input_impl_poids_lourd": False,
+            "input_impl_pieton": False,
+            "features": {},
+            "gravite": 0,
+            "probabilite_grave": 0.2,
+            "label": "Non grave",
+        }
+
+    @pytest.mark.asyncio
+    async def test_full_page_returns_next_cursor(self, async_client: AsyncClient, mock_db_session: AsyncMock) -> None:
+        """Page complète: X-Next-Cursor désigne la dernière prédiction de la page."""
+        from services.prediction_service import decode_cursor
+
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.all.return_value = [self._history_row(3), self._history_row(2)]
+        mock_db_session.execute.return_value = mock_result
+
+        response = await async_client.get("/predictions?limit=2")
+
+        assert response.status_code == 200
+        created_at, prediction_id = decode_cursor(response.headers["X-Next-Cursor"])
+        assert prediction_id == 2
+        assert created_at.minute == 2
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self, async_client: AsyncClient, mock_db_session: AsyncMock) -> None:
+        """Page incomplète: pas de curseur suivant."""
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.all.return_value = [self._history_row(1)]
+        mock_db_session.execute.return_value = mock_result
+
+        response = await async_client.get("/predictions?limit=2")
+
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_after_filters_by_key(self, async_client: AsyncClient, mock_db_session: AsyncMock) -> None:
+        """Avec after, la requête filtre sur (created_at, id) sans OFFSET."""
+        from services.prediction_service import encode_cursor
+
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.all.return_value = []
+        mock_db_session.execute.return_value = mock_result
+
+        row = self._history_row(2)
+        response = await async_client.get(f"/predictions?after={encode_cursor(row['created_at'], row['id'])}")
+
+        assert response.status_code == 200
+        query = str(mock_db_session.execute.call_args.args[0])
+        assert "(predictions.created_at, predictions.id) <" in query
+        assert "OFFSET" not in query
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, async_client: AsyncClient) -> None:
+        """Curseur illisible: 400."""
+        response = await async_client.get("/predictions?after=pas-un-curseur")
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_after_with_offset_rejected(self, async_client: AsyncClient) -> None:
+        """after et offset combinés: 400."""
+        response = await async_client.get("/predictions?after=abc&offset=10")
+
+        assert response.status_code == 400
+
+
+class TestPredictionsFilters:
+    """Tests des filtres de l'historique."""
+
+    @pytest.mark.asyncio
+    async def test_filters_applied_in_sql(self, async_client: AsyncClient, mock_db_session: AsyncMock) -> None:
+        """Chaque filtre renseigné devient une condition SQL."""
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.all.return_value = []
+        mock_db_session.execute.return_value = mock_result
+
+        response = await async_client.get(
+            "/predictions",
+            params={
+                "input_departement": "75",
+                "created_after": "2024-01-01T00:00:00Z",
+                "created_before": "2024-02-01T00:00:00Z",
+                "gravite": 1,
+                "min_probabilite_grave": 0.8,
+            },
+        )
+
+        assert response.status_code == 200
+        query = str(mock_db_session.execute.call_args.args[0])
+        assert "predictions.input_departement =" in query
+        assert "predictions.created_at >=" in query
+        assert "predictions.created_at <" in query
+        assert "predictions.gravite =" in query
+        assert "predictions.probabilite_grave >=" in query
+
+    @pytest.mark.asyncio
+    async def test_label_filters_on_gravite(self, async_client: AsyncClient, mock_db_session: AsyncMock) -> None:
+        """Le filtre label est traduit en condition sur gravite (indexée)."""
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.all.return_value = []
+        mock_db_session.execute.return_value = mock_result
+
+        response = await async_client.get("/predictions?label=Grave")
+
+        assert response.status_code == 200
+        query = mock_db_session.execute.call_args.args[0].compile()
+        assert "predictions.gravite =" in str(query)
+        assert 1 in query.params.values()
+
+    @pytest.mark.asyncio
+    async def test_no_filter_no_condition(self, async_client: AsyncClient, mock_db_session: AsyncMock) -> None:
+        """Sans filtre, pas de clause WHERE."""
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.all.return_value = []
+        mock_db_session.execute.return_value = mock_result
+
+        await async_client.get("/predictions")
+
+        assert "WHERE" not in str(mock_db_session.execute.call_args.args[0])
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("params", ["gravite=2", "min_probabilite_grave=1.5", "label=Inconnu"])
+    async def test_invalid_filter(self, async_client: AsyncClient, params: str) -> None:
+        """Filtre hors domaine: 422."""
+        response = await async_client.get(f"/predictions?{params}")
+
+        assert response.status_code == 422
+
+
+class TestPredictionsProjection:
+    """Tests de la projection des colonnes de l'historique."""
+
+    @pytest.mark.asyncio
+    async def test_fields_selects_only_requested_columns(
+        self, async_client: AsyncClient, mock_db_session: AsyncMock
+    ) -> None:
+        """fields: seules les colonnes demandées (plus id et created_at) sont lues et renvoyées."""
+        from datetime import UTC, datetime
+
+        row = {
+            "id": 1,
+            "created_at": datetime(2024, 6, 15, 8, 30, tzinfo=UTC),
+            "input_departement": "75",
+            "probabilite_grave": 0.2,
+        }
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.all.return_value = [row]
+        mock_db_session.execute.return_value = mock_result
+
+        response = await async_client.get("/predictions?fields=input_departement,probabilite_grave")
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": 1, "created_at": "2024-06-15T08:30:00Z", "input_departement": "75", "probabilite_grave": 0.2}
+        ]
+        query = str(mock_db_session.execute.call_args.args[0])
+        assert "json_build_object" not in query
+        assert "predictions.input_departement" in query
+
+    @pytest.mark.asyncio
+    async def test_default_returns_all_history_fields(
+        self, async_client: AsyncClient, mock_db_session: AsyncMock
+    ) -> None:
+        """Sans fields, toutes les colonnes de PredictionHistory sont renvoyées."""
+        from schemas import PredictionHistory
+
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.all.return_value = [TestPredictionsKeysetPagination._history_row(1)]
+        mock_db_session.execute.return_value = mock_result
+
+        response = await async_client.get("/predictions")
+
+        assert response.status_code == 200
+        (item,) = response.json()
+        assert PredictionHistory.model_validate(item).id == 1
+        assert set(item) == set(PredictionHistory.model_fields)
+
+    @pytest.mark.asyncio
+    async def test_openapi_schema_marks_projected_fields_optional(self, async_client: AsyncClient) -> None:
+        """Schéma OpenAPI: toutes les colonnes documentées, seuls id et created_at requis."""
+        from schemas import PredictionHistory
+
+        response = await async_client.get("/openapi.json")
+
+        operation = response.json()["paths"]["/predictions"]["get"]
+        schema = operation["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema["type"] == "array"
+        assert set(schema["items"]["properties"]) == set(PredictionHistory.model_fields)
+        assert schema["items"]["required"] == ["id", "created_at"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_field_rejected(self, async_client: AsyncClient) -> None:
+        """Champ inconnu: 400."""
+        response = await async_client.get("/predictions?fields=id,mot_de_passe")
+
+        assert response.status_code == 400
+        assert "mot_de_passe" in response.json()["detail"]
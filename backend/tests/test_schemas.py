@@ -82,6 +82,43 @@ class TestAccidentInputSchema:
         assert "departement" in str(exc_info.value)
 
 
+class TestAccidentBatchInputSchema:
+    """Tests de validation du schéma AccidentBatchInput."""
+
+    def test_valid_batch(self, valid_accident_input: dict[str, Any]) -> None:
+        """Lot valide accepté."""
+        from schemas import AccidentBatchInput
+
+        batch = AccidentBatchInput.model_validate({"inputs": [valid_accident_input, valid_accident_input]})
+
+        assert len(batch.inputs) == 2
+        assert batch.inputs[0].departement == "75"
+
+    def test_empty_batch(self) -> None:
+        """Lot vide rejeté."""
+        from schemas import AccidentBatchInput
+
+        with pytest.raises(ValidationError):
+            AccidentBatchInput(inputs=[])
+
+    def test_batch_too_large(self, valid_accident_input: dict[str, Any]) -> None:
+        """Lot au-delà de la taille maximale rejeté."""
+        from schemas import AccidentBatchInput
+        from schemas.prediction import MAX_BATCH_SIZE
+
+        with pytest.raises(ValidationError):
+            AccidentBatchInput.model_validate({"inputs": [valid_accident_input] * (MAX_BATCH_SIZE + 1)})
+
+    def test_batch_invalid_item(self, valid_accident_input: dict[str, Any]) -> None:
+        """Une entrée invalide fait rejeter le lot."""
+        from schemas import AccidentBatchInput
+
+        with pytest.raises(ValidationError) as exc_info:
+            AccidentBatchInput.model_validate({"inputs": [valid_accident_input, {**valid_accident_input, "vma": 200}]})
+
+        assert "vma" in str(exc_info.value)
+
+
 class TestPredictionResponseSchema:
     """Tests de validation du schéma PredictionResponse."""
 